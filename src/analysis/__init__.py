@@ -0,0 +1,2 @@
+# encoding: utf-8
+# author:   Jan Hybs
\ No newline at end of file
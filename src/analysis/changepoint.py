@@ -0,0 +1,183 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from multiprocessing import Pool, cpu_count
+
+import numpy
+
+from analysis.columnar import MetricsMatrix
+
+
+group_fields = ['task-description', 'run-process-count', 'program-branch']
+order_fields = ['run-started-at', 'program-revision']
+
+# stores opened in worker process
+stores = dict()
+
+
+def split_costs(sums, squares, start, stop, min_size):
+    """
+    Returns costs (sum of squared errors) of splitting segment <start, stop)
+    at every admissible position, all positions are evaluated at once using
+    cumulative sums
+    :return: tuple (positions, costs)
+    """
+    positions = numpy.arange(start + min_size, stop - min_size + 1)
+    if not len(positions):
+        return positions, positions.astype(numpy.float64)
+
+    left_n = positions - start
+    right_n = stop - positions
+    left_sum = sums[positions] - sums[start]
+    right_sum = sums[stop] - sums[positions]
+    left_sq = squares[positions] - squares[start]
+    right_sq = squares[stop] - squares[positions]
+
+    costs = (left_sq - left_sum ** 2 / left_n) + (right_sq - right_sum ** 2 / right_n)
+    return positions, costs
+
+
+def segment_cost(sums, squares, start, stop):
+    n = stop - start
+    total = sums[stop] - sums[start]
+    return (squares[stop] - squares[start]) - total ** 2 / n
+
+
+def noise_level(series, resolution=1e-3):
+    """
+    Estimates noise of the series from its differences (steps in mean do
+    not affect it), robust MAD estimate is used unless most differences
+    are zero (quantised timings, call counts), then standard deviation of
+    differences is used. Noise is never below resolution times level of
+    the series, smaller changes are not considered meaningful
+    """
+    differences = numpy.diff(series)
+    sigma = 1.4826 * numpy.median(numpy.abs(differences)) / numpy.sqrt(2)
+    if sigma == 0:
+        sigma = numpy.std(differences) / numpy.sqrt(2)
+    return max(sigma, resolution * numpy.median(numpy.abs(series)), 1e-12)
+
+
+def binary_segmentation(series, min_size=3, penalty=None, max_points=10):
+    """
+    Finds change points in mean of the series using binary segmentation
+    Segment is split at position minimizing squared error if the gain is
+    greater than penalty, default penalty is BIC-like 2 * sigma^2 * log(n)
+    where sigma is noise estimate from differences of the series (see
+    noise_level)
+    :param series: 1D numpy array without NaNs
+    :return: sorted list of change point positions (index of first value
+             after the change)
+    """
+    series = numpy.asarray(series, dtype=numpy.float64)
+    n = len(series)
+    if n < 2 * min_size:
+        return []
+
+    if penalty is None:
+        penalty = 2 * noise_level(series) ** 2 * numpy.log(n)
+
+    sums = numpy.concatenate(([0.0], numpy.cumsum(series)))
+    squares = numpy.concatenate(([0.0], numpy.cumsum(series ** 2)))
+
+    points = list()
+    segments = [(0, n)]
+    while segments and len(points) < max_points:
+        start, stop = segments.pop()
+        positions, costs = split_costs(sums, squares, start, stop, min_size)
+        if not len(positions):
+            continue
+
+        best = numpy.argmin(costs)
+        gain = segment_cost(sums, squares, start, stop) - costs[best]
+        if gain <= penalty:
+            continue
+
+        position = int(positions[best])
+        points.append(position)
+        segments.append((start, position))
+        segments.append((position, stop))
+
+    return sorted(points)
+
+
+def detect_columns(args):
+    """
+    Detects change points in given columns of the store, executed in
+    worker process (store is memory mapped once in every worker)
+    :param args: tuple (location, metric, rows, columns, min_size, penalty)
+    :return: list of tuples (column, position, before, after)
+    """
+    location, metric, rows, columns, min_size, penalty = args
+    if location not in stores:
+        stores[location] = MetricsMatrix(location)
+    data = stores[location].matrix(metric)[rows][:, columns]
+
+    result = list()
+    for i, column in enumerate(columns):
+        series = data[:, i]
+        valid = numpy.flatnonzero(~numpy.isnan(series))
+        values = series[valid]
+        points = binary_segmentation(values, min_size, penalty)
+
+        edges = [0] + points + [len(values)]
+        for j, position in enumerate(points):
+            before = numpy.mean(values[edges[j]:position])
+            after = numpy.mean(values[position:edges[j + 2]])
+            result.append((int(column), int(rows[valid[position]]), float(before), float(after)))
+    return result
+
+
+def condition_groups(store):
+    """
+    Returns dict group key -> row indices ordered by run time and revision
+    """
+    groups = dict()
+    keys = zip(*[store.condition(field).tolist() for field in group_fields])
+    order = zip(*[store.condition(field).tolist() for field in order_fields])
+    for row in sorted(range(len(store.runs)), key=lambda r: order[r]):
+        groups.setdefault(keys[row], list()).append(row)
+    return groups
+
+
+def detect_change_points(store, metric='cumul-time', processes=None, min_size=3, penalty=None, chunk=64):
+    """
+    Runs change point detection on history of every node in every condition
+    group, nodes are split to chunks processed in parallel
+    :param store: MetricsMatrix
+    :return: list of dicts ranked by relative magnitude of the change
+    """
+    tasks = list()
+    groups = condition_groups(store)
+    for key, rows in groups.items():
+        if len(rows) < 2 * min_size:
+            continue
+        rows = numpy.array(rows, dtype=numpy.int64)
+        for start in range(0, len(store.nodes), chunk):
+            columns = numpy.arange(start, min(start + chunk, len(store.nodes)))
+            tasks.append((key, (store.location, metric, rows, columns, min_size, penalty)))
+
+    pool = Pool(processes or cpu_count())
+    try:
+        results = pool.map(detect_columns, [args for key, args in tasks])
+    finally:
+        pool.close()
+        pool.join()
+
+    changes = list()
+    for (key, args), result in zip(tasks, results):
+        for column, row, before, after in result:
+            run = store.runs[row]
+            changes.append({
+                'node': store.nodes[column],
+                'group': dict(zip(group_fields, key)),
+                'revision': run['program-revision'],
+                'run-started-at': run['run-started-at'],
+                'cond_id': run['cond_id'],
+                'before': before,
+                'after': after,
+                'magnitude': after - before,
+                'relative': (after - before) / before if before else 0.0
+            })
+
+    changes.sort(key=lambda item: -abs(item['relative']))
+    return changes
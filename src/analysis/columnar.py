@@ -0,0 +1,190 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import datetime
+import json
+import os
+
+import numpy
+from numpy.lib.format import open_memmap
+
+
+default_metrics = ['cumul-time', 'cumul-time-max', 'call-count', 'self-time', 'time-per-call', 'imbalance',
+                   'normalised-time']
+cond_fields = ['program-branch', 'program-revision', 'program-build', 'task-description', 'task-size',
+               'run-process-count', 'run-started-at', 'run-finished-at', 'run-hostname', 'node-score']
+
+
+class MetricsMatrix(object):
+    """
+    Analytic store of all runs kept next to the database
+    For every metric there is one runs x nodes float64 matrix stored in
+    memory mapped .npy file (missing values are NaN), columns are ist nodes
+    (listed in nodes.json), rows are runs (listed in runs.json together
+    with their conditions). Matrices are preallocated and grow by doubling
+    so appending a run writes single row only.
+    """
+
+    def __init__(self, location, metrics=None):
+        self.location = location
+        self.meta_file = os.path.join(location, 'meta.json')
+        self.nodes_file = os.path.join(location, 'nodes.json')
+        self.runs_file = os.path.join(location, 'runs.json')
+
+        if os.path.exists(self.meta_file):
+            with open(self.meta_file, 'r') as fp:
+                self.meta = json.load(fp)
+            with open(self.nodes_file, 'r') as fp:
+                self.nodes = json.load(fp)
+            with open(self.runs_file, 'r') as fp:
+                self.runs = json.load(fp)
+        else:
+            if not os.path.exists(location):
+                os.makedirs(location)
+            self.meta = {
+                'metrics': metrics or default_metrics,
+                'run-capacity': 64,
+                'node-capacity': 256
+            }
+            self.nodes = list()
+            self.runs = list()
+
+        self.node_index = dict((path, i) for i, path in enumerate(self.nodes))
+        self.run_index = dict((run['cond_id'], i) for i, run in enumerate(self.runs))
+        self.conditions = dict()
+        self.matrices = dict()
+        for metric in self.metrics:
+            self.matrices[metric] = self.open_matrix(metric)
+
+    @property
+    def metrics(self):
+        return self.meta['metrics']
+
+    def matrix_file(self, metric):
+        return os.path.join(self.location, metric + '.npy')
+
+    def open_matrix(self, metric, mode='r+'):
+        shape = self.meta['run-capacity'], self.meta['node-capacity']
+        filename = self.matrix_file(metric)
+        if os.path.exists(filename):
+            return numpy.load(filename, mmap_mode=mode)
+
+        matrix = open_memmap(filename, mode='w+', dtype=numpy.float64, shape=shape)
+        matrix[:] = numpy.nan
+        return matrix
+
+    def resize(self, runs, nodes):
+        """
+        Reallocates all matrices so they can hold given number of runs and nodes
+        """
+        run_capacity = self.meta['run-capacity']
+        node_capacity = self.meta['node-capacity']
+        while run_capacity < runs:
+            run_capacity *= 2
+        while node_capacity < nodes:
+            node_capacity *= 2
+
+        if (run_capacity, node_capacity) == (self.meta['run-capacity'], self.meta['node-capacity']):
+            return
+
+        for metric in self.metrics:
+            old = self.matrices.pop(metric)
+            filename = self.matrix_file(metric)
+            matrix = open_memmap(filename + '.tmp', mode='w+', dtype=numpy.float64,
+                                 shape=(run_capacity, node_capacity))
+            matrix[:] = numpy.nan
+            matrix[:old.shape[0], :old.shape[1]] = old
+            matrix.flush()
+            del matrix, old
+            os.rename(filename + '.tmp', filename)
+
+        self.meta['run-capacity'] = run_capacity
+        self.meta['node-capacity'] = node_capacity
+        for metric in self.metrics:
+            self.matrices[metric] = self.open_matrix(metric)
+
+    def append(self, cond_id, conditions, tree):
+        """
+        Adds single run to the store, run already present is skipped
+        :param cond_id: id of run in cond collection
+        :param conditions: cond document or whole profiler json
+        :param tree: ProfilerTree of the run
+        :return: row index of the run
+        """
+        cond_id = str(cond_id)
+        if cond_id in self.run_index:
+            return self.run_index[cond_id]
+
+        for path in tree.paths:
+            if path not in self.node_index:
+                self.node_index[path] = len(self.nodes)
+                self.nodes.append(path)
+
+        row = len(self.runs)
+        self.resize(row + 1, len(self.nodes))
+
+        columns = numpy.array([self.node_index[path] for path in tree.paths], dtype=numpy.int64)
+        for metric in self.metrics:
+            self.matrices[metric][row, columns] = tree.column(metric)
+
+        run = dict((field, serialize(conditions.get(field))) for field in cond_fields)
+        run['cond_id'] = cond_id
+        self.runs.append(run)
+        self.run_index[cond_id] = row
+        self.conditions.clear()
+        return row
+
+    def flush(self):
+        for matrix in self.matrices.values():
+            matrix.flush()
+
+        self.meta['runs'] = len(self.runs)
+        self.meta['nodes'] = len(self.nodes)
+        for filename, value in ((self.nodes_file, self.nodes), (self.runs_file, self.runs),
+                                (self.meta_file, self.meta)):
+            with open(filename + '.tmp', 'w') as fp:
+                json.dump(value, fp)
+            os.rename(filename + '.tmp', filename)
+
+    def matrix(self, metric):
+        """
+        Returns runs x nodes view of given metric (only used part of the file)
+        """
+        return self.matrices[metric][:len(self.runs), :len(self.nodes)]
+
+    def history(self, metric, path):
+        """
+        Returns values of single node across all runs
+        """
+        return self.matrix(metric)[:, self.node_index[path]]
+
+    def condition(self, field):
+        """
+        Returns given condition of all runs as numpy array, arrays are kept
+        until next run is appended
+        """
+        if field not in self.conditions:
+            self.conditions[field] = numpy.array([run[field] for run in self.runs])
+        return self.conditions[field]
+
+    def select(self, **conditions):
+        """
+        Returns boolean mask of runs matching given conditions,
+        keyword arguments use _ instead of - (run_process_count=2)
+        """
+        mask = numpy.ones(len(self.runs), dtype=bool)
+        for field, value in conditions.items():
+            mask &= self.condition(field.replace('_', '-')) == value
+        return mask
+
+    def on_ingest(self, cond_id, json_data, tree):
+        """
+        Ingest hook for MongoExec, store is written by flush once per batch
+        (commit hook)
+        """
+        self.append(cond_id, json_data, tree)
+
+
+def serialize(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
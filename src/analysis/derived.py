@@ -0,0 +1,57 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import numpy
+
+
+derived_fields = ['self-time', 'time-per-call', 'imbalance', 'efficiency']
+
+
+def compute_derived(tree, process_count=1):
+    """
+    Computes derived metrics of all nodes of given ProfilerTree at once
+        self-time       cumul-time minus cumul-time of direct children
+        time-per-call   cumul-time / call-count
+        imbalance       cumul-time-max / average time across MPI ranks
+        efficiency      average time across MPI ranks / cumul-time-max
+    :param tree: ProfilerTree
+    :param process_count: run-process-count of the run
+    :return: dict field -> numpy array
+    """
+    cumul = tree.column('cumul-time', 0.0)
+    count = tree.column('call-count', 0.0)
+    cumul_max = tree.column('cumul-time-max')
+    cumul_sum = tree.column('cumul-time-sum')
+
+    # children can slightly exceed parent due to timer resolution
+    self_time = numpy.maximum(cumul - tree.children_sum(cumul), 0.0)
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        time_per_call = numpy.where(count > 0, cumul / count, 0.0)
+
+        # runs without per rank statistics use cumul-time only
+        cumul_max = numpy.where(numpy.isnan(cumul_max), cumul, cumul_max)
+        cumul_sum = numpy.where(numpy.isnan(cumul_sum), cumul * process_count, cumul_sum)
+        average = cumul_sum / max(process_count, 1)
+
+        imbalance = numpy.where(average > 0, cumul_max / average, 1.0)
+        efficiency = numpy.where(cumul_max > 0, average / cumul_max, 1.0)
+
+    return {
+        'self-time': self_time,
+        'time-per-call': time_per_call,
+        'imbalance': imbalance,
+        'efficiency': efficiency
+    }
+
+
+def annotate_derived(tree, process_count=1):
+    """
+    Stores derived metrics directly to nodes of the tree
+    :return: dict field -> numpy array
+    """
+    derived = compute_derived(tree, process_count)
+    columns = [(field, derived[field].tolist()) for field in derived_fields]
+    for i, node in enumerate(tree.nodes):
+        for field, values in columns:
+            node[field] = values[i]
+    return derived
@@ -0,0 +1,89 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import numpy
+
+
+diff_metrics = ['cumul-time', 'cumul-time-max', 'call-count', 'self-time', 'time-per-call', 'imbalance']
+
+
+def align(left, right):
+    """
+    Aligns two ProfilerTrees by ist path
+    :return: tuple (paths, left indices, right indices), index is -1 when
+             node is missing on that side
+    """
+    paths = list(left.paths)
+    for path in right.paths:
+        if path not in left.index:
+            paths.append(path)
+
+    left_indices = numpy.array([left.index.get(path, -1) for path in paths], dtype=numpy.int64)
+    right_indices = numpy.array([right.index.get(path, -1) for path in paths], dtype=numpy.int64)
+    return paths, left_indices, right_indices
+
+
+def aligned_column(tree, indices, metric):
+    values = numpy.append(tree.column(metric), numpy.nan)
+    # index -1 points to appended NaN
+    return values[indices]
+
+
+def diff_trees(left, right, metrics=None):
+    """
+    Computes differences of all metrics of all nodes of two runs
+    :param left: ProfilerTree (base)
+    :param right: ProfilerTree (compared)
+    :param metrics: list of compared metrics
+    :return: dict with keys
+        paths       union of ist paths (left order, then nodes only in right)
+        status      'both', 'left' or 'right' for each path
+        metrics     dict metric -> dict with numpy arrays left, right,
+                    delta (right - left) and relative (delta / left)
+    """
+    metrics = metrics or diff_metrics
+    paths, left_indices, right_indices = align(left, right)
+
+    status = numpy.where(left_indices < 0, 'right', numpy.where(right_indices < 0, 'left', 'both'))
+    result = {
+        'paths': paths,
+        'status': status,
+        'metrics': dict()
+    }
+
+    for metric in metrics:
+        a = aligned_column(left, left_indices, metric)
+        b = aligned_column(right, right_indices, metric)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            delta = b - a
+            relative = numpy.where(a != 0, delta / a, numpy.nan)
+        result['metrics'][metric] = {
+            'left': a,
+            'right': b,
+            'delta': delta,
+            'relative': relative
+        }
+    return result
+
+
+def to_json(diff, sort_by=None):
+    """
+    Converts diff to list of json serializable rows (NaN is converted to None)
+    :param sort_by: metric, rows are sorted by absolute delta of this metric
+    """
+    order = range(len(diff['paths']))
+    if sort_by:
+        delta = numpy.nan_to_num(diff['metrics'][sort_by]['delta'])
+        order = numpy.argsort(-numpy.abs(delta), kind='mergesort')
+
+    columns = dict()
+    for metric, values in diff['metrics'].items():
+        for key, array in values.items():
+            columns[metric, key] = numpy.where(numpy.isnan(array), None, array).tolist()
+
+    rows = list()
+    for i in order:
+        row = { 'path': diff['paths'][i], 'status': str(diff['status'][i]) }
+        for metric in diff['metrics']:
+            row[metric] = dict((key, columns[metric, key][i]) for key in ('left', 'right', 'delta', 'relative'))
+        rows.append(row)
+    return rows
@@ -0,0 +1,143 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import datetime
+import threading
+import time
+
+
+facet_fields = ['program-branch', 'task-description', 'task-size', 'run-process-count', 'build-date']
+
+
+def build_date(conditions):
+    """
+    Returns date of the build (YYYY-MM-DD) parsed from program-build
+    ('Jun 18 2015, 11:05:14 flags: ...'), run date is used as fallback
+    """
+    try:
+        return datetime.datetime.strptime(conditions['program-build'][:11], '%b %d %Y').strftime('%Y-%m-%d')
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    started = conditions.get('run-started-at')
+    return started.strftime('%Y-%m-%d') if isinstance(started, datetime.datetime) else None
+
+
+def facet_value(field, conditions):
+    if field == 'build-date':
+        return build_date(conditions)
+    return conditions.get(field)
+
+
+def bit_count(bitmap):
+    return bin(bitmap).count('1')
+
+
+class FacetIndex(object):
+    """
+    In-memory index over condition table
+    Every run gets position, for every distinct value of every facet field
+    there is a bitmap (python int) of runs having that value. Query is dict
+    field -> list of values, values of single field are OR-ed, fields are
+    AND-ed, so any filter is just few bitwise operations
+    """
+
+    def __init__(self, fields=None):
+        self.fields = fields or facet_fields
+        self.ids = list()
+        self.positions = dict()
+        self.bitmaps = dict((field, dict()) for field in self.fields)
+        self.everything = 0
+        self.last_id = None
+        self.last_update = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, cond_id, conditions):
+        """
+        Adds single run to the index, known runs are skipped
+        """
+        if cond_id in self.positions:
+            return
+
+        position = len(self.ids)
+        bit = 1 << position
+        self.ids.append(cond_id)
+        self.positions[cond_id] = position
+        self.everything |= bit
+
+        for field in self.fields:
+            value = facet_value(field, conditions)
+            self.bitmaps[field][value] = self.bitmaps[field].get(value, 0) | bit
+
+        if self.last_id is None or cond_id > self.last_id:
+            self.last_id = cond_id
+
+    def field_bitmap(self, field, values):
+        bitmap = 0
+        for value in values:
+            bitmap |= self.bitmaps[field].get(value, 0)
+        return bitmap
+
+    def match(self, query, exclude=None):
+        """
+        Returns bitmap of runs matching query
+        :param query: dict field -> list of values (empty list matches nothing)
+        :param exclude: field ignored in query (used for facet counts)
+        """
+        bitmap = self.everything
+        for field, values in query.items():
+            if field != exclude:
+                bitmap &= self.field_bitmap(field, values)
+        return bitmap
+
+    def counts(self, query):
+        """
+        Returns number of matching runs for every value of every facet, counts
+        of a facet are computed with all other facets of the query applied
+        (so selecting one branch still shows counts of other branches)
+        :return: dict field -> dict value -> count
+        """
+        result = dict()
+        for field in self.fields:
+            bitmap = self.match(query, exclude=field)
+            result[field] = dict((value, bit_count(bitmap & values)) for value, values in self.bitmaps[field].items())
+        return result
+
+    def select(self, query):
+        """
+        Returns ids of runs matching query
+        """
+        bitmap = self.match(query)
+        result = list()
+        while bitmap:
+            low = bitmap & -bitmap
+            result.append(self.ids[low.bit_length() - 1])
+            bitmap ^= low
+        return result
+
+    def update(self, mongo, min_interval=0):
+        """
+        Adds runs inserted into database since last update
+        :param min_interval: skip update if last one was less than given
+                             number of seconds ago
+        """
+        with self.lock:
+            now = time.time()
+            if now - self.last_update < min_interval:
+                return self
+            self.last_update = now
+
+            match = { '_id': { '$gt': self.last_id } } if self.last_id is not None else { }
+            fields = [field for field in self.fields if field != 'build-date'] + ['program-build', 'run-started-at']
+            projection = dict((field, True) for field in fields)
+            for conditions in mongo.cond.find(match, projection).sort('_id'):
+                self.add(conditions['_id'], conditions)
+        return self
+
+    def on_ingest(self, cond_id, json_data, tree):
+        """
+        Ingest hook for MongoExec
+        """
+        self.add(cond_id, json_data)
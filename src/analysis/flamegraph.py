@@ -0,0 +1,103 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from analysis.derived import compute_derived
+
+
+def stack_values(tree, metric='self-time'):
+    """
+    Returns dict ist path -> value of given metric, self-time is computed
+    when it is not stored in the tree
+    """
+    if metric == 'self-time' and 'self-time' not in tree.nodes[0]:
+        values = compute_derived(tree)['self-time']
+    else:
+        values = tree.column(metric, 0.0)
+    return dict(zip(tree.paths, values.tolist()))
+
+
+def aggregate(trees, metric='self-time', average=True):
+    """
+    Merges several runs into single dict ist path -> value (mean or sum)
+    """
+    result = dict()
+    for tree in trees:
+        for path, value in stack_values(tree, metric).items():
+            result[path] = result.get(path, 0.0) + value
+
+    if average and trees:
+        for path in result:
+            result[path] /= len(trees)
+    return result
+
+
+def frames(path):
+    """
+    Converts ist path to list of frame names (',a,b,' -> ['a', 'b'])
+    """
+    return path.strip(',').split(',')
+
+
+def collapsed_stacks(values, scale=1e6):
+    """
+    Exports values in collapsed stack format used by flamegraph.pl
+    (one 'frame;frame;frame count' per line), values are scaled to integers
+    (microseconds by default), empty stacks are skipped
+    :param values: dict ist path -> value
+    :return: str
+    """
+    lines = list()
+    for path in sorted(values):
+        count = int(round(values[path] * scale))
+        if count > 0:
+            names = [name.replace(';', ':') for name in frames(path)]
+            lines.append('{:s} {:d}'.format(';'.join(names), count))
+    return '\n'.join(lines) + '\n'
+
+
+def speedscope(values, name='Flow123d'):
+    """
+    Exports values as speedscope sampled profile, each stack is a single
+    sample weighted by its value (in seconds)
+    :param values: dict ist path -> value
+    :return: dict (speedscope json)
+    """
+    frame_index = dict()
+    shared = list()
+    samples = list()
+    weights = list()
+
+    for path in sorted(values):
+        if values[path] <= 0:
+            continue
+
+        stack = list()
+        for frame in frames(path):
+            if frame not in frame_index:
+                frame_index[frame] = len(shared)
+                shared.append({ 'name': frame })
+            stack.append(frame_index[frame])
+        samples.append(stack)
+        weights.append(values[path])
+
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'exporter': 'flow-collector',
+        'name': name,
+        'activeProfileIndex': 0,
+        'shared': { 'frames': shared },
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights
+        }]
+    }
+
+
+formats = {
+    'collapsed': collapsed_stacks,
+    'speedscope': speedscope
+}
@@ -0,0 +1,114 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import warnings
+
+import numpy
+
+from analysis.normalise import score_tests
+
+
+# scale of MAD making it consistent estimate of standard deviation
+mad_scale = 1.4826
+
+
+def performance_matrix(results, tests=score_tests, processes=1):
+    """
+    Builds matrix of clockrate performance of given tests (columns) in all
+    stored runs (rows)
+    :param results: clockrate results sorted by time
+    :param processes: which core count is used
+    :return: numpy array, missing results are NaN
+    """
+    matrix = numpy.full((len(results), len(tests)), numpy.nan)
+    for i, result in enumerate(results):
+        perf = result.get('perf', dict())
+        for j, test in enumerate(tests):
+            for item in perf.get(test, []):
+                if item['processes'] == processes and isinstance(item['performance'], (int, long, float)):
+                    matrix[i, j] = item['performance']
+    return matrix
+
+
+def robust_columns(matrix):
+    """
+    Returns column-wise median and scaled MAD ignoring NaNs
+    """
+    with warnings.catch_warnings():
+        # columns without any value are NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = numpy.nanmedian(matrix, axis=0)
+        mad = mad_scale * numpy.nanmedian(numpy.abs(matrix - median), axis=0)
+    return median, mad
+
+
+def geometric_mean(matrix):
+    """
+    Returns row-wise geometric mean ignoring NaNs
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return numpy.exp(numpy.nanmean(numpy.log(matrix), axis=1))
+
+
+def compare_nodes(histories, tests=score_tests, processes=1, last=5):
+    """
+    Compares nodes using median of their last runs
+    :param histories: dict node name -> clockrate results sorted by time
+    :return: dict with nodes, tests, median (nodes x tests), relative
+             (median divided by median of all nodes) and score (geometric
+             mean of relative performance)
+    """
+    names = sorted(histories)
+    medians = numpy.full((len(names), len(tests)), numpy.nan)
+    runs = list()
+    for i, name in enumerate(names):
+        matrix = performance_matrix(histories[name][-last:], tests, processes)
+        medians[i] = robust_columns(matrix)[0]
+        runs.append(len(matrix))
+
+    reference = robust_columns(medians)[0]
+    relative = medians / reference
+    return {
+        'nodes': names,
+        'tests': list(tests),
+        'runs': runs,
+        'median': medians,
+        'relative': relative,
+        'score': geometric_mean(relative)
+    }
+
+
+def drift(results, tests=score_tests, processes=1, baseline=5, window=3, threshold=0.05, limit=3.0):
+    """
+    Detects node drifting from its own baseline
+    Baseline is formed by first runs of the node, recent performance by the
+    last ones (medians), test drifted when relative change exceeds
+    threshold and the change is larger than limit times baseline noise (MAD)
+    :param results: clockrate results of single node sorted by time
+    :return: dict with baseline, recent, change, z, drifted (test names) and
+             deviation (relative deviation of every run from baseline), or
+             None when there are not enough runs
+    """
+    if len(results) < baseline + window:
+        return None
+
+    matrix = performance_matrix(results, tests, processes)
+    base, noise = robust_columns(matrix[:baseline])
+    recent = robust_columns(matrix[-window:])[0]
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        change = recent / base - 1.0
+        z = (recent - base) / noise
+        z[(noise == 0) & (recent == base)] = 0.0
+        flags = (numpy.abs(change) > threshold) & (numpy.abs(z) > limit)
+        deviation = matrix / base - 1.0
+
+    return {
+        'tests': list(tests),
+        'baseline': base,
+        'recent': recent,
+        'change': change,
+        'z': z,
+        'drifted': [test for test, flag in zip(tests, flags) if flag],
+        'deviation': deviation
+    }
@@ -0,0 +1,121 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import bisect
+import math
+
+
+# single core results of these clockrate tests form node score
+score_tests = ['for-loop', 'factorial', 'hash-sha', 'matrix-creation', 'matrix-solve', 'string-concat']
+normalised_fields = {
+    'cumul-time': 'normalised-time',
+    'self-time': 'normalised-self-time'
+}
+
+
+def single_core(perf, tests=None):
+    """
+    Returns dict test -> single core performance of given score tests
+    (default score_tests) which were run
+    """
+    performances = dict()
+    for test in tests or score_tests:
+        for result in perf.get(test, []):
+            if result['processes'] == 1 and isinstance(result['performance'], (int, long, float)):
+                performances[test] = result['performance']
+    return performances
+
+
+def node_score(perf, tests=None):
+    """
+    Computes node score from clockrate results as geometric mean of single
+    core performance of score_tests (tests which were not run are skipped)
+    :param perf: 'perf' part of clockrate result
+    :param tests: only these tests are used (default score_tests)
+    :return: float or None if no usable test was found
+    """
+    logs = [math.log(value) for value in single_core(perf, tests).values()]
+    return math.exp(sum(logs) / len(logs)) if logs else None
+
+
+def relative_score(perf, reference):
+    """
+    Returns score of node relative to reference node, both scores are
+    computed over score tests the two results have in common (results of
+    runs with different test selection are comparable this way)
+    :param perf: 'perf' part of clockrate result of the node
+    :param reference: 'perf' part of clockrate result of the reference
+    :return: float or None if results have no test in common
+    """
+    common = sorted(set(single_core(perf)) & set(single_core(reference)))
+    if not common:
+        return None
+    return node_score(perf, common) / node_score(reference, common)
+
+
+class Normaliser(object):
+    """
+    Converts profiler timings to hardware independent numbers
+    Each run is linked to clockrate result of the node it ran on (latest
+    result measured before the run started, or the oldest one when node was
+    measured only later) and its timings are scaled by
+    node score / reference score, so values represent time the run would
+    take on the reference node (see relative_score, only tests both nodes
+    ran are compared, runs of nodes without any common test are skipped)
+    Hostname is read from 'run-hostname' field of profiler json, runs
+    without it use hostname given to constructor
+    """
+
+    def __init__(self, mongo, hostname=None, reference=None):
+        self.mongo = mongo
+        self.hostname = hostname
+        self._reference = reference
+        self.nodes = dict()
+
+    @property
+    def reference(self):
+        """
+        Clockrate result of the reference node
+        """
+        if self._reference is None:
+            self._reference = self.mongo.get_reference_result()
+        return self._reference
+
+    def node_results(self, hostname):
+        """
+        Returns tuple (times, results) of given node sorted by time
+        """
+        if hostname not in self.nodes:
+            results = list(self.mongo.get_node_results(hostname))
+            self.nodes[hostname] = [item['measured-at'] for item in results], results
+        return self.nodes[hostname]
+
+    def find_node(self, hostname, when=None):
+        times, results = self.node_results(hostname)
+        if not results:
+            return None
+        if when is None:
+            return results[-1]
+        return results[max(bisect.bisect_right(times, when) - 1, 0)]
+
+    def annotate(self, json_data, tree):
+        """
+        Stores node link to profiler json and normalised columns to tree nodes
+        :return: scale used or None if run cannot be linked to any node
+        """
+        hostname = json_data.get('run-hostname', self.hostname)
+        node = self.find_node(hostname, json_data.get('run-started-at')) if hostname else None
+        if node is None or not self.reference:
+            return None
+
+        scale = relative_score(node['perf'], self.reference['perf'])
+        if scale is None:
+            return None
+        json_data['node-id'] = node['_id']
+        json_data['node-score'] = node['score']
+        json_data['node-scale'] = scale
+
+        for field, normalised in normalised_fields.items():
+            values = (tree.column(field) * scale).tolist()
+            for i, item in enumerate(tree.nodes):
+                item[normalised] = values[i]
+        return scale
@@ -0,0 +1,133 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import json
+import os
+import warnings
+
+import numpy
+
+
+baseline_fields = ['task-description', 'run-process-count', 'program-branch']
+
+
+class RegressionDetector(object):
+    """
+    Compares every node of newly ingested run to baseline distribution of
+    previous runs with same task, process count and branch
+    Baseline is read from MetricsMatrix so no database query is needed,
+    all nodes are tested at once using robust statistics (median and MAD).
+    Node is reported when all thresholds are exceeded:
+        min_ratio   relative slowdown against baseline median
+        min_score   slowdown in robust standard deviations (1.4826 * MAD)
+        min_time    absolute value of the metric (ignores tiny nodes)
+    """
+
+    def __init__(self, store, metric='cumul-time', min_runs=5, max_runs=50, min_ratio=0.1, min_score=3.0,
+                 min_time=1e-3, location=None, summary=10):
+        self.store = store
+        self.metric = metric
+        self.min_runs = min_runs
+        self.max_runs = max_runs
+        self.min_ratio = min_ratio
+        self.min_score = min_score
+        self.min_time = min_time
+        self.location = location
+        self.summary = summary
+
+    def baseline_rows(self, cond_id, conditions):
+        """
+        Returns indices of at most max_runs latest runs with same conditions
+        """
+        mask = numpy.ones(len(self.store.runs), dtype=bool)
+        if not len(mask):
+            return numpy.flatnonzero(mask)
+
+        for field in baseline_fields:
+            mask &= self.store.condition(field) == conditions.get(field)
+
+        row = self.store.run_index.get(str(cond_id))
+        if row is not None:
+            mask[row] = False
+        return numpy.flatnonzero(mask)[-self.max_runs:]
+
+    def detect(self, cond_id, conditions, tree):
+        """
+        Creates regression report for given run
+        :param cond_id: id of the run
+        :param conditions: cond document or whole profiler json
+        :param tree: ProfilerTree of the run
+        :return: dict
+        """
+        report = {
+            'cond_id': str(cond_id),
+            'metric': self.metric,
+            'conditions': dict((field, conditions.get(field)) for field in baseline_fields),
+            'baseline-runs': 0,
+            'regressions': []
+        }
+
+        rows = self.baseline_rows(cond_id, conditions)
+        report['baseline-runs'] = len(rows)
+        if len(rows) < self.min_runs:
+            return report
+
+        # nodes unknown to the store have no baseline
+        known = numpy.array([path in self.store.node_index for path in tree.paths], dtype=bool)
+        paths = [path for path, k in zip(tree.paths, known) if k]
+        columns = numpy.array([self.store.node_index[path] for path in paths], dtype=numpy.int64)
+        values = tree.column(self.metric)[known]
+        baseline = self.store.matrix(self.metric)[rows][:, columns]
+
+        with warnings.catch_warnings():
+            # nodes missing in all baseline runs produce all-NaN columns
+            warnings.simplefilter('ignore', RuntimeWarning)
+            median = numpy.nanmedian(baseline, axis=0)
+            mad = numpy.nanmedian(numpy.abs(baseline - median), axis=0)
+
+            sigma = numpy.maximum(1.4826 * mad, 1e-9)
+            delta = values - median
+            ratio = delta / numpy.where(median > 0, median, numpy.nan)
+            score = delta / sigma
+
+            found = (ratio >= self.min_ratio) & (score >= self.min_score) & (values >= self.min_time)
+
+        for i in numpy.flatnonzero(found)[numpy.argsort(-delta[found])]:
+            report['regressions'].append({
+                'path': paths[i],
+                'value': float(values[i]),
+                'median': float(median[i]),
+                'mad': float(mad[i]),
+                'ratio': float(ratio[i]),
+                'score': float(score[i]),
+                'excess': float(delta[i])
+            })
+        return report
+
+    def save(self, report):
+        if not os.path.exists(self.location):
+            os.makedirs(self.location)
+
+        filename = os.path.join(self.location, 'regression-{:s}.json'.format(report['cond_id']))
+        with open(filename, 'w') as fp:
+            json.dump(report, fp, indent=4, sort_keys=True)
+        return filename
+
+    def print_summary(self, report):
+        regressions = report['regressions']
+        print ":: {:d} regressions in {:s} (baseline {:d} runs)".format(
+            len(regressions), report['cond_id'], report['baseline-runs'])
+        for item in regressions[:self.summary]:
+            print "   {:+7.1%} {:8.2f} sd {:12.6f} s  {:s}".format(
+                item['ratio'], item['score'], item['excess'], item['path'])
+
+    def on_ingest(self, cond_id, json_data, tree):
+        """
+        Ingest hook for MongoExec, ingested run itself is never part of
+        the baseline so order of hooks does not matter
+        """
+        report = self.detect(cond_id, json_data, tree)
+        if self.location:
+            self.save(report)
+        if self.summary:
+            self.print_summary(report)
+        return report
@@ -0,0 +1,90 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import numpy
+
+
+def parent_path(path):
+    """
+    Returns ist id of parent node (',a,b,' -> ',a,'), None for root
+    """
+    parent = path[:path.rstrip(',').rfind(',') + 1]
+    return parent if len(parent) > 1 else None
+
+
+class ProfilerTree(object):
+    """
+    Flat representation of single profiler run
+    Nodes are stored in pre-order (parent always precedes its children) and
+    identified by ist id (same path format as _id in ist collection), tree
+    structure is kept as array of parent indices so metrics of all nodes
+    can be processed at once as numpy columns
+    """
+
+    def __init__(self):
+        self.paths = list()
+        self.nodes = list()
+        self.parent_list = list()
+        self.index = dict()
+        self._parents = None
+
+    def add(self, path, node, parent=-1):
+        self.index[path] = len(self.paths)
+        self.paths.append(path)
+        self.nodes.append(node)
+        self.parent_list.append(parent)
+        self._parents = None
+
+    @property
+    def parents(self):
+        if self._parents is None:
+            self._parents = numpy.array(self.parent_list, dtype=numpy.int64)
+        return self._parents
+
+    def __len__(self):
+        return len(self.paths)
+
+    def column(self, field, default=numpy.nan, dtype=numpy.float64):
+        """
+        Returns values of given field of all nodes as numpy array
+        """
+        return numpy.fromiter((node.get(field, default) for node in self.nodes), dtype=dtype, count=len(self.nodes))
+
+    def children_sum(self, values):
+        """
+        Sums values of direct children for every node
+        """
+        has_parent = self.parents >= 0
+        return numpy.bincount(self.parents[has_parent], weights=values[has_parent], minlength=len(self))
+
+    @classmethod
+    def from_json(cls, json_data):
+        """
+        Creates tree from profiler json, json_data can be whole file or its
+        first child (Whole Program node)
+        """
+        if 'tag' not in json_data:
+            json_data = json_data['children'][0]
+
+        tree = cls()
+        stack = [(json_data, None, -1)]
+        while stack:
+            node, path, parent = stack.pop()
+            path = "{:s}{:s},".format(path, node['tag']) if path else ",{:s},".format(node['tag'])
+            tree.add(path, node, parent)
+
+            parent = len(tree) - 1
+            for child in reversed(node.get('children', [])):
+                stack.append((child, path, parent))
+        return tree
+
+    @classmethod
+    def from_documents(cls, documents):
+        """
+        Creates tree from documents of metrics collection (documents of single
+        run), documents are sorted by ist_id so parents precede children
+        """
+        tree = cls()
+        for document in sorted(documents, key=lambda item: item['ist_id']):
+            parent = tree.index.get(parent_path(document['ist_id']), -1)
+            tree.add(document['ist_id'], document, parent)
+        return tree
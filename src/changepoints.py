@@ -0,0 +1,56 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import json
+from optparse import OptionParser
+
+from analysis.changepoint import detect_change_points
+from analysis.columnar import MetricsMatrix
+from utils.timer import Timer
+
+
+timer = Timer()
+
+
+def create_parser():
+    """Creates command line parse"""
+    parser = OptionParser(usage="%prog [options]",
+                          epilog="Finds revisions which changed performance of ist nodes, history is read from "
+                                 "columnar metrics store (see metrics_store.py)")
+
+    parser.add_option("-l", "--location", dest="location", default="metrics-store", metavar="DIR",
+                      help="Location of the store")
+    parser.add_option("-m", "--metric", dest="metric", default="cumul-time", metavar="METRIC",
+                      help="Analysed metric")
+    parser.add_option("-p", "--processes", dest="processes", default=None, type="int", metavar="N",
+                      help="Number of worker processes, by default number of cores")
+    parser.add_option("-s", "--min-size", dest="min_size", default=3, type="int", metavar="N",
+                      help="Minimal number of runs between two change points")
+    parser.add_option("--penalty", dest="penalty", default=None, type="float", metavar="VALUE",
+                      help="Minimal decrease of squared error for a split, estimated from data by default")
+    parser.add_option("-n", "--top", dest="top", default=20, type="int", metavar="N",
+                      help="Number of printed changes")
+    parser.add_option("-o", "--output", dest="output", default=None, metavar="FILE",
+                      help="Save all changes to json file")
+    return parser
+
+
+def main():
+    parser = create_parser()
+    (options, args) = parser.parse_args()
+
+    store = MetricsMatrix(options.location)
+    with timer.measured('detecting change points in {:d} runs x {:d} nodes'.format(len(store.runs),
+                                                                                    len(store.nodes))):
+        changes = detect_change_points(store, options.metric, options.processes, options.min_size, options.penalty)
+
+    for item in changes[:options.top]:
+        print "{:+7.1%} {:12.6f} s  {:24s} {:s}".format(
+            item['relative'], item['magnitude'], item['revision'], item['node'])
+
+    if options.output:
+        with open(options.output, 'w') as fp:
+            json.dump(changes, fp, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
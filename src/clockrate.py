@@ -1,9 +1,10 @@
 # encoding: utf-8
 # author:   Jan Hybs
 
+from fnmatch import fnmatch
 from optparse import OptionParser
+import datetime
 import time
-import re
 import json
 import platform
 from subprocess import check_output
@@ -11,9 +12,19 @@ from subprocess import check_output
 from perf.factorial import Factorial
 from perf.forloop import ForLoop
 from perf.hashsha import HashSHA
+from perf.latency import PointerChase, working_sets
 from perf.matrixcreate import MatrixCreate
 from perf.matrixsolve import MatrixSolve
+from perf.backends import backends
+from perf.scaling import sweeps, cost_curve, parallel_scaling
+from perf.timeline import analyse
+from perf.storage import SequentialWrite, SequentialRead, RandomRead, ReadScan, MmapScan, FsyncLatency
+from perf.stream import StreamCopy, StreamScale, StreamAdd, StreamTriad
 from perf.stringconcat import StringConcat
+from utils.clock import clock_name, monotonic
+from utils.nodeinfo import node_info, fingerprint
+from utils.robust import summary
+from utils.topology import read_topology, pin_order, get_affinity
 from utils.strings import human_readable
 
 
@@ -44,80 +55,184 @@ timer = Timer()
 
 
 class BenchmarkMeasurement(object):
-    def __init__(self):
+    def __init__(self, backend='process'):
         self.timeout = .5
         self.tries = 3
         self.processes = 1
+        # process pool, threads or single process with N BLAS threads
+        self.backend = backend
+        self.pool = backends[backend]()
+
+        # adaptive mode repeats tries until median is known precisely enough
+        self.adaptive = False
+        self.ci_width = 0.02
+        self.confidence = 0.95
+        self.budget = 10.0
+        self.max_tries = 50
+
+    def run_once(self, cls, no_cpu, timeout, params=None):
+        # workers are already running and warmed up, they start
+        # together and measure only the test itself
+        workers = self.pool.run(cls, no_cpu, timeout, params)
+        starts = pluck(workers, 'started')
+
+        # warm-up phase of every worker is excluded from performance
+        timelines = [analyse(w['timeline']['time'], w['timeline']['count']) for w in workers]
+
+        tmp = dict()
+        tmp['duration'] = sum(pluck(workers, 'duration')) / len(workers)
+        tmp['value'] = sum(pluck(workers, 'value'))
+        # every worker ran until it was stopped (test did not end on its own)
+        tmp['exit'] = all(pluck(workers, 'stopped'))
+        tmp['performance'] = sum(pluck(timelines, 'performance'))
+        tmp['performance-raw'] = sum(w['value'] / w['duration'] for w in workers)
+        tmp['warmup'] = sum(pluck(timelines, 'warmup')) / len(timelines)
+        tmp['skew'] = max(starts) - min(starts)
+        tmp['timeline'] = {
+            'time': timelines[0]['time'],
+            'throughput': pluck(timelines, 'throughput')
+        }
+        return tmp
+
+    def repeat(self, cls, no_cpu, timeout, tries, pb, params=None):
+        results = list()
+        for i in range(0, tries):
+            if print_output:
+                pb.progress(i)
+            results.append(self.run_once(cls, no_cpu, timeout, params))
+        return results, None
+
+    def repeat_adaptive(self, cls, no_cpu, timeout, pb, params=None):
+        """
+        Repeats tries until relative width of median confidence interval
+        drops below ci_width, time budget runs out or max_tries is reached
+        """
+        results = list()
+        stats = None
+        started = monotonic()
+        while len(results) < self.max_tries:
+            if print_output:
+                pb.progress(len(results))
+            results.append(self.run_once(cls, no_cpu, timeout, params))
+
+            stats = summary(pluck(results, 'performance'), self.confidence)
+            stats['converged'] = stats['ci-width'] is not None and stats['ci-width'] <= self.ci_width
+            if stats['converged'] or monotonic() - started >= self.budget:
+                break
+        return results, stats
 
-    def measure(self, cls, name, timeout=None, tries=None, processes=None):
+    def measure(self, cls, name, timeout=None, tries=None, processes=None, params=None):
         timeout = timeout if timeout is not None else self.timeout
         tries = tries if tries is not None else self.tries
         processes = processes if processes is not None else self.processes
 
-        pb = ProgressBar(maximum=tries, width=30, prefix="{self.name:25}",
+        pb = ProgressBar(maximum=self.max_tries if self.adaptive else tries, width=30, prefix="{self.name:25}",
                          suffix=" {self.last_progress}/{self.maximum}")
 
         measure_result = list()
         for no_cpu in processes:
             pb.name = "{:s} {:d} {:s}".format(name, no_cpu, 'core' if no_cpu == 1 else 'cores')
-            results = list()
-            for i in range(0, tries):
-                if print_output:
-                    pb.progress(i)
-
-                targets = [cls() for j in range(0, no_cpu)]
-
-                with timer.measured("{:s} {:d}".format(name, i), False):
-                    # start processes
-                    for target in targets:
-                        target.start()
-
-                    # wait for timeout
-                    time.sleep(timeout)
-
-                    # send exit status
-                    for target in targets:
-                        target.shutdown()
-
-                    # join threads
-                    for target in targets:
-                        target.join()
-
-                tmp = dict()
-                tmp['duration'] = timer.time()
-                tmp['value'] = sum(pluck(targets, 'result.value'))
-                tmp['exit'] = not max(pluck(targets, 'terminated'))
-                results.append(tmp)
+            if self.adaptive:
+                results, stats = self.repeat_adaptive(cls, no_cpu, timeout, pb, params)
+            else:
+                results, stats = self.repeat(cls, no_cpu, timeout, tries, pb, params)
+            count = float(len(results))
 
             if print_output:
                 pb.end()
 
             result = dict()
             result['processes'] = no_cpu
-            result['exit'] = min(pluck(results, 'exit'))
-            result['duration'] = sum(pluck(results, 'duration')) / float(tries)
-            result['value'] = sum(pluck(results, 'value')) / float(tries)
-            result['performance'] = result['value'] / result['duration']
+            result['exit'] = all(pluck(results, 'exit'))
+            result['tries'] = len(results)
+            result['duration'] = sum(pluck(results, 'duration')) / count
+            result['value'] = sum(pluck(results, 'value')) / count
+            result['performance'] = sum(pluck(results, 'performance')) / count
+            result['performance-raw'] = sum(pluck(results, 'performance-raw')) / count
+            result['warmup'] = sum(pluck(results, 'warmup')) / count
+            result['skew'] = max(pluck(results, 'skew'))
+            # throughput of every worker in time (last try)
+            result['timeline'] = results[-1]['timeline']
+            result['clock'] = clock_name
+            result['backend'] = self.backend
+
+            if stats is not None:
+                # median is stable on noisy nodes unlike the mean
+                result['robust'] = stats
+                result['performance-mean'] = result['performance']
+                result['performance'] = stats['median']
 
 
             if human_format:
                 result['value'] = human_readable(result['value'])
                 result['performance'] = human_readable(result['performance'])
+                result['performance-raw'] = human_readable(result['performance-raw'])
 
             measure_result.append(result)
 
         return measure_result
 
+    def close(self):
+        self.pool.close()
 
-    def configure(self, timeout, tries, processes):
+    def configure(self, timeout, tries, processes, interval=0.01):
         self.timeout = timeout
         self.tries = tries
         self.processes = processes if type(processes) is list else [processes]
+        self.pool.interval = interval
+
+    def configure_adaptive(self, ci_width, confidence, budget, max_tries):
+        self.adaptive = True
+        self.ci_width = ci_width
+        self.confidence = confidence
+        self.budget = budget
+        self.max_tries = max_tries
+
+    def measure_latency(self, name, sizes=None):
+        """
+        Measures pointer chasing over growing working sets
+        :return: list of results with working-set (bytes), latency (ns per
+                 access including interpreter) and latency-excess (over the
+                 smallest working set)
+        """
+        measure_result = list()
+        smallest = dict()
+        for size in sizes or working_sets:
+            label = "{:s} {:d} kB".format(name, size // 1024)
+            for result in self.measure(PointerChase, label, params={ 'size': size }):
+                result['working-set'] = size
+                if isinstance(result['performance'], float) and result['performance'] > 0:
+                    result['latency'] = 1e9 * result['processes'] / result['performance']
+                    smallest.setdefault(result['processes'], result['latency'])
+                    result['latency-excess'] = result['latency'] - smallest[result['processes']]
+                measure_result.append(result)
+        return measure_result
+
+    def measure_scaling(self, name, cls, sizes):
+        """
+        Measures single core performance of test with variable problem size
+        over given sizes and fits its cost curve (see perf.scaling)
+        """
+        performances = list()
+        for size in sizes:
+            label = "{:s} n={:d}".format(name, size)
+            result = self.measure(cls, label, processes=[1], params={ 'size': size })[0]
+            # whole window is used, large sizes do only few calls per try
+            performances.append(result['performance-raw'])
+        return cost_curve(sizes, performances, self.timeout)
 
 
 print_output = True
 human_format = False
-all_tests = set(['for-loop', 'factorial', 'hash-sha', 'matrix-creation', 'matrix-solve', 'string-concat'])
+all_tests = set(['for-loop', 'factorial', 'hash-sha', 'matrix-creation', 'matrix-solve', 'string-concat',
+                 'stream-copy', 'stream-scale', 'stream-add', 'stream-triad', 'memory-latency'])
+# storage tests write --io-size MB per worker, they run only when included explicitly (e.g. -i 'io-*')
+storage_tests = set(['io-seq-write', 'io-seq-read', 'io-random-read', 'io-read-scan', 'io-mmap-scan', 'io-fsync'])
+
+
+def select_tests(patterns, names):
+    """Returns names matching any of given shell patterns (e.g. io-*)"""
+    return set(name for name in names if any(fnmatch(name, pattern) for pattern in patterns))
 
 
 def create_parser():
@@ -125,9 +240,10 @@ def create_parser():
     parser = OptionParser()
 
     parser.add_option("-i", "--include", dest="includes", metavar="TESTNAME", default=[], action="append",
-                      help="Turn on specific perf, by default all perf are included")
+                      help="Turn on specific perf (shell patterns such as 'io-*' are accepted), by default " +
+                           "all perf except storage tests (io-*) are included")
     parser.add_option("-x", "--exclude", dest="excludes", metavar="TESTNAME", default=[], action="append",
-                      help="Turn off specific perf")
+                      help="Turn off specific perf (shell patterns are accepted)")
     parser.add_option("-c", "--core", dest="cores", metavar="CORE", default=[], action="append",
                       help="Try test with this amount of core, by default 1...N, where N is maximum cores available")
 
@@ -135,10 +251,40 @@ def create_parser():
                       help="Maximum duration per one test case")
     parser.add_option("-t", "--tries", dest="tries", metavar="TRIES", default=2,
                       help="Number of tries for each test")
+    parser.add_option("-I", "--interval", dest="interval", metavar="SECONDS", default=0.01,
+                      help="Sampling interval of throughput timelines")
+    parser.add_option("--io-dir", dest="io_dir", metavar="DIR", default=None,
+                      help="Directory for storage tests, by default system temporary directory")
+    parser.add_option("--io-size", dest="io_size", metavar="MB", default=128, type="int",
+                      help="Size of file used by every worker in storage tests")
+    parser.add_option("-b", "--backend", dest="backends", metavar="BACKEND", default=[], action="append",
+                      choices=sorted(backends),
+                      help="Run tests in processes (default), threads of single process or in single process " +
+                           "with N BLAS threads (blas, N is the core count), can be repeated to compare backends")
+    parser.add_option("-P", "--pin", dest="pin", default=False, action="store_true",
+                      help="Pin workers to cpus following topology (physical cores, SMT siblings, other NUMA nodes)")
+    parser.add_option("-S", "--scaling", dest="scaling", default=False, action="store_true",
+                      help="Run included tests over growing problem sizes, fit their cost curves and find knee points")
+    parser.add_option("-a", "--adaptive", dest="adaptive", default=False, action="store_true",
+                      help="Repeat each test until confidence interval of median performance is narrow enough " +
+                           "(--tries is ignored), reports median, MAD, CI and outliers")
+    parser.add_option("--ci-width", dest="ci_width", metavar="RATIO", default=0.02, type="float",
+                      help="Target width of median confidence interval relative to median")
+    parser.add_option("--confidence", dest="confidence", metavar="LEVEL", default=0.95, type="float",
+                      help="Confidence level of median interval")
+    parser.add_option("--budget", dest="budget", metavar="SECONDS", default=10.0, type="float",
+                      help="Maximum time spent on single test and core count in adaptive mode")
+    parser.add_option("--max-tries", dest="max_tries", metavar="TRIES", default=50, type="int",
+                      help="Maximum number of tries in adaptive mode")
     parser.add_option("-q", "--quiet", dest="quiet", default=True, action="store_false",
                       help="Do not print any output")
     parser.add_option("-H", "--human", dest="human", default=False, action="store_true",
                       help="Output in human-readable format")
+    parser.add_option("-s", "--store", dest="store", default=False, action="store_true",
+                      help="Append results to node history in collector database (used for normalisation of " +
+                           "profiler timings and by node_history.py), history is recorded only with this option")
+    parser.add_option("-o", "--output", dest="output", metavar="FILE", default="node_test.json",
+                      help="File with results of the last run, overwritten on every run (default %default)")
 
     parser.set_usage("""%prog [options]""")
     return parser
@@ -150,28 +296,128 @@ def parse_args(parser):
     """Parses argument using given parses and check resulting value combination"""
     (options, args) = parser.parse_args()
 
-    includes = set(options.includes) if options.includes else all_tests.copy()
+    includes = select_tests(options.includes, all_tests | storage_tests) if options.includes else all_tests.copy()
     if options.excludes:
-        includes = includes - set(options.excludes)
+        includes = includes - select_tests(options.excludes, all_tests | storage_tests)
+
+    options.backends = options.backends or ['process']
+
+    options.cpus = None
+    if options.pin:
+        allowed = get_affinity()
+        options.cpus = [cpu for cpu in pin_order(read_topology()) if allowed is None or cpu in allowed]
+        assert options.cpus, 'Topology of cpus is not available'
 
     if not options.cores:
-        options.cores = range(1, cpu_count(logical=True) + 1)
+        # psutil counts all cpus, not only those the process may run on (cpuset)
+        allowed = options.cpus or get_affinity() or range(cpu_count(logical=True) or 1)
+        options.cores = range(1, len(allowed) + 1)
     else:
         options.cores = [int(value) for value in options.cores]
 
+    if options.cpus and max(options.cores) > len(options.cpus):
+        # pinned workers would share cpus
+        if options.quiet:
+            print ":: only {:d} cpus can be pinned, skipping core counts {:s}".format(
+                len(options.cpus), ', '.join(str(cores) for cores in options.cores if cores > len(options.cpus)))
+        options.cores = [cores for cores in options.cores if cores <= len(options.cpus)]
+        assert options.cores, 'No core count can be pinned'
+
     if options.human:
         human_format = True
 
     options.tries = int(options.tries)
     options.timeout = float(options.timeout)
+    options.interval = float(options.interval)
     print_output = options.quiet
 
+    assert not (options.human and options.store), 'Human-readable results cannot be stored'
+    assert not (options.human and options.scaling), 'Scaling mode needs numeric results'
     assert options.tries > 0, 'Number of tries must be positive integer'
     assert options.timeout > 0, 'Timeout value must be positive number'
+    assert options.interval > 0, 'Sampling interval must be positive number'
+    assert options.io_size > 0, 'Size of storage test file must be positive'
+    assert includes, 'No test matches given names'
+    assert 0 < options.confidence < 1, 'Confidence level must be between 0 and 1'
+    assert options.max_tries > 0, 'Number of tries must be positive integer'
 
     return options, args, includes
 
 
+def run_tests(measurement, includes, options):
+    """
+    Runs all included tests
+    :return: tuple (test results, scaling results)
+    """
+    test_results = dict()
+    if 'for-loop' in includes:
+        test_results['for-loop'] = measurement.measure(ForLoop, 'For loop')
+
+    if 'factorial' in includes:
+        test_results['factorial'] = measurement.measure(Factorial, 'Factorial')
+
+    if 'hash-sha' in includes:
+        test_results['hash-sha'] = measurement.measure(HashSHA, 'Hash')
+
+    if 'matrix-creation' in includes:
+        test_results['matrix-creation'] = measurement.measure(MatrixCreate, 'Matrix create')
+
+    if 'matrix-solve' in includes:
+        test_results['matrix-solve'] = measurement.measure(MatrixSolve, 'Matrix solve')
+
+    if 'string-concat' in includes:
+        test_results['string-concat'] = measurement.measure(StringConcat, 'String concat')
+
+    # memory bandwidth (bytes per second)
+    if 'stream-copy' in includes:
+        test_results['stream-copy'] = measurement.measure(StreamCopy, 'Stream copy')
+
+    if 'stream-scale' in includes:
+        test_results['stream-scale'] = measurement.measure(StreamScale, 'Stream scale')
+
+    if 'stream-add' in includes:
+        test_results['stream-add'] = measurement.measure(StreamAdd, 'Stream add')
+
+    if 'stream-triad' in includes:
+        test_results['stream-triad'] = measurement.measure(StreamTriad, 'Stream triad')
+
+    # memory latency (accesses per second)
+    if 'memory-latency' in includes:
+        test_results['memory-latency'] = measurement.measure_latency('Latency')
+
+    # storage (bytes or operations per second), every worker uses own file
+    storage = { 'directory': options.io_dir, 'size': options.io_size * 1024 * 1024 }
+    if 'io-seq-write' in includes:
+        test_results['io-seq-write'] = measurement.measure(SequentialWrite, 'IO write', params=storage)
+
+    if 'io-seq-read' in includes:
+        test_results['io-seq-read'] = measurement.measure(SequentialRead, 'IO read', params=storage)
+
+    if 'io-random-read' in includes:
+        test_results['io-random-read'] = measurement.measure(RandomRead, 'IO random read 4k', params=storage)
+
+    if 'io-read-scan' in includes:
+        test_results['io-read-scan'] = measurement.measure(ReadScan, 'IO read() scan', params=storage)
+
+    if 'io-mmap-scan' in includes:
+        test_results['io-mmap-scan'] = measurement.measure(MmapScan, 'IO mmap scan', params=storage)
+
+    if 'io-fsync' in includes:
+        test_results['io-fsync'] = measurement.measure(FsyncLatency, 'IO fsync', params=storage)
+        for result in test_results['io-fsync']:
+            if isinstance(result['performance'], float) and result['performance'] > 0:
+                # ms per fsync of single worker
+                result['latency'] = 1e3 * result['processes'] / result['performance']
+
+    # cost curves of tests with variable problem size
+    scaling = dict()
+    if options.scaling:
+        for name in sorted(includes):
+            if name in sweeps:
+                scaling[name] = measurement.measure_scaling(name, *sweeps[name])
+    return test_results, scaling
+
+
 def main():
     parser = create_parser()
     (options, args, includes) = parse_args(parser)
@@ -182,83 +428,98 @@ def main():
                 print "{:-^55}".format("Running perf")
                 print "{:-^55}".format(str(includes))
 
-            measurement = BenchmarkMeasurement()
-            measurement.configure(options.timeout, options.tries, options.cores)
+            backend_results = dict()
+            for backend in options.backends:
+                if print_output and len(options.backends) > 1:
+                    print "{:-^55}".format(" backend " + backend + " ")
 
-            test_results = dict()
-            if 'for-loop' in includes:
-                test_results['for-loop'] = measurement.measure(ForLoop, 'For loop')
+                measurement = BenchmarkMeasurement(backend)
+                measurement.configure(options.timeout, options.tries, options.cores, options.interval)
+                measurement.pool.cpus = options.cpus
+                if options.adaptive:
+                    measurement.configure_adaptive(options.ci_width, options.confidence, options.budget,
+                                                   options.max_tries)
 
-            if 'factorial' in includes:
-                test_results['factorial'] = measurement.measure(Factorial, 'Factorial')
-
-            if 'hash-sha' in includes:
-                test_results['hash-sha'] = measurement.measure(HashSHA, 'Hash')
-
-            if 'matrix-creation' in includes:
-                test_results['matrix-creation'] = measurement.measure(MatrixCreate, 'Matrix create')
-
-            if 'matrix-solve' in includes:
-                test_results['matrix-solve'] = measurement.measure(MatrixSolve, 'Matrix solve')
+                try:
+                    backend_results[backend] = run_tests(measurement, includes, options)
+                finally:
+                    measurement.close()
 
-            if 'string-concat' in includes:
-                test_results['string-concat'] = measurement.measure(StringConcat, 'String concat')
+            # first backend is the main result (used for node score)
+            test_results, scaling = backend_results[options.backends[0]]
 
             if print_output:
                 print "\n{:-^55}".format("Getting node info")
 
-            info = dict()
-            info['memory'] = dict()
-            info['memory']['total'] = virtual_memory().total
-            info['memory']['avail'] = virtual_memory().available
-
-            # info['disk'] = [psutil.disk_partitions()]
-            info['cpu'] = dict()
-            info['cpu']['physical'] = cpu_count(logical=False)
-            info['cpu']['logical'] = cpu_count(logical=True)
-            info['cpu']['architecture'] = platform.processor()
             if platform.system() == 'Linux':
-                cpu_info = check_output('cat /proc/cpuinfo', shell=True).split('\n')
-                for line in cpu_info:
-                    if "model name" in line:
-                        info['cpu']['name'] = re.sub(".*model name.*:", "", line, 1).strip()
-                    if "cpu MHz" in line:
-                        info['cpu']['frequency'] = float(re.sub(".*cpu MHz.*:", "", line, 1).strip())
-
-
-            elif platform.system() == 'Windows':
-                cpu_freq = check_output('wmic cpu get MaxClockSpeed', shell=True)
-                cpu_freq = cpu_freq.replace('\n', '').replace('MaxClockSpeed', '').strip()
-                info['cpu']['frequency'] = int(cpu_freq)
-
-                cpu_name = check_output('wmic cpu get Caption', shell=True)
-                cpu_name = cpu_name.replace('\n', '').replace('Caption', '').strip()
-                info['cpu']['name'] = cpu_name
-
-            info['system'] = dict()
-            info['system']['platform'] = platform.system()
-            info['system']['processor'] = platform.processor()
-            info['system']['version'] = platform.version()
-            info['system']['machine'] = platform.machine()
-            info['system']['node'] = platform.node()
-            info['system']['release'] = platform.release()
-
-            clockrate_result = { 'architecture': info, 'perf': test_results }
-
+                # read from /proc and /sys, cached for the current boot
+                info = node_info()
+            else:
+                info = dict()
+                info['memory'] = dict()
+                info['memory']['total'] = virtual_memory().total
+                info['memory']['avail'] = virtual_memory().available
+
+                info['cpu'] = dict()
+                info['cpu']['physical'] = cpu_count(logical=False)
+                info['cpu']['logical'] = cpu_count(logical=True)
+                info['cpu']['architecture'] = platform.processor()
+
+                if platform.system() == 'Windows':
+                    cpu_freq = check_output('wmic cpu get MaxClockSpeed', shell=True)
+                    cpu_freq = cpu_freq.replace('\n', '').replace('MaxClockSpeed', '').strip()
+                    info['cpu']['frequency'] = int(cpu_freq)
+
+                    cpu_name = check_output('wmic cpu get Caption', shell=True)
+                    cpu_name = cpu_name.replace('\n', '').replace('Caption', '').strip()
+                    info['cpu']['name'] = cpu_name
+
+                info['system'] = dict()
+                info['system']['platform'] = platform.system()
+                info['system']['processor'] = platform.processor()
+                info['system']['version'] = platform.version()
+                info['system']['machine'] = platform.machine()
+                info['system']['node'] = platform.node()
+                info['system']['release'] = platform.release()
+                info['fingerprint'] = fingerprint(info)
+            info['cpu']['pinning'] = options.cpus
+
+            clockrate_result = { 'architecture': info, 'perf': test_results, 'backend': options.backends[0] }
+            if scaling:
+                clockrate_result['scaling'] = scaling
+            if len(options.backends) > 1:
+                clockrate_result['backends'] = dict((backend, results[0])
+                                                    for backend, results in backend_results.items())
+
+            # speedup and efficiency of every test measured on more core counts
+            if not human_format:
+                parallel = dict()
+                for name, results in test_results.items():
+                    if name != 'memory-latency' and len(results) > 1:
+                        parallel[name] = parallel_scaling(results)
+                parallel = dict((name, value) for name, value in parallel.items() if value)
+                if parallel:
+                    clockrate_result['parallel'] = parallel
+
+            if options.store:
+                from mongodb.mongo_exec import MongoExec
+
+                mongo = MongoExec(cache=False)
+                stored = clockrate_result.copy()
+                stored['measured-at'] = datetime.datetime.now()
+                mongo.insert_node_result(stored)
+                mongo.close()
+
+            output = json.dumps(clockrate_result, indent=4, sort_keys=True)
             try:
-                with open('node_test.json', 'w+') as fp:
-                    json.dump(clockrate_result, fp, indent=4, sort_keys=True)
+                with open(options.output, 'w+') as fp:
+                    fp.write(output)
             except Exception as er:
                 print 'Error while saving file'
                 raise er
 
             if print_output:
-                try:
-                    with open('node_test.json', 'r+') as fp:
-                        print fp.read()
-                except Exception as er:
-                    print 'Error while reading file'
-                    raise er
+                print output
 
             if print_output:
                 print "\n{:-^55}".format("Benchmark test finished")
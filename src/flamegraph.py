@@ -0,0 +1,52 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import json
+from optparse import OptionParser
+
+from analysis.flamegraph import aggregate, collapsed_stacks, speedscope, formats
+from analysis.tree import ProfilerTree
+from utils.decoder import ProfilerJSONDecoder
+
+
+def create_parser():
+    """Creates command line parse"""
+    parser = OptionParser(usage="%prog [options] file1 [file2 ... filen]",
+                          epilog="Exports profiler run (or average of several runs) as flame graph. " +
+                                 "Collapsed stacks can be processed by flamegraph.pl, speedscope json can be " +
+                                 "opened at https://www.speedscope.app")
+
+    parser.add_option("-f", "--format", dest="format", default="collapsed", metavar="FORMAT",
+                      choices=sorted(formats), help="Output format, one of {:s}".format(', '.join(sorted(formats))))
+    parser.add_option("-m", "--metric", dest="metric", default="self-time", metavar="METRIC",
+                      help="Metric used as stack weight")
+    parser.add_option("-o", "--output", dest="output", default=None, metavar="FILE",
+                      help="Output file, by default standard output")
+    return parser
+
+
+def main():
+    parser = create_parser()
+    (options, args) = parser.parse_args()
+    if not args:
+        parser.error('no file specified')
+
+    trees = list()
+    for filename in args:
+        with open(filename, 'r') as fp:
+            trees.append(ProfilerTree.from_json(json.loads(fp.read(), encoding="utf-8", cls=ProfilerJSONDecoder)))
+
+    values = aggregate(trees, options.metric)
+    if options.format == 'collapsed':
+        output = collapsed_stacks(values)
+    else:
+        output = json.dumps(speedscope(values, ', '.join(args)))
+
+    if options.output:
+        with open(options.output, 'w') as fp:
+            fp.write(output)
+    else:
+        print output
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,6 @@ import filecmp
 import json
 from optparse import OptionParser
 import os
-import sys
 
 from mongodb.mongo_exec import MongoExec
 from utils.decoder import ProfilerJSONDecoder
@@ -13,8 +12,6 @@ from utils.timer import Timer
 
 def_dir = '/var/www/html/flow-collector-arts/2015-07-28_11-12-25/tests/02_transport_12d'
 # def_dir = '/var/www/html/flow-collector-arts/'
-commit_data = False
-# commit_data = True
 # ModCls = MySQLExec
 ModCls = MongoExec
 
@@ -27,20 +24,39 @@ def create_parser():
                           epilog="If no files are specified all json files in current directory will be selected. \n" +
                                  "Useful when there is not known precise file name only location")
 
-    parser.add_option("-d", "--directory", dest="dirs", default=[def_dir], action="append",
+    parser.add_option("-d", "--directory", dest="dirs", default=[], action="append",
                       help="Directory to be searched", metavar="DIR")
     #
-    parser.add_option("-f", "--file", dest="files", default=['../data/example.json'], action="append",
-                      help="Directory to be searched", metavar="FILE")
+    parser.add_option("-f", "--file", dest="files", default=[], action="append",
+                      help="File to be processed", metavar="FILE")
     parser.add_option("-n", "--non-recursive", dest="non_recursive", default=False, action='store_true',
                       help="Disallow recursive search", metavar="")
+    parser.add_option("-s", "--store", dest="store", default=None,
+                      help="Append processed runs to columnar metrics store in DIR", metavar="DIR")
+    parser.add_option("-H", "--hostname", dest="hostname", default=None,
+                      help="Node the runs were measured on (unless stored in files as run-hostname), " +
+                           "used to normalise timings using clockrate results of the node", metavar="HOST")
+    parser.add_option("-r", "--regressions", dest="regressions", default=None,
+                      help="Compare processed runs to baseline from store and save reports to DIR", metavar="DIR")
+    parser.add_option("--regression-ratio", dest="regression_ratio", default=0.1, type="float",
+                      help="Minimal relative slowdown reported as regression", metavar="RATIO")
+    parser.add_option("--regression-score", dest="regression_score", default=3.0, type="float",
+                      help="Minimal slowdown in robust standard deviations", metavar="SCORE")
+    parser.add_option("-p", "--partition", dest="partition", default=None,
+                      choices=['month', 'branch', 'branch-month'],
+                      help="Store metrics in collection per month, branch or both", metavar="SCHEME")
+    parser.add_option("-c", "--check", dest="check", default=None,
+                      help="Only report broken profiler files in every subdirectory of DIR", metavar="DIR")
     return parser
 
 
 def parse_args(parser):
     """Parses argument using given parses and check resulting value combination"""
     (options, args) = parser.parse_args()
-    # for now, no check needed
+    options.files.extend(args)
+    if not options.files and not options.dirs:
+        options.files = ['../data/example.json']
+        options.dirs = [def_dir]
     return (options, args)
 
 
@@ -143,16 +159,12 @@ class Runner(object):
                 fp.write("{:d},{:1.6f}\n".format(i, avg))
 
 
-
-if __name__ == '__main__':
-    rootdir = '/home/jenk/flow-collector-arts'
-    dirs = os.listdir(rootdir)
-    dirs.sort()
-    # dirs.reverse()
-    for test_dir in dirs:
+def check_files(rootdir):
+    """Reports number of broken profiler files in every subdirectory of rootdir"""
+    runner = Runner(None)
+    for test_dir in sorted(os.listdir(rootdir)):
         if os.path.isfile(os.path.join(rootdir, test_dir)):
             continue
-        runner = Runner(None)
 
         json_files = []
         for root, subdir, files in os.walk(os.path.join(rootdir, test_dir)):
@@ -161,37 +173,40 @@ if __name__ == '__main__':
                 if filename.lower().endswith('.json') and filename.lower().startswith('profiler_'):
                     json_files.append(file_path)
 
-        correct_files = []
-        broken_files  = []
-        for json_file in json_files:
-            try:
-                data = runner.read_file(json_file)
-                if data is None:
-                    raise Exception
-                correct_files.append(json_file)
-            except Exception:
-                broken_files.append(json_file)
-
+        broken_files = [json_file for json_file in json_files if runner.read_file(json_file) is None]
         print "{:32s} {:3d}/{:3d}".format(test_dir, len(broken_files), len(json_files))
         if len(broken_files) == 2:
             print broken_files
-        # print '\n'.join(broken_files)
-
 
 
-sys.exit()
-if __name__ == '__main__':
+def main():
     parser = create_parser()
     (options, args) = parse_args(parser)
 
-    mongo = MongoExec()
-    # for item in mongo.cond.find({"run-process-count" : 1}): #
-    # print item
-
+    if options.check:
+        check_files(options.check)
+        return
 
     with timer.measured('WHOLE PROCESS'):
         with timer.measured('open connection'):
-            runner = Runner(ModCls(), options, args)
+            runner = Runner(ModCls(partition_by=options.partition), options, args)
+
+        from analysis.normalise import Normaliser
+        runner.module.normaliser = Normaliser(runner.module, options.hostname)
+
+        if options.store:
+            from analysis.columnar import MetricsMatrix
+            store = MetricsMatrix(options.store)
+
+            if options.regressions:
+                from analysis.regression import RegressionDetector
+                detector = RegressionDetector(store, location=options.regressions,
+                                              min_ratio=options.regression_ratio,
+                                              min_score=options.regression_score)
+                runner.module.add_ingest_hook(detector.on_ingest)
+            runner.module.add_ingest_hook(store.on_ingest)
+            # store files are rewritten once per batch, not per file
+            runner.module.add_commit_hook(store.flush)
 
         with timer.measured('fetching files'):
             runner.fetch_files(options)
@@ -203,12 +218,12 @@ if __name__ == '__main__':
         with timer.measured('loading json files'):
             runner.read_files(runner.get_json_files())
 
-        # with timer.measured('processing all files'):
-        #     runner.process_all_files(runner.get_json_data())
+        with timer.measured('processing all files'):
+            runner.process_all_files(runner.get_json_data())
 
         with timer.measured('committing changes'):
-            if commit_data:
-                runner.module.commit()
+            # readers drop their cached results
+            runner.module.commit()
 
         with timer.measured('closing connection'):
             runner.module.close()
@@ -218,3 +233,5 @@ if __name__ == '__main__':
         print ":: {:d} broken files from total of {:d}".format(len(runner.json_files_broken), len(runner.json_files_distinct))
 
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from optparse import OptionParser
+
+from analysis.columnar import MetricsMatrix
+from mongodb.mongo_exec import MongoExec
+from utils.timer import Timer
+
+
+timer = Timer()
+
+
+def create_parser():
+    """Creates command line parse"""
+    parser = OptionParser(usage="%prog [options]",
+                          epilog="Maintains memory mapped runs x nodes matrices of all runs stored in database")
+
+    parser.add_option("-l", "--location", dest="location", default="metrics-store", metavar="DIR",
+                      help="Location of the store")
+    parser.add_option("-u", "--update", dest="update", default=False, action="store_true",
+                      help="Append runs missing in the store")
+    parser.add_option("-m", "--metric", dest="metrics", default=[], action="append", metavar="METRIC",
+                      help="Stored metric (only when creating new store), can be repeated")
+    return parser
+
+
+def update(store, mongo):
+    """Appends all runs from database which are not in the store yet"""
+    added = 0
+    for cond in mongo.cond.find().sort('_id'):
+        # raw metrics of rolled up runs are gone
+        if str(cond['_id']) in store.run_index or cond.get('rolled-up'):
+            continue
+        store.append(cond['_id'], cond, mongo.get_run_tree(cond['_id']))
+        added += 1
+    store.flush()
+    return added
+
+
+def main():
+    parser = create_parser()
+    (options, args) = parser.parse_args()
+
+    store = MetricsMatrix(options.location, options.metrics or None)
+
+    if options.update:
+        mongo = MongoExec(cache=False)
+        with timer.measured('updating store'):
+            added = update(store, mongo)
+        print ":: added {:d} runs".format(added)
+        mongo.close()
+
+    print ":: {:s}: {:d} runs, {:d} nodes, metrics {:s}".format(
+        options.location, len(store.runs), len(store.nodes), ', '.join(store.metrics))
+
+
+if __name__ == '__main__':
+    main()
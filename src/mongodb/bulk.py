@@ -0,0 +1,105 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import itertools
+
+import numpy
+
+
+def count_documents(collection, match):
+    try:
+        return collection.count_documents(match)
+    except AttributeError:
+        # pymongo < 3.7
+        return collection.find(match).count()
+
+
+def fill_arrays(documents, fields, count, keys=None):
+    """
+    Fills preallocated numpy arrays from stream of documents
+    Missing values are NaN, arrays grow (doubling) if there are more
+    documents than expected and are trimmed to number of documents read
+    :param documents: iterable of dicts (e.g. pymongo cursor)
+    :param fields: list of numeric fields
+    :param count: expected number of documents
+    :param keys: name of non-numeric field collected to list (e.g. cond_id)
+    :return: tuple (dict field -> numpy array, list of key values)
+    """
+    size = max(count, 1)
+    arrays = dict((field, numpy.empty(size, dtype=numpy.float64)) for field in fields)
+    key_values = list()
+
+    i = 0
+    for document in documents:
+        if i == size:
+            size *= 2
+            for field in fields:
+                arrays[field] = numpy.resize(arrays[field], size)
+
+        for field in fields:
+            arrays[field][i] = document.get(field, numpy.nan)
+        if keys:
+            key_values.append(document.get(keys))
+        i += 1
+
+    for field in fields:
+        arrays[field] = arrays[field][:i]
+    return arrays, key_values
+
+
+def group_arrays(arrays, keys, groups):
+    """
+    Splits arrays by group of their key
+    :param arrays: dict field -> numpy array
+    :param keys: list of keys (same length as arrays)
+    :param groups: dict key -> group value
+    :return: dict group value -> dict field -> numpy array
+    """
+    values = list()
+    codes = dict()
+    labels = numpy.empty(len(keys), dtype=numpy.int64)
+    for i, key in enumerate(keys):
+        group = groups.get(key)
+        if group not in codes:
+            codes[group] = len(values)
+            values.append(group)
+        labels[i] = codes[group]
+
+    order = numpy.argsort(labels, kind='mergesort')
+    edges = numpy.searchsorted(labels[order], numpy.arange(len(values) + 1))
+
+    result = dict()
+    for code, group in enumerate(values):
+        indices = order[edges[code]:edges[code + 1]]
+        result[group] = dict((field, array[indices]) for field, array in arrays.items())
+    return result
+
+
+def fetch_arrays(mongo, match, fields, group_by=None, batch_size=10000, collections=None):
+    """
+    Fetches numeric fields of all matching metrics directly into numpy arrays
+    Documents are streamed in large batches with projection so memory is
+    bounded by size of the result arrays (unlike $push aggregation, which
+    creates single document limited to 16 MB)
+    :param mongo: MongoExec
+    :param match: metrics filter
+    :param fields: list of numeric fields
+    :param group_by: cond field, if set result is split by its value
+    :param collections: metrics partitions to read, default is all of them
+    :return: dict field -> numpy array or dict group -> dict field -> numpy array
+    """
+    projection = dict((field, True) for field in fields)
+    projection['_id'] = False
+    if group_by:
+        projection['cond_id'] = True
+
+    collections = mongo.route() if collections is None else collections
+    count = sum(count_documents(collection, match) for collection in collections)
+    cursors = [collection.find(match, projection).batch_size(batch_size) for collection in collections]
+    arrays, keys = fill_arrays(itertools.chain(*cursors), fields, count, 'cond_id' if group_by else None)
+
+    if not group_by:
+        return arrays
+
+    cond_match = { '_id': { '$in': list(set(keys)) } }
+    groups = dict((item['_id'], item.get(group_by)) for item in mongo.cond.find(cond_match, { group_by: True }))
+    return group_arrays(arrays, keys, groups)
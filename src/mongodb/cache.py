@@ -0,0 +1,194 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from collections import OrderedDict
+import functools
+import threading
+import time
+
+
+# arguments not affecting the result
+ignored_arguments = ['max_time_ms']
+
+
+def make_key(name, args, kwargs):
+    """
+    Creates hashable key from method name and its arguments
+    dicts and lists (match objects, field lists) are converted to tuples
+    """
+    kwargs = dict((key, value) for key, value in kwargs.items() if key not in ignored_arguments)
+    return name, freeze(args), freeze(kwargs)
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if hasattr(value, 'full_name'):
+        # pymongo collection
+        return 'collection', value.full_name
+    return value
+
+
+def estimate_size(value):
+    """
+    Rough estimate of memory occupied by result of a query in bytes
+    Only containers and scalars returned from pymongo are expected
+    """
+    if isinstance(value, dict):
+        return 64 + sum(estimate_size(k) + estimate_size(v) for k, v in value.iteritems())
+    if isinstance(value, (list, tuple)):
+        return 64 + sum(estimate_size(v) for v in value)
+    if isinstance(value, basestring):
+        return 40 + len(value)
+    return 24
+
+
+class QueryCache(object):
+    """
+    Bounded LRU cache for query results
+    Cache is limited by number of entries and by estimated size of stored
+    results, least recently used entries are evicted until new entry fits.
+    Results larger than max_item_size are never stored.
+    Whole cache is dropped when validator returns value different from the
+    last one (e.g. ingest generation stored in database), validator is
+    called at most once per check_interval seconds
+    Cache can be shared between threads
+    """
+
+    def __init__(self, max_entries=1024, max_size=64 * 1024 * 1024, max_item_size=None,
+                 validator=None, check_interval=5.0):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.max_item_size = max_item_size if max_item_size is not None else max_size / 4
+        self.validator = validator
+        self.check_interval = check_interval
+
+        self.lock = threading.RLock()
+        self.items = OrderedDict()
+        self.size = 0
+        self.version = None
+        self.last_check = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def validate(self):
+        if self.validator is None:
+            return
+
+        now = time.time()
+        if now - self.last_check < self.check_interval:
+            return
+
+        self.last_check = now
+        version = self.validator()
+        if version != self.version:
+            if self.version is not None:
+                self.invalidate()
+            self.version = version
+
+    def get(self, key):
+        """
+        Returns tuple (found, value) and marks entry as recently used
+        """
+        self.validate()
+        with self.lock:
+            try:
+                value, size = self.items.pop(key)
+            except KeyError:
+                self.misses += 1
+                return False, None
+
+            self.items[key] = value, size
+            self.hits += 1
+            return True, value
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        if size > self.max_item_size:
+            return False
+
+        with self.lock:
+            if key in self.items:
+                self.size -= self.items.pop(key)[1]
+
+            while self.items and (len(self.items) >= self.max_entries or self.size + size > self.max_size):
+                old_value, old_size = self.items.popitem(last=False)[1]
+                self.size -= old_size
+                self.evictions += 1
+
+            self.items[key] = value, size
+            self.size += size
+            return True
+
+    def invalidate(self):
+        with self.lock:
+            self.items.clear()
+            self.size = 0
+            self.invalidations += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self.items),
+            'size': self.size,
+            'max-entries': self.max_entries,
+            'max-size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit-ratio': float(self.hits) / total if total else 0.0
+        }
+
+
+def materialize(value):
+    """
+    Converts cursors (and other iterators) to list, so helper returns the
+    same type whether its result is cached or not, other values such as
+    scalars and documents are returned unchanged
+    """
+    if hasattr(value, 'next'):
+        value = list(value)
+    return value
+
+
+def copy_result(value):
+    """
+    Copies cached result one level deep: the list (or document) and the
+    documents it contains, values inside documents (e.g. plucked data
+    lists) are shared with the cache
+    """
+    if isinstance(value, list):
+        return [dict(item) if isinstance(item, dict) else item for item in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+def cached_query(method):
+    """
+    Decorator for MongoExec read helpers
+    Result is materialized (see materialize) and stored in self.cache, if
+    instance has no cache method is called directly. Every call returns
+    a shallow copy of the cached result (see copy_result), so callers may
+    add, remove or replace items and document fields, but must not modify
+    nested values in place
+    """
+
+    @functools.wraps(method)
+    def decorated_function(self, *args, **kwargs):
+        if self.cache is None:
+            return materialize(method(self, *args, **kwargs))
+
+        key = make_key(method.__name__, args, kwargs)
+        found, value = self.cache.get(key)
+        if not found:
+            value = materialize(method(self, *args, **kwargs))
+            self.cache.put(key, value)
+        return copy_result(value)
+
+    return decorated_function
@@ -2,42 +2,256 @@
 # author:   Jan Hybs
 import re
 
-from bson.regex import Regex
-from pymongo import MongoClient
+from mongodb.cache import QueryCache, cached_query
+from mongodb.partitions import default_partition, partition_info, select_partitions
 
 
 class MongoExec(object):
-    def __init__(self):
-        self.client = MongoClient('127.0.0.1', 27017)
-        self.db = self.client.test
-
-        self.ist = self.db.ist
-        self.cond = self.db.cond
-        self.metrics = self.db.metrics
+    def __init__(self, cache=True, pool_size=16, partition_by=None):
+        # pymongo is imported and connection is opened on first use
+        self._client = None
+        self.pool_size = pool_size
+
+        # new metrics are stored in collection per month and/or branch (see
+        # mongodb.partitions.schemes), reads are routed using partition
+        # registry so readers do not need to know the scheme
+        self.partition_by = partition_by
+        self.registered = set()
+        self.indexed = set()
+        # registry documents, read again after a partition is registered or
+        # dropped (in other processes it is detected by the query cache)
+        self._registry = None
+
+        # callables hook(cond_id, json_data, tree) called after each processed file
+        self.ingest_hooks = list()
+        # callables hook() called once per batch by commit
+        self.commit_hooks = list()
+
+        # analysis.normalise.Normaliser linking runs to clockrate results
+        self.normaliser = None
+
+        # read helpers are cached until next ingest commit (in any process)
+        self.cache = QueryCache(validator=self.get_ingest_generation) if cache else None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from pymongo import MongoClient
+            self._client = MongoClient('127.0.0.1', 27017, maxPoolSize=self.pool_size)
+        return self._client
+
+    @property
+    def db(self):
+        return self.client.test
+
+    @property
+    def ist(self):
+        return self.db.ist
+
+    @property
+    def cond(self):
+        return self.db.cond
+
+    @property
+    def metrics(self):
+        return self.db.metrics
+
+    @property
+    def meta(self):
+        return self.db.meta
+
+    @property
+    def partitions(self):
+        return self.db.partitions
+
+    @property
+    def rollups(self):
+        return self.db.rollups
+
+    @property
+    def nodes(self):
+        return self.db.nodes
 
     def process_file(self, json_data):
+        from analysis.derived import annotate_derived
+        from analysis.tree import ProfilerTree
+
         whole_program = json_data['children'][0]
-        cond_id = self.create_conditions(json_data)
 
-        self.ensure_structure_path(whole_program, path=None, cond_id=cond_id)
+        # derived metrics are stored along with measured ones
+        tree = ProfilerTree.from_json(whole_program)
+        annotate_derived(tree, json_data.get('run-process-count', 1))
+        if self.normaliser is not None:
+            self.normaliser.annotate(json_data, tree)
+
+        collection = self.register_partition(partition_info(json_data, self.partition_by))
+        cond_id = self.create_conditions(json_data, collection.name)
+
+        self.ensure_structure_path(whole_program, path=None, cond_id=cond_id, collection=collection)
         # self.insert_data(whole_program, cond_id)
 
+        for hook in self.ingest_hooks:
+            hook(cond_id, json_data, tree)
+
+    def add_ingest_hook(self, hook):
+        self.ingest_hooks.append(hook)
+
+    def add_commit_hook(self, hook):
+        self.commit_hooks.append(hook)
+
     def close(self):
-        pass
+        if self._client is not None:
+            self._client.close()
+            self._client = None
 
     def commit(self):
-        pass
+        for hook in self.commit_hooks:
+            hook()
+        self.increment_ingest_generation()
 
     def clean_database (self):
         print self.ist.remove ({})
-        print self.metrics.remove ({})
         print self.cond.remove ({})
+        # partitions are dropped, which is much faster than removing documents
+        for name in set([item['_id'] for item in self.partitions.find()] + [default_partition]):
+            self.db.drop_collection(name)
+        print self.partitions.remove ({})
+        self.registered.clear()
+        self.indexed.clear()
+        self._registry = None
+        self.increment_ingest_generation()
+
+    def ensure_indexes(self, collection=None):
+        """
+        Creates indexes of metrics partition or of nodes collection once per
+        instance
+        """
+        collection = self.metrics if collection is None else collection
+        if collection.name in self.indexed:
+            return
+
+        from pymongo import ASCENDING, DESCENDING
+
+        if collection.name == self.nodes.name:
+            # history is read per node or per hardware class
+            collection.create_index([('hostname', ASCENDING), ('measured-at', ASCENDING)])
+            collection.create_index([('fingerprint', ASCENDING), ('measured-at', ASCENDING)])
+        else:
+            # streamed history of ist node (find_field) is read in _id order without sorting in memory
+            collection.create_index([('ist_id', ASCENDING), ('_id', ASCENDING)])
+            for field in ['cumul-time', 'self-time', 'time-per-call', 'imbalance', 'normalised-time']:
+                collection.create_index([('cond_id', ASCENDING), (field, DESCENDING)])
+        self.indexed.add(collection.name)
+
+    def register_partition(self, info):
+        """
+        Adds partition to the registry and ensures its indexes
+        :param info: registry document (see mongodb.partitions.partition_info)
+        :return: collection of the partition
+        """
+        collection = self.db[info['_id']]
+        if info['_id'] not in self.registered:
+            data = info.copy()
+            data.pop('_id')
+            result = self.partitions.update_one({ '_id': info['_id'] }, { '$setOnInsert': data }, upsert=True)
+            self.registered.add(info['_id'])
+            if result.upserted_id is not None:
+                # readers must route to the new partition
+                self._registry = None
+                self.increment_ingest_generation()
+        self.ensure_indexes(collection)
+        return collection
+
+    def get_registry(self):
+        """
+        Returns partition registry, oldest first
+        Registry is kept until a partition is registered or dropped by this
+        instance or until query cache is invalidated (ingest generation
+        changed in other process), without query cache it is always read
+        Database without registry has single metrics collection
+        """
+        if self.cache is not None:
+            self.cache.validate()
+            version = self.cache.invalidations
+            if self._registry is not None and self._registry[0] == version:
+                return self._registry[1]
+
+        registry = list(self.partitions.find().sort([('month', 1), ('_id', 1)])) or [{ '_id': default_partition }]
+        if self.cache is not None:
+            self._registry = version, registry
+        return registry
+
+    def get_partition_names(self, cond_ids=None, branches=None, since=None, until=None):
+        """
+        Returns names of partitions holding metrics of given runs (or
+        partitions of given branches and months), oldest first
+        """
+        names = select_partitions(self.get_registry(), branches, since, until)
+        if cond_ids is None:
+            return names
+
+        # runs of dropped partitions have partition None
+        used = set(item.get('partition', default_partition)
+                   for item in self.cond.find({ '_id': { '$in': list(cond_ids) } }, { 'partition': True }))
+        return [name for name in names if name in used]
+
+    def route(self, cond_ids=None, branches=None, since=None, until=None):
+        """
+        Returns metrics collections (partitions) which have to be queried
+        """
+        return [self.db[name] for name in self.get_partition_names(cond_ids, branches, since, until)]
+
+    def drop_partitions(self, before=None, branches=None, keep_branches=('master',), dry_run=False):
+        """
+        Retention of raw metrics, expired partitions are folded into rollups
+        collection and dropped as a whole
+        :param before: month (YYYY-MM), partitions of older months expire
+        :param branches: only partitions of these branches expire
+        :param keep_branches: partitions of these branches never expire
+        :return: list of dropped partitions
+        """
+        from pymongo import ASCENDING, UpdateOne
+        from mongodb.partitions import expired_partitions, rollup_keys, rollup_pipeline, rollup_update
+
+        names = expired_partitions(self.partitions.find(), before, branches, keep_branches)
+        if dry_run or not names:
+            return names
+
+        self.rollups.create_index([(field, ASCENDING) for field in ['ist_id', 'month'] + rollup_keys])
+        for name in names:
+            requests = [UpdateOne(*rollup_update(item), upsert=True)
+                        for item in self.db[name].aggregate(rollup_pipeline(), allowDiskUse=True)]
+            if requests:
+                self.rollups.bulk_write(requests, ordered=False)
+
+            self.cond.update_many({ 'partition': name }, { '$set': { 'partition': None, 'rolled-up': True } })
+            self.db.drop_collection(name)
+            self.partitions.delete_one({ '_id': name })
+            self.registered.discard(name)
+            self.indexed.discard(name)
+        self._registry = None
+
+        self.increment_ingest_generation()
+        return names
+
+    def get_ingest_generation(self):
+        result = self.meta.find_one({ '_id': 'ingest' })
+        return result['generation'] if result else 0
+
+    def increment_ingest_generation(self):
+        """
+        Marks that data changed, all query caches (in all processes) become invalid
+        """
+        self.meta.update_one({ '_id': 'ingest' }, { '$inc': { 'generation': 1 } }, upsert=True)
+        if self.cache is not None:
+            self.cache.invalidate()
 
 
     # ------------------------------ // db.cond.aggregate({$group: {_id: "", max: {$avg: "$task-size"}
 
 
-    def ensure_structure_path(self, json_data, cond_id, path=None):
+    def ensure_structure_path(self, json_data, cond_id, path=None, collection=None):
+        collection = self.metrics if collection is None else collection
         tag = json_data['tag']
         if not path:
             ist_id = ",{:s},".format(tag)
@@ -72,11 +286,11 @@ class MongoExec(object):
             'cond_id': cond_id
         })
         data.pop('children', None)
-        self.metrics.insert_one(data)
+        collection.insert_one(data)
 
         if 'children' in json_data:
             for child in json_data['children']:
-                self.ensure_structure_path(child, cond_id, ist_id)
+                self.ensure_structure_path(child, cond_id, ist_id, collection)
 
     def ensure_structure(self, json_data, parent=None):
         _id = json_data['tag']
@@ -114,9 +328,10 @@ class MongoExec(object):
                 self.ensure_structure(child, result)
 
 
-    def create_conditions(self, json_data):
+    def create_conditions(self, json_data, partition=default_partition):
         data = json_data.copy()
         data.pop('children')
+        data['partition'] = partition
         return self.cond.insert_one(data).inserted_id
 
     def insert_data(self, json_data, cond_id):
@@ -132,6 +347,7 @@ class MongoExec(object):
             for child in json_data['children']:
                 self.insert_data(child, cond_id)
 
+    @cached_query
     def get_ist_item(self, path=",Whole Program,", starting=False, ending=True):
         if type(path) is not list:
             path = [path]
@@ -140,16 +356,23 @@ class MongoExec(object):
         for p in path:
             patterns.append(("^" if starting else "") + p + ("$" if ending else ""))
 
+        from bson.regex import Regex
+
         pattern = re.compile("|".join(patterns))
         regex = Regex.from_native(pattern)
         regex.flags ^= re.UNICODE
         return self.ist.find({ "_id": regex })
 
+    @cached_query
     def get_ist_by_id(self, id=",Whole Program,"):
         return self.ist.find_one({ "_id": id })
 
+    @cached_query
     def pluck_fields(self, collection=None, fields=['cumul-time', 'call-count'], group=None, match=None):
-        collection = self.metrics if collection is None else collection
+        from mongodb.partitions import merge_pushed
+
+        # metrics are gathered from all partitions
+        collections = self.route() if collection is None else [collection]
 
         # single fields converts to list
         # simple string match converts to _id search
@@ -167,14 +390,27 @@ class MongoExec(object):
         # create pipeline and send command
         pipeline = [match_dict, group_dict]
         # print pipeline
-        return list(collection.aggregate (pipeline))[0]
+        return merge_pushed(collection.aggregate (pipeline) for collection in collections)[0]
+
+
+    @cached_query
+    def pluck_field(self, id=",Whole Program,", pluck_field="cumul-time", collection='metrics', match_field='ist_id',
+                    cond=None, max_time_ms=None):
+        from mongodb.partitions import merge_pushed
 
+        match = { match_field: id }
+        # server aborts queries running longer than max_time_ms
+        limits = { 'maxTimeMS': max_time_ms } if max_time_ms else { }
 
-    def pluck_field(self, id=",Whole Program,", pluck_field="cumul-time", collection='metrics', match_field='ist_id'):
+        # restrict metrics to runs matching given conditions (or list of ids)
+        cond_ids = None
+        if cond is not None:
+            cond_ids = cond if type(cond) is list else self.get_cond_ids(cond, max_time_ms)
+            match['cond_id'] = { '$in': cond_ids }
 
         pipeline = [
             {
-                '$match': { match_field: id }
+                '$match': match
             },
             {
                 '$group': {
@@ -185,8 +421,144 @@ class MongoExec(object):
         ]
         # print 'db.metrics.aggregate({:s})'.format(pipeline)
         if collection == 'metrics':
-            return self.metrics.aggregate(pipeline)
+            return merge_pushed(metrics.aggregate(pipeline, **limits) for metrics in self.route(cond_ids))
         if collection == 'cond':
-            return self.cond.aggregate(pipeline)
+            return self.cond.aggregate(pipeline, **limits)
         if collection == 'ist':
-            return self.ist.aggregate(pipeline)
+            return self.ist.aggregate(pipeline, **limits)
+
+    def get_cond_ids(self, match, max_time_ms=None):
+        cursor = self.cond.find(match, { '_id': True })
+        if max_time_ms:
+            cursor = cursor.max_time_ms(max_time_ms)
+        return [item['_id'] for item in cursor]
+
+    @cached_query
+    def get_cond_value(self, field):
+        """
+        Returns value of given cond field of any run having it (tells how
+        the field is stored) or None
+        """
+        item = self.cond.find_one({ field: { '$exists': True } }, { field: True })
+        return item.get(field) if item else None
+
+    def find_field(self, id=",Whole Program,", fields=['cumul-time'], after=None, limit=0, batch_size=1000,
+                   cond_ids=None):
+        """
+        Returns cursor over metrics of given ist node ordered by _id
+        Only given fields are projected so documents stay small, cursor is
+        never materialized so caller can consume it lazily (cursors of
+        multiple partitions are merged lazily as well)
+        :param after: _id of last document from previous page (exclusive)
+        :param limit: maximum number of documents, 0 means no limit
+        :param cond_ids: only metrics of these runs are returned
+        """
+        from pymongo import ASCENDING
+        from mongodb.partitions import merge_by_id
+
+        fields = [fields] if type(fields) is not list else fields
+
+        match = { 'ist_id': id }
+        if after is not None:
+            match['_id'] = { '$gt': after }
+        if cond_ids is not None:
+            match['cond_id'] = { '$in': cond_ids }
+
+        projection = dict((field, True) for field in fields)
+        cursors = [collection.find(match, projection).sort('_id', ASCENDING).limit(limit).batch_size(batch_size)
+                   for collection in self.route(cond_ids)]
+        return cursors[0] if len(cursors) == 1 else merge_by_id(cursors, limit)
+
+    def fetch_array(self, id=",Whole Program,", fields=['cumul-time'], group_by=None, cond_ids=None,
+                    batch_size=10000):
+        """
+        Returns values of given fields of ist node as numpy arrays
+        See mongodb.bulk.fetch_arrays
+        :param group_by: cond field (e.g. run-process-count), if set result
+                         is dict group value -> dict field -> numpy array
+        :param cond_ids: only metrics of these runs are returned
+        """
+        from mongodb.bulk import fetch_arrays
+
+        fields = [fields] if type(fields) is not list else fields
+        match = { 'ist_id': id }
+        if cond_ids is not None:
+            match['cond_id'] = { '$in': cond_ids }
+        return fetch_arrays(self, match, fields, group_by, batch_size, self.route(cond_ids))
+
+    def get_hot_spots(self, cond_id, field='self-time', limit=20):
+        """
+        Returns nodes of single run sorted by given metric (descending)
+        """
+        from pymongo import DESCENDING
+
+        for collection in self.route([cond_id]):
+            return collection.find({ 'cond_id': cond_id }).sort(field, DESCENDING).limit(limit)
+        return []
+
+    def get_run_tree(self, cond_id, max_time_ms=None):
+        """
+        Returns ProfilerTree of single run
+        """
+        from analysis.tree import ProfilerTree
+        from itertools import chain
+
+        cursors = [collection.find({ 'cond_id': cond_id }) for collection in self.route([cond_id])]
+        if max_time_ms:
+            cursors = [cursor.max_time_ms(max_time_ms) for cursor in cursors]
+        return ProfilerTree.from_documents(chain(*cursors))
+
+    def insert_node_result(self, clockrate_result):
+        """
+        Stores clockrate result of single node, node is identified by hostname,
+        its hardware class by fingerprint (see utils.nodeinfo)
+        First stored result becomes reference for normalisation
+        """
+        from analysis.normalise import node_score
+
+        data = clockrate_result.copy()
+        data['hostname'] = clockrate_result['architecture']['system']['node']
+        data['fingerprint'] = clockrate_result['architecture'].get('fingerprint')
+        data['score'] = node_score(clockrate_result['perf'])
+        self.ensure_indexes(self.nodes)
+        node_id = self.nodes.insert_one(data).inserted_id
+
+        if data['score']:
+            self.meta.update_one({ '_id': 'reference' },
+                                 { '$setOnInsert': { 'node-id': node_id, 'score': data['score'] } }, upsert=True)
+        return node_id
+
+    def get_node_results(self, hostname):
+        from pymongo import ASCENDING
+
+        return self.nodes.find({ 'hostname': hostname, 'score': { '$ne': None } }).sort('measured-at', ASCENDING)
+
+    def get_node_history(self, hostnames=None, fingerprints=None, since=None):
+        """
+        Returns stored clockrate results sorted by time
+        :param hostnames: only results of given nodes
+        :param fingerprints: only results of given hardware classes
+        :param since: only results measured since given datetime
+        """
+        from pymongo import ASCENDING
+
+        query = dict()
+        if hostnames:
+            query['hostname'] = { '$in': list(hostnames) }
+        if fingerprints:
+            query['fingerprint'] = { '$in': list(fingerprints) }
+        if since:
+            query['measured-at'] = { '$gte': since }
+        fields = ['hostname', 'fingerprint', 'measured-at', 'score', 'perf']
+        return self.nodes.find(query, dict((field, 1) for field in fields)).sort('measured-at', ASCENDING)
+
+    def get_reference_score(self):
+        result = self.meta.find_one({ '_id': 'reference' })
+        return result['score'] if result else None
+
+    def get_reference_result(self):
+        """
+        Returns stored clockrate result of the reference node or None
+        """
+        result = self.meta.find_one({ '_id': 'reference' })
+        return self.nodes.find_one({ '_id': result['node-id'] }) if result else None
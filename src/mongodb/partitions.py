@@ -0,0 +1,182 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import datetime
+import heapq
+import itertools
+import re
+
+from mongodb.cache import freeze
+
+
+# raw metrics can be split by month of the run, by branch or by both
+schemes = ['month', 'branch', 'branch-month']
+
+# collection used when partitioning is off (and by databases created before)
+default_partition = 'metrics'
+
+rollup_fields = ['cumul-time', 'self-time', 'call-count', 'normalised-time']
+rollup_keys = ['task-description', 'run-process-count', 'program-branch']
+
+
+def sanitize(value):
+    """
+    Returns value usable as part of collection name (feature/new-io -> feature_new_io)
+    """
+    return re.sub(r'[^A-Za-z0-9]+', '_', unicode(value)).strip('_').lower() or 'none'
+
+
+def run_month(conditions):
+    """
+    Returns month of the run (YYYY-MM), current month is used as fallback
+    """
+    started = conditions.get('run-started-at')
+    if not isinstance(started, datetime.datetime):
+        started = datetime.datetime.utcnow()
+    return started.strftime('%Y-%m')
+
+
+def partition_info(conditions, scheme=None):
+    """
+    Returns registry document of partition given run belongs to
+    :param conditions: cond document or whole profiler json
+    :param scheme: one of schemes, None means single metrics collection
+    :return: dict with _id (collection name), branch and month
+    """
+    if scheme is None:
+        return { '_id': default_partition, 'branch': None, 'month': None }
+    if scheme not in schemes:
+        raise ValueError('Unknown partition scheme {:s}'.format(scheme))
+
+    branch = conditions.get('program-branch') if 'branch' in scheme else None
+    month = run_month(conditions) if 'month' in scheme else None
+
+    parts = [default_partition]
+    if 'branch' in scheme:
+        parts.append(sanitize(branch))
+    if 'month' in scheme:
+        parts.append(month.replace('-', '_'))
+    return { '_id': '_'.join(parts), 'branch': branch, 'month': month }
+
+
+def select_partitions(partitions, branches=None, since=None, until=None):
+    """
+    Filters partition registry documents, partitions not split by given
+    criterion (no branch or no month) always pass
+    :param branches: list of branches
+    :param since: first month (YYYY-MM), inclusive
+    :param until: last month (YYYY-MM), inclusive
+    :return: list of collection names
+    """
+    result = list()
+    for partition in partitions:
+        branch, month = partition.get('branch'), partition.get('month')
+        if branches and branch is not None and branch not in branches:
+            continue
+        if since and month is not None and month < since:
+            continue
+        if until and month is not None and month > until:
+            continue
+        result.append(partition['_id'])
+    return result
+
+
+def merge_by_id(cursors, limit=0):
+    """
+    Merges cursors sorted by _id (one per partition) into single stream
+    ordered by _id, cursors are consumed lazily
+    """
+    streams = [((document['_id'], document) for document in cursor) for cursor in cursors]
+    merged = (document for _id, document in heapq.merge(*streams))
+    return itertools.islice(merged, limit) if limit else merged
+
+
+def merge_pushed(results):
+    """
+    Merges $group results of multiple partitions, lists created by $push
+    in documents with same _id are concatenated
+    :param results: iterable of aggregation results (one per partition)
+    :return: list of documents
+    """
+    merged = dict()
+    order = list()
+    for document in itertools.chain(*results):
+        key = freeze(document['_id'])
+        if key not in merged:
+            merged[key] = document
+            order.append(key)
+            continue
+        for name, value in document.items():
+            if name != '_id':
+                merged[key].setdefault(name, list()).extend(value)
+    return [merged[key] for key in order]
+
+
+def expired_partitions(partitions, before=None, branches=None, keep_branches=()):
+    """
+    Returns names of partitions which can be dropped, partition must be
+    older than given month (if before is set) and belong to one of given
+    branches (if branches are set), partitions of kept branches and the
+    default partition are never returned
+    :param before: month (YYYY-MM), only partitions of older months expire
+    """
+    if not before and not branches:
+        return list()
+
+    result = list()
+    for partition in partitions:
+        branch, month = partition.get('branch'), partition.get('month')
+        if partition['_id'] == default_partition or branch in keep_branches:
+            continue
+        if branches and branch not in branches:
+            continue
+        if before and (month is None or month >= before):
+            continue
+        result.append(partition['_id'])
+    return result
+
+
+def rollup_pipeline(fields=None):
+    """
+    Returns aggregation pipeline folding partition into per-month rollups
+    Metrics are joined with their conditions and grouped by node, month and
+    rollup_keys, for every field count, sum, sum of squares, min and max is
+    kept so mean and deviation can be computed after merging rollups
+    """
+    fields = fields or rollup_fields
+
+    key = dict((field, '$cond.' + field) for field in rollup_keys)
+    key['ist_id'] = '$ist_id'
+    key['month'] = { '$dateToString': { 'format': '%Y-%m', 'date': '$cond.run-started-at' } }
+
+    group = { '_id': key, 'runs': { '$sum': 1 } }
+    for field in fields:
+        value = '$' + field
+        group[field + '-sum'] = { '$sum': value }
+        group[field + '-sq'] = { '$sum': { '$multiply': [value, value] } }
+        group[field + '-min'] = { '$min': value }
+        group[field + '-max'] = { '$max': value }
+
+    return [
+        { '$lookup': { 'from': 'cond', 'localField': 'cond_id', 'foreignField': '_id', 'as': 'cond' } },
+        { '$unwind': '$cond' },
+        { '$group': group }
+    ]
+
+
+def rollup_update(document):
+    """
+    Returns filter and update merging aggregated document into existing
+    rollup, grouping key is stored as top level fields of the rollup
+    :return: tuple (filter, update)
+    """
+    update = { '$inc': { }, '$min': { }, '$max': { } }
+    for name, value in document.items():
+        if name == '_id' or value is None:
+            continue
+        if name.endswith('-min'):
+            update['$min'][name] = value
+        elif name.endswith('-max'):
+            update['$max'][name] = value
+        else:
+            update['$inc'][name] = value
+    return document['_id'], dict((operator, values) for operator, values in update.items() if values)
@@ -1,8 +1,6 @@
 # encoding: utf-8
 # author:   Jan Hybs
 
-import mysql.connector
-
 from config import credentials
 from mysqldb.mysql_query import insert_condition_fields, insert_condition_query, insert_measurement_query, \
     insert_structure_query
@@ -10,6 +8,10 @@ from mysqldb.mysql_query import insert_condition_fields, insert_condition_query,
 
 class MySQLExec(object):
     def __init__(self):
+        # connector is imported only when MySQL backend is actually used
+        import mysql.connector
+
+        self.mysql = mysql
         self.connector = mysql.connector.connect(**credentials)
         self.cursor = self.connector.cursor()
 
@@ -40,7 +42,7 @@ class MySQLExec(object):
     def create_structure(self, json_data, parent=None):
         try:
             self.cursor.execute(insert_structure_query, { 'name': json_data['tag'], 'parent': parent })
-        except mysql.connector.errors.IntegrityError as e:
+        except self.mysql.connector.errors.IntegrityError as e:
             # print e
             pass
 
@@ -71,7 +73,7 @@ class MySQLExec(object):
             try:
                 data = self.create_measurement(json_data, metric, condition_id)
                 self.cursor.execute(insert_measurement_query, data)
-            except mysql.connector.errors.DatabaseError as e:
+            except self.mysql.connector.errors.DatabaseError as e:
                 print "{:s} {:s}".format(data, e)
 
         if 'children' in json_data:
@@ -0,0 +1,113 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import datetime
+import sys
+from collections import OrderedDict
+from optparse import OptionParser
+
+from analysis.nodestats import compare_nodes, drift
+from analysis.normalise import score_tests
+from mongodb.mongo_exec import MongoExec
+from utils.strings import human_readable
+
+
+def create_parser():
+    """Creates command line parse"""
+    parser = OptionParser(usage="%prog [options]",
+                          epilog="Compares stored clockrate results of nodes or detects nodes drifting from " +
+                                 "their own baseline (clockrate.py -s stores the results)")
+
+    parser.add_option("-H", "--host", dest="hostnames", default=[], action="append", metavar="HOSTNAME",
+                      help="Only given node, can be repeated")
+    parser.add_option("-f", "--fingerprint", dest="fingerprints", default=[], action="append", metavar="HASH",
+                      help="Only nodes of given hardware class, can be repeated")
+    parser.add_option("-i", "--include", dest="tests", default=[], action="append", metavar="TESTNAME",
+                      help="Compared test, can be repeated (default tests forming node score)")
+    parser.add_option("-c", "--cores", dest="processes", default=1, type="int", metavar="N",
+                      help="Compare results measured on N cores")
+    parser.add_option("--since", dest="since", default=None, metavar="YYYY-MM-DD",
+                      help="Only results measured since given day")
+    parser.add_option("-l", "--last", dest="last", default=5, type="int", metavar="N",
+                      help="Compare nodes using median of their last N runs")
+    parser.add_option("-d", "--drift", dest="drift", default=False, action="store_true",
+                      help="Detect nodes drifting from their baseline, exits with 1 if any is found")
+    parser.add_option("-b", "--baseline", dest="baseline", default=5, type="int", metavar="N",
+                      help="First N runs of node form its baseline")
+    parser.add_option("-w", "--window", dest="window", default=3, type="int", metavar="N",
+                      help="Last N runs of node are compared to baseline")
+    parser.add_option("-t", "--threshold", dest="threshold", default=0.05, type="float", metavar="RATIO",
+                      help="Minimal relative change of drifted test")
+    parser.add_option("-z", "--limit", dest="limit", default=3.0, type="float", metavar="Z",
+                      help="Minimal change of drifted test in multiples of baseline noise")
+    return parser
+
+
+def group_results(results):
+    """Splits results sorted by time to histories of single nodes"""
+    histories = OrderedDict()
+    fingerprints = dict()
+    for result in results:
+        histories.setdefault(result['hostname'], list()).append(result)
+        fingerprints[result['hostname']] = result.get('fingerprint')
+    return histories, fingerprints
+
+
+def print_comparison(comparison, fingerprints):
+    tests = comparison['tests']
+    print "{:24s} {:16s} {:>5s} {:>7s}  {:s}".format('node', 'fingerprint', 'runs', 'score', '  '.join(tests))
+    order = sorted(range(len(comparison['nodes'])), key=lambda i: -comparison['score'][i])
+    for i in order:
+        node = comparison['nodes'][i]
+        values = ['{:>{:d}s}'.format('-' if value != value else '{:1.3f}'.format(value), len(test))
+                  for test, value in zip(tests, comparison['relative'][i])]
+        print "{:24s} {:16s} {:5d} {:7.3f}  {:s}".format(node, fingerprints.get(node) or '-', comparison['runs'][i],
+                                                          comparison['score'][i], '  '.join(values))
+
+
+def print_drift(node, result):
+    print ":: {:s} drifted in {:s}".format(node, ', '.join(result['drifted']))
+    for j, test in enumerate(result['tests']):
+        if test in result['drifted']:
+            print "   {:24s} {:>10s} -> {:>10s} {:+7.1%} (z {:+.1f})".format(
+                test, human_readable(result['baseline'][j]), human_readable(result['recent'][j]),
+                result['change'][j], result['z'][j])
+
+
+def main():
+    parser = create_parser()
+    (options, args) = parser.parse_args()
+
+    since = datetime.datetime.strptime(options.since, '%Y-%m-%d') if options.since else None
+    tests = options.tests or score_tests
+
+    mongo = MongoExec(cache=False)
+    results = list(mongo.get_node_history(options.hostnames, options.fingerprints, since))
+    mongo.close()
+
+    histories, fingerprints = group_results(results)
+    if not histories:
+        print ":: no stored results found"
+        return
+
+    if not options.drift:
+        print_comparison(compare_nodes(histories, tests, options.processes, options.last), fingerprints)
+        return
+
+    drifted = 0
+    for node, history in histories.items():
+        result = drift(history, tests, options.processes, options.baseline, options.window, options.threshold,
+                       options.limit)
+        if result is None:
+            print ":: {:s} has only {:d} runs, skipped".format(node, len(history))
+        elif result['drifted']:
+            print_drift(node, result)
+            drifted += 1
+        else:
+            print ":: {:s} ok".format(node)
+
+    if drifted:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,24 @@
 # encoding: utf-8
 # author:   Jan Hybs
-from multiprocessing import Process, Event, Value
+from ctypes import c_longlong
+from multiprocessing import Process, Event, RawValue
 
 
 class AbstractProcess(Process):
-    def __init__(self, ):
+    def __init__(self, exit=None, result=None):
         Process.__init__(self)
-        self.exit = Event()
-        self.result = Value('f', 0)
+        # persistent workers (perf.pool) share single exit event, result
+        # is 64 bit counter updated by test in every iteration
+        self.exit = exit if exit is not None else Event()
+        self.result = result if result is not None else RawValue(c_longlong, 0)
         self.terminated = None
 
     def run(self):
-        self.test(self.result)
+        self.setup()
+        try:
+            self.test(self.result)
+        finally:
+            self.teardown()
 
     def shutdown(self):
         if self.is_alive():
@@ -20,5 +27,47 @@ class AbstractProcess(Process):
         else:
             self.terminated = False
 
+    def setup(self):
+        """
+        Imports and warms up everything test needs, called before the
+        measurement starts so it is not part of the measured time
+        """
+        pass
+
+    def teardown(self):
+        """
+        Removes everything created in set up (e.g. temporary files)
+        """
+        pass
+
+    def test(self, result):
+        pass
+
+
+class ScalableProcess(AbstractProcess):
+    """
+    Test with problem size n, by default n grows with every iteration
+    With fixed size (scaling mode) kernel is called repeatedly for the
+    same n and score is number of kernel calls
+    """
+
+    def __init__(self, size=None, **kwargs):
+        AbstractProcess.__init__(self, **kwargs)
+        self.size = size
+
     def test(self, result):
-        pass
\ No newline at end of file
+        if self.size is None:
+            return self.test_growing(result)
+
+        n = self.size
+        score = 0
+        while not self.exit.is_set():
+            self.kernel(n)
+            score += 1
+            result.value = score
+
+    def test_growing(self, result):
+        pass
+
+    def kernel(self, n):
+        pass
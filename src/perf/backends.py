@@ -0,0 +1,156 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from ctypes import c_longlong
+from multiprocessing import RawValue
+from subprocess import check_output
+import importlib
+import json
+import os
+import sys
+import threading
+import traceback
+
+from perf.pool import WorkerPool, StopFlag, sample_counters
+from utils.clock import monotonic
+from utils.topology import get_affinity, set_affinity
+
+
+# environment variables limiting thread pools of BLAS implementations
+blas_variables = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS',
+                  'NUMEXPR_NUM_THREADS']
+
+
+class ThreadRunner(object):
+    """
+    Runs tests in threads of the current process, all threads share single
+    interpreter so pure python tests are serialised by the GIL while numpy
+    kernels releasing it can run in parallel
+    If cpus are given, threads are not pinned one by one, the process is
+    restricted to the first count cpus while the test runs (new threads
+    inherit affinity of the thread starting them)
+    Interface is the same as perf.pool.WorkerPool
+    """
+
+    def __init__(self, interval=0.01, cpus=None):
+        self.interval = interval
+        self.cpus = cpus
+
+    def run(self, cls, count, duration, params=None):
+        if not self.cpus:
+            return self.run_threads(cls, count, duration, params)
+
+        original = get_affinity()
+        set_affinity(self.cpus[:count])
+        try:
+            return self.run_threads(cls, count, duration, params)
+        finally:
+            if original:
+                set_affinity(original)
+
+    def run_threads(self, cls, count, duration, params=None):
+        start = threading.Event()
+        stop = StopFlag()
+        counters = [RawValue(c_longlong, 0) for i in range(count)]
+        targets = [cls(exit=stop, result=counter, **(params or dict())) for counter in counters]
+        results = [None] * count
+        errors = list()
+        ready = threading.Semaphore(0)
+
+        def work(index, target):
+            try:
+                try:
+                    target.setup()
+                    ready.release()
+                    start.wait()
+                    started = monotonic()
+                    target.test(target.result)
+                    results[index] = { 'cpu': None, 'value': target.result.value, 'started': started,
+                                       'duration': monotonic() - started, 'stopped': stop.is_set() }
+                finally:
+                    target.teardown()
+            except Exception:
+                errors.append(traceback.format_exc())
+                ready.release()
+
+        threads = [threading.Thread(target=work, args=(i, target)) for i, target in enumerate(targets)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            ready.acquire()
+
+        start.set()
+        times, counts = sample_counters(counters, duration, self.interval)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise RuntimeError('perf thread failed:\n{:s}'.format(errors[0]))
+
+        for result, values in zip(results, counts):
+            result['timeline'] = { 'time': times, 'count': values }
+        return results
+
+    def close(self):
+        pass
+
+
+class BlasRunner(object):
+    """
+    Runs single test in fresh interpreter with BLAS thread pools limited to
+    given count (environment is set before numpy is imported), so count
+    means number of BLAS threads, not number of workers
+    If cpus are given, the interpreter is restricted to the first count cpus
+    before numpy starts its threads
+    Interface is the same as perf.pool.WorkerPool
+    """
+
+    def __init__(self, interval=0.01, cpus=None):
+        self.interval = interval
+        self.cpus = cpus
+
+    def run(self, cls, count, duration, params=None):
+        env = os.environ.copy()
+        for variable in blas_variables:
+            env[variable] = str(count)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+
+        task = {
+            'module': cls.__module__,
+            'name': cls.__name__,
+            'params': params or dict(),
+            'duration': duration,
+            'interval': self.interval,
+            'cpus': self.cpus[:count] if self.cpus else None
+        }
+        output = check_output([sys.executable, '-m', 'perf.backends', json.dumps(task)], env=env)
+        result = json.loads(output.strip().splitlines()[-1])
+        result['blas-threads'] = count
+        return [result]
+
+    def close(self):
+        pass
+
+
+backends = {
+    'process': WorkerPool,
+    'thread': ThreadRunner,
+    'blas': BlasRunner
+}
+
+
+def run_task(task):
+    """
+    Runs test described by BlasRunner task in this interpreter
+    """
+    if task.get('cpus'):
+        set_affinity(task['cpus'])
+    cls = getattr(importlib.import_module(task['module']), task['name'])
+    runner = ThreadRunner(task['interval'])
+    return runner.run(cls, 1, task['duration'], task['params'])[0]
+
+
+if __name__ == '__main__':
+    print json.dumps(run_task(json.loads(sys.argv[1])))
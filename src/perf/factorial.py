@@ -18,8 +18,8 @@ class Factorial(AbstractProcess):
         while not self.exit.is_set():
             math.factorial(n[i % 10])
             score = i
+            result.value = score
             i += 1
-        result.value = score
 
     def factorial(self, n):
         # return math.factorial(n)
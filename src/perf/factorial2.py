@@ -1,15 +1,15 @@
 # encoding: utf-8
 # author:   Jan Hybs
-from perf.abstract import AbstractProcess
+from perf.abstract import ScalableProcess
 
 
-class Factorial(AbstractProcess):
+class Factorial(ScalableProcess):
     """
     Test determining CPU performance
     Test complexity is not constant (possible n)
     """
 
-    def test(self, result):
+    def test_growing(self, result):
         import math
 
         i = 0
@@ -17,8 +17,13 @@ class Factorial(AbstractProcess):
         while not self.exit.is_set():
             math.factorial(i)
             score += i
+            result.value = score
             i += 1
-        result.value = score
+
+    def kernel(self, n):
+        import math
+
+        math.factorial(n)
 
     def factorial(self, n):
         # return math.factorial(n)
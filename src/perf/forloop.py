@@ -14,5 +14,5 @@ class ForLoop(AbstractProcess):
         score = 0
         while not self.exit.is_set():
             score = i
-            i += 1
-        result.value = score
\ No newline at end of file
+            result.value = score
+            i += 1
\ No newline at end of file
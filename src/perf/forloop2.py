@@ -1,15 +1,15 @@
 # encoding: utf-8
 # author:   Jan Hybs
-from perf.abstract import AbstractProcess
+from perf.abstract import ScalableProcess
 
 
-class ForLoop(AbstractProcess):
+class ForLoop(ScalableProcess):
     """
     Test determining CPU performance
     Test complexity is not constant
     """
 
-    def test(self, result):
+    def test_growing(self, result):
         i = 0
         k = 0
         score = 0
@@ -17,5 +17,9 @@ class ForLoop(AbstractProcess):
             for j in range (0, i):
                 k = j
             score = i
+            result.value = score
             i += 1
-        result.value = score
\ No newline at end of file
+
+    def kernel(self, n):
+        for j in range(0, n):
+            k = j
\ No newline at end of file
@@ -16,5 +16,5 @@ class HashSHA(AbstractProcess):
         while not self.exit.is_set():
             hashlib.sha512('1234').hexdigest()
             score = i
-            i += 1
-        result.value = score
\ No newline at end of file
+            result.value = score
+            i += 1
\ No newline at end of file
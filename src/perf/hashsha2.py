@@ -1,20 +1,27 @@
 # encoding: utf-8
 # author:   Jan Hybs
 import hashlib
-from perf.abstract import AbstractProcess
+from perf.abstract import ScalableProcess
 
 
-class HashSHA(AbstractProcess):
+class HashSHA(ScalableProcess):
     """
     Test determining CPU and MEMORY performance
     Test complexity is not constant
     """
 
-    def test(self, result):
+    def setup(self):
+        if self.size is not None:
+            self.data = self.size * 'a'
+
+    def test_growing(self, result):
         i = 0
         score = 0
         while not self.exit.is_set():
             hashlib.sha512(i *'a').hexdigest()
             score += i
+            result.value = score
             i += 1
-        result.value = score
\ No newline at end of file
+
+    def kernel(self, n):
+        hashlib.sha512(self.data).hexdigest()
\ No newline at end of file
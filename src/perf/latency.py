@@ -0,0 +1,48 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from perf.abstract import AbstractProcess
+
+
+# working sets in bytes (L1, L2, L3 and DRAM sized on common nodes)
+working_sets = [2 ** 14, 2 ** 17, 2 ** 20, 2 ** 23, 2 ** 26]
+
+
+class PointerChase(AbstractProcess):
+    """
+    Test determining MEMORY latency
+    Chain of indices forms single random cycle over working set, every
+    access depends on the previous one so prefetching and parallel loads
+    cannot hide the latency. Score is number of accesses. Interpreter
+    overhead is included, so only the increase of access time over the
+    smallest working set is the latency of the memory level
+    Test complexity is constant
+    """
+
+    steps = 1000
+
+    def __init__(self, size=working_sets[0], **kwargs):
+        AbstractProcess.__init__(self, **kwargs)
+        self.size = size
+
+    def setup(self):
+        from array import array
+        import numpy
+
+        count = max(self.size // 8, 2)
+        order = numpy.random.RandomState(1234).permutation(count)
+        chain = numpy.empty(count, dtype=numpy.int64)
+        chain[order] = numpy.roll(order, -1)
+
+        # plain 8 byte integers, indexing does not create numpy scalars
+        self.chain = array('l' if array('l').itemsize == 8 else 'q', chain.tolist())
+
+    def test(self, result):
+        chain = self.chain
+        steps = xrange(self.steps)
+        i = 0
+        score = 0
+        while not self.exit.is_set():
+            for j in steps:
+                i = chain[i]
+            score += self.steps
+            result.value = score
@@ -9,6 +9,11 @@ class MatrixCreate(AbstractProcess):
     Test complexity is constant
     """
 
+    def setup(self):
+        import numpy
+
+        numpy.random.RandomState(1234).random_sample((2, 2))
+
     def test(self, result):
         import numpy
 
@@ -18,5 +23,5 @@ class MatrixCreate(AbstractProcess):
         while not self.exit.is_set():
             rnd.random_sample((100, 100))
             score = i
-            i += 1
-        result.value = score
\ No newline at end of file
+            result.value = score
+            i += 1
\ No newline at end of file
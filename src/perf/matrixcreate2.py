@@ -1,15 +1,21 @@
 # encoding: utf-8
 # author:   Jan Hybs
-from perf.abstract import AbstractProcess
+from perf.abstract import ScalableProcess
 
 
-class MatrixCreate(AbstractProcess):
+class MatrixCreate(ScalableProcess):
     """
     Test determining MEMORY performance
     Test complexity is not constant
     """
 
-    def test(self, result):
+    def setup(self):
+        import numpy
+
+        self.rnd = numpy.random.RandomState(1234)
+        self.rnd.random_sample((2, 2))
+
+    def test_growing(self, result):
         import numpy
 
         rnd = numpy.random.RandomState(1234)
@@ -18,5 +24,8 @@ class MatrixCreate(AbstractProcess):
         while not self.exit.is_set():
             rnd.random_sample((i + 1, i + 1))
             score = i
+            result.value = score
             i += 1
-        result.value = score
\ No newline at end of file
+
+    def kernel(self, n):
+        self.rnd.random_sample((n, n))
\ No newline at end of file
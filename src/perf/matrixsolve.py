@@ -9,6 +9,11 @@ class MatrixSolve(AbstractProcess):
     Test complexity is constant
     """
 
+    def setup(self):
+        import numpy
+
+        numpy.linalg.inv(numpy.eye(2))
+
     def test(self, result):
         import numpy
 
@@ -19,5 +24,5 @@ class MatrixSolve(AbstractProcess):
             matrix = rnd.random_sample((100, 100))
             numpy.linalg.inv(matrix)
             score = i
-            i += 1
-        result.value = score
\ No newline at end of file
+            result.value = score
+            i += 1
\ No newline at end of file
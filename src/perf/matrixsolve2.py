@@ -1,15 +1,22 @@
 # encoding: utf-8
 # author:   Jan Hybs
-from perf.abstract import AbstractProcess
+from perf.abstract import ScalableProcess
 
 
-class MatrixSolve(AbstractProcess):
+class MatrixSolve(ScalableProcess):
     """
     Test determining CPU and MEMORY performance
     Test complexity is not constant
     """
 
-    def test(self, result):
+    def setup(self):
+        import numpy
+
+        numpy.linalg.inv(numpy.eye(2))
+        if self.size is not None:
+            self.matrix = numpy.random.RandomState(1234).random_sample((self.size, self.size))
+
+    def test_growing(self, result):
         import numpy
 
         rnd = numpy.random.RandomState(1234)
@@ -19,5 +26,10 @@ class MatrixSolve(AbstractProcess):
             matrix = rnd.random_sample((i + 1, i + 1))
             numpy.linalg.inv(matrix)
             score = i
+            result.value = score
             i += 1
-        result.value = score
\ No newline at end of file
+
+    def kernel(self, n):
+        import numpy
+
+        numpy.linalg.inv(self.matrix)
\ No newline at end of file
@@ -0,0 +1,200 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from ctypes import c_bool, c_longlong
+from multiprocessing import Process, Event, Queue, RawValue
+from Queue import Empty
+import time
+import traceback
+import warnings
+
+from utils.clock import monotonic
+from utils.topology import set_affinity
+
+
+class StopFlag(object):
+    """
+    Stop signal checked by tests in every iteration, unlike
+    multiprocessing.Event reading the flag needs no lock, so the check
+    costs the same in processes and threads
+    """
+
+    def __init__(self):
+        self.flag = RawValue(c_bool, False)
+
+    def set(self):
+        self.flag.value = True
+
+    def clear(self):
+        self.flag.value = False
+
+    def is_set(self):
+        return self.flag.value
+
+
+def sample_counters(counters, duration, interval):
+    """
+    Reads given shared counters every interval seconds until duration elapses
+    :return: tuple (list of times, list of counts per counter)
+    """
+    times = list()
+    counts = [list() for counter in counters]
+    started = monotonic()
+    deadline = started + duration
+    while True:
+        now = monotonic()
+        times.append(now - started)
+        for counter, values in zip(counters, counts):
+            values.append(counter.value)
+
+        if now >= deadline:
+            return times, counts
+        time.sleep(min(interval, deadline - now))
+
+
+class Worker(Process):
+    """
+    Persistent process running perf tests on demand
+    For every task (AbstractProcess subclass) test instance is created and
+    set up, worker then reports it is ready and waits for common start
+    event, test runs until common stop event is set and worker reports
+    number of operations and its own duration measured by monotonic clock
+    and whether the test ended because of the stop event (stopped)
+    Test writes number of operations to 64 bit counter in shared memory
+    during the run, so pool can sample it without disturbing the worker
+    If cpu is given, worker pins itself to it
+    """
+
+    def __init__(self, index, start, stop, results, cpu=None):
+        Process.__init__(self)
+        self.daemon = True
+        self.index = index
+        self.cpu = cpu
+        self.start_event = start
+        self.stop_event = stop
+        self.results = results
+        self.tasks = Queue()
+        self.counter = RawValue(c_longlong, 0)
+
+    def run(self):
+        if self.cpu is not None:
+            set_affinity([self.cpu])
+
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+
+            try:
+                cls, params = task
+                target = cls(exit=self.stop_event, result=self.counter, **params)
+                # files of failed set up are removed as well
+                try:
+                    target.setup()
+                    self.results.put(('ready', self.index, None))
+
+                    self.start_event.wait()
+                    started = monotonic()
+                    target.test(target.result)
+                    finished = monotonic()
+                    stopped = self.stop_event.is_set()
+                finally:
+                    target.teardown()
+
+                self.results.put(('done', self.index, {
+                    'cpu': self.cpu,
+                    'value': target.result.value,
+                    'started': started,
+                    'duration': finished - started,
+                    'stopped': stopped
+                }))
+            except Exception:
+                self.results.put(('error', self.index, traceback.format_exc()))
+
+
+class WorkerPool(object):
+    """
+    Pool of persistent workers, processes are forked only once (pool grows
+    when more workers are requested) so fork and import costs are not part
+    of any measurement. All workers of a run start together: run is started
+    only after every worker finished its set up (barrier)
+    """
+
+    def __init__(self, timeout=60.0, interval=0.01, cpus=None):
+        self.timeout = timeout
+        self.interval = interval
+        # workers are pinned to cpus in given order (see utils.topology.pin_order)
+        self.cpus = cpus
+        self.start = Event()
+        self.stop = StopFlag()
+        self.results = Queue()
+        self.workers = list()
+
+    def ensure(self, count):
+        while len(self.workers) < count:
+            index = len(self.workers)
+            cpu = self.cpus[index % len(self.cpus)] if self.cpus else None
+            worker = Worker(index, self.start, self.stop, self.results, cpu)
+            worker.start()
+            self.workers.append(worker)
+
+    def collect(self, count, kind):
+        messages = dict()
+        while len(messages) < count:
+            try:
+                message, index, payload = self.results.get(timeout=self.timeout)
+            except Empty:
+                raise RuntimeError('perf workers did not respond in {:1.1f} s'.format(self.timeout))
+
+            if message == 'error':
+                raise RuntimeError('perf worker {:d} failed:\n{:s}'.format(index, payload))
+            if message == kind:
+                messages[index] = payload
+        return [messages[index] for index in sorted(messages)]
+
+    def sample(self, workers, duration):
+        return sample_counters([worker.counter for worker in workers], duration, self.interval)
+
+    def run(self, cls, count, duration, params=None):
+        """
+        Runs test on given number of workers for given duration
+        :param cls: AbstractProcess subclass
+        :param params: keyword arguments of test constructor
+        :return: list of dicts with value, started, duration and timeline
+                 (dict with time and count samples) per worker
+        """
+        if self.cpus and count > len(set(self.cpus)):
+            # speedup of such run shows oversubscription, not scaling of the test
+            warnings.warn('{:d} pinned workers share {:d} cpus'.format(count, len(set(self.cpus))), RuntimeWarning)
+        self.ensure(count)
+        self.start.clear()
+        self.stop.clear()
+
+        workers = self.workers[:count]
+        try:
+            for worker in workers:
+                worker.counter.value = 0
+                worker.tasks.put((cls, params or dict()))
+            self.collect(count, 'ready')
+
+            self.start.set()
+            times, counts = self.sample(workers, duration)
+            self.stop.set()
+            results = self.collect(count, 'done')
+        except:
+            # workers may be stuck in the middle of the run
+            self.close()
+            raise
+
+        for result, values in zip(results, counts):
+            result['timeline'] = { 'time': times, 'count': values }
+        return results
+
+    def close(self):
+        # release workers possibly still waiting for start
+        self.stop.set()
+        self.start.set()
+        for worker in self.workers:
+            worker.tasks.put(None)
+        for worker in self.workers:
+            worker.join(self.timeout)
+        self.workers = list()
@@ -0,0 +1,175 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import numpy
+
+from perf.factorial2 import Factorial
+from perf.forloop2 import ForLoop
+from perf.hashsha2 import HashSHA
+from perf.matrixcreate2 import MatrixCreate
+from perf.matrixsolve2 import MatrixSolve
+from perf.stringconcat2 import StringConcat
+
+
+def geometric(start, stop, count):
+    """
+    Returns distinct integer sizes spaced evenly in log scale
+    """
+    values = numpy.unique(numpy.round(numpy.logspace(numpy.log10(start), numpy.log10(stop), count)))
+    values = values.astype(numpy.int64)
+    return values.tolist()
+
+
+# test name -> (test with variable problem size, swept sizes)
+sweeps = {
+    'for-loop': (ForLoop, geometric(16, 2 ** 20, 12)),
+    'factorial': (Factorial, geometric(16, 2 ** 14, 12)),
+    'hash-sha': (HashSHA, geometric(64, 2 ** 26, 12)),
+    'matrix-creation': (MatrixCreate, geometric(8, 2048, 12)),
+    'matrix-solve': (MatrixSolve, geometric(8, 1024, 12)),
+    'string-concat': (StringConcat, geometric(64, 2 ** 26, 12)),
+}
+
+
+def line_fit(x, y):
+    """
+    Returns slope, intercept and sum of squared residuals of linear fit
+    """
+    slope, intercept = numpy.polyfit(x, y, 1)
+    residuals = y - (slope * x + intercept)
+    return slope, intercept, float(numpy.dot(residuals, residuals))
+
+
+def power_fit(sizes, times):
+    """
+    Fits cost curve time = coefficient * n ^ exponent (in log-log scale)
+    :return: tuple (coefficient, exponent)
+    """
+    x, y = numpy.log(sizes), numpy.log(times)
+    slope, intercept, residual = line_fit(x, y)
+    return float(numpy.exp(intercept)), float(slope)
+
+
+def split_cost(x, y, min_points=3):
+    """
+    Returns sum of squared residuals of the best fit by one or two lines
+    """
+    cost = line_fit(x, y)[2]
+    for split in range(min_points, len(x) - min_points + 1):
+        cost = min(cost, line_fit(x[:split], y[:split])[2] + line_fit(x[split:], y[split:])[2])
+    return cost
+
+
+def call_overhead(sizes, times, steps=100):
+    """
+    Estimates constant per call overhead a of cost curve a + b * n ^ k
+    (interpreter and call costs), which flattens the curve at small sizes
+    and would be found as a knee otherwise
+    The overhead is searched on grid below the smallest time, the one giving
+    the best fit of remaining time by one or two power laws is returned
+    """
+    x = numpy.log(sizes)
+    best = None
+    for overhead in numpy.linspace(0.0, times.min(), steps, endpoint=False):
+        cost = split_cost(x, numpy.log(times - overhead))
+        if best is None or cost < best[0]:
+            best = cost, overhead
+    return float(best[1])
+
+
+def knee_points(sizes, times, min_points=3, min_change=0.3, max_knees=3):
+    """
+    Finds sizes where cost grows faster than before (e.g. data outgrow a
+    cache), cost curve is split in log-log scale to linear segments using
+    binary segmentation, split is accepted when the slope increases by at
+    least min_change
+    :return: list of dicts with size, slope-before and slope-after
+    """
+    x, y = numpy.log(sizes), numpy.log(times)
+    knees = list()
+    segments = [(0, len(x))]
+    while segments and len(knees) < max_knees:
+        start, stop = segments.pop()
+        if stop - start < 2 * min_points:
+            continue
+
+        whole = line_fit(x[start:stop], y[start:stop])[2]
+        best = None
+        for split in range(start + min_points, stop - min_points + 1):
+            left = line_fit(x[start:split], y[start:split])
+            right = line_fit(x[split:stop], y[split:stop])
+            cost = left[2] + right[2]
+            if best is None or cost < best[0]:
+                best = cost, split, left[0], right[0]
+
+        cost, split, before, after = best
+        if cost >= whole or after - before < min_change:
+            continue
+
+        knees.append({ 'size': int(sizes[split]), 'slope-before': float(before), 'slope-after': float(after) })
+        segments.append((start, split))
+        segments.append((split, stop))
+
+    knees.sort(key=lambda knee: knee['size'])
+    return knees
+
+
+def cost_curve(sizes, performances, window=None, min_calls=10):
+    """
+    Characterises kernel by its cost curve time = overhead + coefficient * n ^ exponent
+    Sizes measured with less than min_calls calls per window are quantised
+    (time is rounded to whole calls), they are reported but not fitted
+    :param sizes: problem sizes
+    :param performances: kernel calls per second at given size
+    :param window: duration of single measurement in seconds
+    :return: dict with time per call, fitted power law and knee points
+    """
+    sizes = numpy.asarray(sizes, dtype=numpy.float64)
+    performances = numpy.asarray(performances, dtype=numpy.float64)
+    valid = performances > 0
+    sizes, performances = sizes[valid], performances[valid]
+    times = 1.0 / performances
+
+    quantised = performances * window < min_calls if window else numpy.zeros(len(sizes), dtype=bool)
+    result = {
+        'size': sizes.astype(numpy.int64).tolist(),
+        'time': times.tolist(),
+        'quantised': sizes[quantised].astype(numpy.int64).tolist(),
+        'knees': list()
+    }
+
+    sizes, times = sizes[~quantised], times[~quantised]
+    if len(sizes) >= 2:
+        result['overhead'] = call_overhead(sizes, times)
+        result['coefficient'], result['exponent'] = power_fit(sizes, times - result['overhead'])
+        result['knees'] = knee_points(sizes, times - result['overhead'])
+    return result
+
+
+def parallel_scaling(results, threshold=0.75):
+    """
+    Computes speedup and parallel efficiency against single process
+    performance of the same test
+    :param results: clockrate results of single test (one per core count)
+    :param threshold: scaling is saturated when efficiency drops below it
+    :return: dict with processes, speedup, efficiency and saturation
+             (largest process count still above threshold)
+    """
+    results = sorted(results, key=lambda result: result['processes'])
+    base = [result['performance'] for result in results if result['processes'] == 1]
+    if not base or not base[0] > 0:
+        return None
+
+    processes = numpy.array([result['processes'] for result in results], dtype=numpy.float64)
+    speedup = numpy.array([result['performance'] for result in results], dtype=numpy.float64) / base[0]
+    efficiency = speedup / processes
+
+    # single process (efficiency 1) is always first
+    saturated = numpy.flatnonzero(efficiency < threshold)
+    limit = processes[saturated[0] - 1] if len(saturated) else processes[-1]
+
+    return {
+        'processes': processes.astype(numpy.int64).tolist(),
+        'speedup': speedup.tolist(),
+        'efficiency': efficiency.tolist(),
+        'saturation': int(limit)
+    }
@@ -0,0 +1,229 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import ctypes
+import os
+import shutil
+import tempfile
+
+from perf.abstract import AbstractProcess
+
+
+POSIX_FADV_DONTNEED = 4
+
+# size of test file of every worker
+file_size = 128 * 1024 * 1024
+chunk_size = 1024 * 1024
+block_size = 4096
+
+
+def load_fadvise():
+    try:
+        function = ctypes.CDLL(None, use_errno=True).posix_fadvise
+    except (OSError, AttributeError):
+        return None
+    function.argtypes = [ctypes.c_int, ctypes.c_int64, ctypes.c_int64, ctypes.c_int]
+    function.restype = ctypes.c_int
+    return function
+
+
+posix_fadvise = getattr(os, 'posix_fadvise', None) or load_fadvise()
+
+
+def drop_cache(fd):
+    """
+    Asks kernel to drop cached pages of the file so next read goes to the
+    device, returns False when not supported (results then include cache)
+    """
+    if posix_fadvise is None:
+        return False
+    try:
+        return posix_fadvise(fd, 0, 0, POSIX_FADV_DONTNEED) in (0, None)
+    except OSError:
+        return False
+
+
+class StorageTest(AbstractProcess):
+    """
+    Test determining STORAGE performance
+    Every worker uses its own file in temporary directory (created in
+    given directory, system default otherwise), file is written in set up
+    and cached pages are dropped before every pass over it
+    Test complexity is constant
+    """
+
+    def __init__(self, directory=None, size=file_size, **kwargs):
+        AbstractProcess.__init__(self, **kwargs)
+        self.directory = directory
+        self.size = size - size % chunk_size
+        self.location = None
+        self.filename = None
+
+    def setup(self):
+        self.location = tempfile.mkdtemp(prefix='clockrate-', dir=self.directory)
+        self.filename = os.path.join(self.location, 'data.bin')
+        self.create_file()
+
+    def create_file(self):
+        chunk = os.urandom(chunk_size)
+        fd = os.open(self.filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+        try:
+            for offset in range(0, self.size, chunk_size):
+                os.write(fd, chunk)
+            os.fsync(fd)
+            drop_cache(fd)
+        finally:
+            os.close(fd)
+
+    def teardown(self):
+        if self.location:
+            shutil.rmtree(self.location, ignore_errors=True)
+
+
+class SequentialWrite(StorageTest):
+    """
+    Writes file in 1 MB chunks, data are synced and dropped from cache
+    after every pass, score is number of bytes written
+    """
+
+    def create_file(self):
+        pass
+
+    def test(self, result):
+        chunk = os.urandom(chunk_size)
+        fd = os.open(self.filename, os.O_WRONLY | os.O_CREAT, 0600)
+        score = 0
+        try:
+            while not self.exit.is_set():
+                if score % self.size == 0:
+                    os.fsync(fd)
+                    drop_cache(fd)
+                    os.lseek(fd, 0, os.SEEK_SET)
+                score += os.write(fd, chunk)
+                result.value = score
+        finally:
+            os.close(fd)
+
+
+class SequentialRead(StorageTest):
+    """
+    Reads file in 1 MB chunks, score is number of bytes read
+    """
+
+    def test(self, result):
+        fd = os.open(self.filename, os.O_RDONLY)
+        score = 0
+        try:
+            while not self.exit.is_set():
+                data = os.read(fd, chunk_size)
+                if not data:
+                    drop_cache(fd)
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    continue
+                score += len(data)
+                result.value = score
+        finally:
+            os.close(fd)
+
+
+class RandomRead(StorageTest):
+    """
+    Reads 4 kB blocks at random aligned offsets, score is number of reads
+    """
+
+    def test(self, result):
+        import random
+
+        rnd = random.Random(1234)
+        blocks = self.size // block_size
+        offsets = [rnd.randrange(blocks) * block_size for i in range(min(blocks, 65536))]
+
+        fd = os.open(self.filename, os.O_RDONLY)
+        score = 0
+        try:
+            while not self.exit.is_set():
+                if score % len(offsets) == 0:
+                    drop_cache(fd)
+                os.lseek(fd, offsets[score % len(offsets)], os.SEEK_SET)
+                os.read(fd, block_size)
+                score += 1
+                result.value = score
+        finally:
+            os.close(fd)
+
+
+class ReadScan(StorageTest):
+    """
+    Scans file using read() into reused buffer and sums its content,
+    score is number of bytes scanned
+    """
+
+    def test(self, result):
+        import numpy
+
+        buffer = bytearray(chunk_size)
+        values = numpy.frombuffer(buffer, dtype=numpy.uint64)
+        score = 0
+        with open(self.filename, 'rb', 0) as fp:
+            while not self.exit.is_set():
+                read = fp.readinto(buffer)
+                if not read:
+                    drop_cache(fp.fileno())
+                    fp.seek(0)
+                    continue
+                values.sum()
+                score += read
+                result.value = score
+
+
+class MmapScan(StorageTest):
+    """
+    Scans memory mapped file chunk by chunk and sums its content, file
+    is mapped again after every pass, score is number of bytes scanned
+    """
+
+    def test(self, result):
+        import mmap
+        import numpy
+
+        score = 0
+        with open(self.filename, 'rb') as fp:
+            while not self.exit.is_set():
+                drop_cache(fp.fileno())
+                mapped = mmap.mmap(fp.fileno(), self.size, access=mmap.ACCESS_READ)
+                values = None
+                try:
+                    values = numpy.frombuffer(mapped, dtype=numpy.uint64)
+                    step = chunk_size // values.itemsize
+                    for start in range(0, len(values), step):
+                        if self.exit.is_set():
+                            break
+                        values[start:start + step].sum()
+                        score += chunk_size
+                        result.value = score
+                finally:
+                    del values
+                    mapped.close()
+
+
+class FsyncLatency(StorageTest):
+    """
+    Rewrites single 4 kB block and syncs it to the device, score is
+    number of fsync calls
+    """
+
+    def create_file(self):
+        pass
+
+    def test(self, result):
+        block = os.urandom(block_size)
+        fd = os.open(self.filename, os.O_WRONLY | os.O_CREAT, 0600)
+        score = 0
+        try:
+            while not self.exit.is_set():
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, block)
+                os.fsync(fd)
+                score += 1
+                result.value = score
+        finally:
+            os.close(fd)
@@ -0,0 +1,93 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from perf.abstract import AbstractProcess
+
+
+# elements of each array, 3 arrays of 32 MB are well beyond last level cache
+stream_size = 2 ** 22
+
+
+class StreamTest(AbstractProcess):
+    """
+    Test determining MEMORY bandwidth (STREAM benchmark)
+    Score is number of bytes moved, counted as in STREAM (each array
+    element read or written once per iteration)
+    Test complexity is constant
+    """
+
+    # number of arrays accessed by kernel
+    arrays = 2
+
+    def __init__(self, size=stream_size, **kwargs):
+        AbstractProcess.__init__(self, **kwargs)
+        self.size = size
+
+    def setup(self):
+        import numpy
+
+        # arrays are written so all pages are mapped before the test starts
+        self.a = numpy.full(self.size, 1.0)
+        self.b = numpy.full(self.size, 2.0)
+        self.c = numpy.zeros(self.size)
+        self.scalar = 3.0
+
+    def kernel(self, a, b, c):
+        pass
+
+    def test(self, result):
+        a, b, c = self.a, self.b, self.c
+        moved = self.arrays * a.itemsize * self.size
+        score = 0
+        while not self.exit.is_set():
+            self.kernel(a, b, c)
+            score += moved
+            result.value = score
+
+
+class StreamCopy(StreamTest):
+    """
+    c = a
+    """
+
+    def kernel(self, a, b, c):
+        c[:] = a
+
+
+class StreamScale(StreamTest):
+    """
+    b = scalar * c
+    """
+
+    def kernel(self, a, b, c):
+        import numpy
+
+        numpy.multiply(c, self.scalar, out=b)
+
+
+class StreamAdd(StreamTest):
+    """
+    c = a + b
+    """
+
+    arrays = 3
+
+    def kernel(self, a, b, c):
+        import numpy
+
+        numpy.add(a, b, out=c)
+
+
+class StreamTriad(StreamTest):
+    """
+    a = b + scalar * c
+    numpy needs two passes (a is read and written once more than in
+    STREAM), only STREAM traffic is counted
+    """
+
+    arrays = 3
+
+    def kernel(self, a, b, c):
+        import numpy
+
+        numpy.multiply(c, self.scalar, out=a)
+        numpy.add(a, b, out=a)
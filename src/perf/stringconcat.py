@@ -16,5 +16,5 @@ class StringConcat(AbstractProcess):
         while not self.exit.is_set():
             a += 'a'
             score = i
-            i += 1
-        result.value = score
\ No newline at end of file
+            result.value = score
+            i += 1
\ No newline at end of file
@@ -1,20 +1,27 @@
 # encoding: utf-8
 # author:   Jan Hybs
-from perf.abstract import AbstractProcess
+from perf.abstract import ScalableProcess
 
 
-class StringConcat(AbstractProcess):
+class StringConcat(ScalableProcess):
     """
     Test determining MEMORY performance
     Test complexity is not constant
     """
 
-    def test(self, result):
+    def setup(self):
+        if self.size is not None:
+            self.data = self.size * 'a'
+
+    def test_growing(self, result):
         i = 0
         a = 'a'
         score = 0
         while not self.exit.is_set():
             a += i * 'a'
             score = i
+            result.value = score
             i += 1
-        result.value = score
\ No newline at end of file
+
+    def kernel(self, n):
+        a = self.data + self.data
\ No newline at end of file
@@ -0,0 +1,57 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import numpy
+
+
+def throughput(times, counts):
+    """
+    Returns throughput (operations per second) in every sampling interval
+    :param times: sample times in seconds
+    :param counts: number of operations done until given sample
+    :return: tuple (interval midpoints, throughput) as numpy arrays
+    """
+    times = numpy.asarray(times, dtype=numpy.float64)
+    counts = numpy.asarray(counts, dtype=numpy.float64)
+    elapsed = numpy.diff(times)
+    rates = numpy.diff(counts) / numpy.where(elapsed > 0, elapsed, numpy.nan)
+    return (times[1:] + times[:-1]) / 2, rates
+
+
+def warmup_intervals(rates, tolerance=0.1, window=3):
+    """
+    Returns number of leading intervals belonging to warm-up phase
+    Steady throughput is the median of the second half of the series, run
+    is warmed up once moving average over window intervals reaches steady
+    throughput minus tolerance. At most half of the series is warm-up, so
+    turbo decay or throttling later in the run is never cut off
+    """
+    rates = numpy.asarray(rates, dtype=numpy.float64)
+    n = len(rates)
+    if n < 2 * window:
+        return 0
+
+    steady = numpy.nanmedian(rates[n // 2:])
+    if not steady > 0:
+        return 0
+
+    smooth = numpy.convolve(numpy.nan_to_num(rates), numpy.ones(window) / window, mode='valid')
+    reached = numpy.flatnonzero(smooth >= (1 - tolerance) * steady)
+    return min(int(reached[0]) if len(reached) else 0, n // 2)
+
+
+def analyse(times, counts, tolerance=0.1, window=3):
+    """
+    Splits worker timeline into warm-up and steady phase
+    :return: dict with warm-up duration, steady throughput and throughput series
+    """
+    midpoints, rates = throughput(times, counts)
+    skip = warmup_intervals(rates, tolerance, window)
+
+    elapsed = times[-1] - times[skip] if len(times) > 1 else 0
+    steady = (counts[-1] - counts[skip]) / float(elapsed) if elapsed > 0 else 0.0
+    return {
+        'warmup': float(times[skip]) if len(times) else 0.0,
+        'performance': steady,
+        'time': midpoints.tolist(),
+        'throughput': numpy.nan_to_num(rates).tolist()
+    }
@@ -0,0 +1,74 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import json
+from optparse import OptionParser
+
+from analysis.derived import annotate_derived
+from analysis.diff import diff_trees, to_json, diff_metrics
+from analysis.tree import ProfilerTree
+from utils.decoder import ProfilerJSONDecoder
+from utils.timer import Timer
+
+
+timer = Timer()
+
+
+def create_parser():
+    """Creates command line parse"""
+    parser = OptionParser(usage="%prog [options] left.json right.json",
+                          epilog="Aligns two profiler runs by ist path and prints differences of their metrics")
+
+    parser.add_option("-m", "--metric", dest="metrics", default=[], action="append", metavar="METRIC",
+                      help="Compared metric, can be repeated, by default {:s}".format(', '.join(diff_metrics)))
+    parser.add_option("-s", "--sort", dest="sort", default="cumul-time", metavar="METRIC",
+                      help="Sort nodes by absolute difference of this metric")
+    parser.add_option("-n", "--top", dest="top", default=20, type="int", metavar="N",
+                      help="Number of printed nodes")
+    parser.add_option("-o", "--output", dest="output", default=None, metavar="FILE",
+                      help="Save whole diff to json file")
+    return parser
+
+
+def load_tree(filename):
+    with open(filename, 'r') as fp:
+        json_data = json.loads(fp.read(), encoding="utf-8", cls=ProfilerJSONDecoder)
+
+    tree = ProfilerTree.from_json(json_data)
+    annotate_derived(tree, json_data.get('run-process-count', 1))
+    return tree
+
+
+def main():
+    parser = create_parser()
+    (options, args) = parser.parse_args()
+    if len(args) != 2:
+        parser.error('exactly two files expected')
+
+    metrics = list(options.metrics or diff_metrics)
+    if options.sort not in metrics:
+        metrics.append(options.sort)
+
+    left, right = load_tree(args[0]), load_tree(args[1])
+    with timer.measured('diff of {:d} and {:d} nodes'.format(len(left), len(right))):
+        rows = to_json(diff_trees(left, right, metrics), options.sort)
+
+    for row in rows[:options.top]:
+        values = row[options.sort]
+        print "{:5s} {:>14s} {:>14s} {:>9s}  {:s}".format(
+            row['status'],
+            format_value(values['left'], '{:14.6f}'),
+            format_value(values['right'], '{:14.6f}'),
+            format_value(values['relative'], '{:+9.1%}'),
+            row['path'])
+
+    if options.output:
+        with open(options.output, 'w') as fp:
+            json.dump(rows, fp, indent=4)
+
+
+def format_value(value, fmt):
+    return '-' if value is None else fmt.format(value)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import datetime
+from optparse import OptionParser
+
+from mongodb.mongo_exec import MongoExec
+from utils.timer import Timer
+
+
+timer = Timer()
+
+
+def create_parser():
+    """Creates command line parse"""
+    parser = OptionParser(usage="%prog [options]",
+                          epilog="Drops expired metrics partitions after folding them into monthly rollups")
+
+    parser.add_option("-b", "--before", dest="before", default=None, metavar="YYYY-MM",
+                      help="Partitions of months before given one expire")
+    parser.add_option("-m", "--months", dest="months", default=None, type="int", metavar="N",
+                      help="Partitions older than N months expire (instead of --before)")
+    parser.add_option("-B", "--branch", dest="branches", default=[], action="append", metavar="BRANCH",
+                      help="Only partitions of given branch expire, can be repeated")
+    parser.add_option("-k", "--keep-branch", dest="keep_branches", default=[], action="append", metavar="BRANCH",
+                      help="Partitions of given branch never expire, can be repeated (default master)")
+    parser.add_option("-n", "--dry-run", dest="dry_run", default=False, action="store_true",
+                      help="Only list expired partitions")
+    return parser
+
+
+def months_ago(months, today=None):
+    """Returns month (YYYY-MM) given number of months before today"""
+    today = today or datetime.date.today()
+    index = today.year * 12 + today.month - 1 - months
+    return '{:04d}-{:02d}'.format(index // 12, index % 12 + 1)
+
+
+def main():
+    parser = create_parser()
+    (options, args) = parser.parse_args()
+
+    before = months_ago(options.months) if options.months is not None else options.before
+    if not before and not options.branches:
+        parser.error('specify --before, --months or --branch')
+
+    mongo = MongoExec(cache=False)
+    with timer.measured('dropping partitions'):
+        names = mongo.drop_partitions(before, options.branches, options.keep_branches or ['master'],
+                                      options.dry_run)
+    mongo.close()
+
+    print ":: {:s} {:d} partitions".format('expired' if options.dry_run else 'dropped', len(names))
+    for name in names:
+        print "   {:s}".format(name)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,33 @@
 # encoding: utf-8
 # author:   Jan Hybs
-from server import app
+import time
 
-app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+started = time.time()
+
+from flask import g
+
+from server import create_app
+from utils.timer import Timer
+
+app = create_app()
+print '{:80s} {:s}'.format('import and application setup', Timer.format_time(time.time() - started))
+
+first_request = [True]
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.time()
+
+
+@app.after_request
+def report_first_request(response):
+    if first_request[0]:
+        first_request[0] = False
+        now = time.time()
+        print '{:80s} {:s}'.format('first request', Timer.format_time(now - g.request_started))
+        print '{:80s} {:s}'.format('startup to first response', Timer.format_time(now - started))
+    return response
+
+
+app.run(host='0.0.0.0', port=5000, debug=True)
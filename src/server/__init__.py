@@ -1,12 +1,95 @@
 # encoding: utf-8
 # author:   Jan Hybs
+import threading
 
-from flask import Flask
+from flask import Flask, current_app
 
-from mongodb.mongo_exec import MongoExec
 
+_lock = threading.Lock()
 
-app = Flask(__name__)
-mongo = MongoExec()
 
-from server.views import index
\ No newline at end of file
+def create_app():
+    """
+    Creates and configures flask application
+    Backends are not touched here, connection is opened on first request
+    which needs it (see get_mongo)
+    :return: Flask
+    """
+    app = Flask(__name__)
+
+    from server.utils.flask_utils import register_context_processors
+    from server.views.index import index
+    from server.views.api import api
+
+    register_context_processors(app)
+    app.register_blueprint(index)
+    app.register_blueprint(api)
+    return app
+
+
+def get_extension(name, factory):
+    """
+    Returns object stored in current application under given name, object
+    is created using factory on first call
+    """
+    value = current_app.extensions.get(name)
+    if value is None:
+        with _lock:
+            value = current_app.extensions.get(name)
+            if value is None:
+                value = current_app.extensions[name] = factory()
+    return value
+
+
+def create_mongo():
+    from mongodb.mongo_exec import MongoExec
+    return MongoExec()
+
+
+def create_executor():
+    from server.utils.executor import QueryExecutor
+    return QueryExecutor()
+
+
+def create_export_cache():
+    from mongodb.cache import QueryCache
+    return QueryCache(max_entries=256, validator=get_mongo().get_ingest_generation)
+
+
+def create_facets():
+    from analysis.facets import FacetIndex
+    return FacetIndex()
+
+
+def get_mongo():
+    """
+    Returns MongoExec instance of current application
+    :return: MongoExec
+    """
+    return get_extension('mongo', create_mongo)
+
+
+def get_executor():
+    """
+    Returns QueryExecutor instance of current application
+    :return: QueryExecutor
+    """
+    return get_extension('executor', create_executor)
+
+
+def get_export_cache():
+    """
+    Returns cache of generated exports (flame graphs) of current application,
+    cache is invalidated on ingest commit same as query cache
+    :return: QueryCache
+    """
+    return get_extension('export-cache', create_export_cache)
+
+
+def get_facets():
+    """
+    Returns facet index of current application, runs ingested since last
+    call are added (database is checked at most every 5 seconds)
+    :return: FacetIndex
+    """
+    return get_extension('facets', create_facets).update(get_mongo(), min_interval=5.0)
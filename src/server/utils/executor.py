@@ -0,0 +1,59 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
+import time
+
+
+class QueryExecutor(object):
+    """
+    Sends independent backend queries concurrently
+    Queries run in a pool of threads sharing single MongoExec (and therefore
+    single pooled MongoClient), so page latency is about the latency of the
+    slowest query instead of their sum
+    Every query gets keyword argument max_time_ms, so database aborts it
+    once the deadline passes and slow queries do not keep pool threads busy
+    """
+
+    def __init__(self, workers=8):
+        self.workers = workers
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ThreadPool(self.workers)
+        return self._pool
+
+    def run(self, queries, deadline=10.0):
+        """
+        Runs all queries and waits for them at most deadline seconds in total
+        Query which did not finish in time or raised exception is reported in
+        errors and does not affect other queries
+        :param queries: dict name -> (callable, args, kwargs), callable must
+                        accept keyword argument max_time_ms
+        :param deadline: time limit for whole batch in seconds
+        :return: tuple (results, errors) of dicts keyed by query name
+        """
+        end = time.time() + deadline
+        pending = dict()
+        for name, (method, args, kwargs) in queries.items():
+            kwargs = dict(kwargs, max_time_ms=max(int(deadline * 1000), 1))
+            pending[name] = self.pool.apply_async(method, args, kwargs)
+
+        results = dict()
+        errors = dict()
+        for name, async_result in pending.items():
+            try:
+                results[name] = async_result.get(max(end - time.time(), 0))
+            except TimeoutError:
+                errors[name] = 'deadline of {:1.3f} s exceeded'.format(deadline)
+            except Exception as e:
+                errors[name] = '{:s}: {:s}'.format(type(e).__name__, str(e))
+
+        return results, errors
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
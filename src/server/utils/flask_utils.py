@@ -1,10 +1,9 @@
+import datetime
 import functools
 import json
 
 from flask import render_template, request, Response, url_for, g
 
-from server import app
-
 
 def templated(template=None):
     """
@@ -69,12 +68,94 @@ def json_response(f):
     return decorated_function
 
 
+def json_default(obj):
+    """
+    Default serializer for values json module cannot handle (mongo ids, dates)
+    :param obj:
+    :return:
+    """
+    from bson.objectid import ObjectId
+
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    raise TypeError(repr(obj) + ' is not JSON serializable')
+
+
+compact_encoder = json.JSONEncoder(separators=(',', ':'), default=json_default)
+
+
+def iter_json_stream(items, limit=0, chunk_size=64 * 1024):
+    """
+    Generator which encodes items one by one and yields chunks of json
+    {"data":[...],"next":token} at least chunk_size long (except the last one)
+    Token is _id of last item if limit was reached, otherwise null
+    :param items: iterable of json serializable objects (e.g. mongo cursor)
+    :param limit: page size which was used when querying items
+    :param chunk_size: minimal size of single chunk
+    :return:
+    """
+    buffer = ['{"data":[']
+    buffered = len(buffer[0])
+    count = 0
+    last = None
+
+    for item in items:
+        chunk = compact_encoder.encode(item)
+        buffer.append(',' + chunk if count else chunk)
+        buffered += len(chunk) + 1
+        count += 1
+        last = item
+
+        if buffered >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+
+    token = last.get('_id') if limit and count == limit and last else None
+    buffer.append('],"next":' + compact_encoder.encode(token) + '}')
+    yield ''.join(buffer)
+
+
+def json_stream_response(f):
+    """
+    Decorator which expects function return value to be iterable of json
+    serializable objects or tuple (iterable, limit)
+    Items are encoded compactly and sent in chunks as they are fetched so
+    whole result is never held in memory
+    :param f:
+    :return:
+    """
+
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        result = f(*args, **kwargs)
+        if isinstance(result, Response):
+            return result
+
+        items, limit = result if type(result) is tuple else (result, 0)
+        return Response(iter_json_stream(items, limit), mimetype='application/json')
+
+    return decorated_function
+
+
 #
 # injectors
 #
 
 
-@app.context_processor
+def register_context_processors(app):
+    """
+    Registers all injectors to given application
+    :param app:
+    :return:
+    """
+    app.context_processor(inject_request_path_comparison)
+    app.context_processor(inject_get_title)
+    app.context_processor(inject_preview_str)
+
+
 def inject_request_path_comparison():
     """
     Injects method for comparing current location
@@ -87,7 +168,6 @@ def inject_request_path_comparison():
     return dict(match_location=match_location)
 
 
-@app.context_processor
 def inject_get_title():
     """
     Injects method for getting tittle from g object
@@ -100,7 +180,6 @@ def inject_get_title():
     return dict(get_title=get_title)
 
 
-@app.context_processor
 def inject_preview_str():
     """
     Injects method for shortening string if too long
@@ -0,0 +1,287 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import json
+
+from flask import Blueprint, Response, request, abort
+
+from server import get_mongo, get_executor, get_export_cache, get_facets
+from server.utils.flask_utils import json_stream_response, json_response
+
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+
+def parse_cursor(token):
+    """
+    Converts cursor token (or other id) from query string to ObjectId
+    :param token: value of 'cursor' argument or None
+    :return:
+    """
+    from bson.objectid import ObjectId
+
+    if not token:
+        return None
+    if not ObjectId.is_valid(token):
+        abort(400)
+    return ObjectId(token)
+
+
+def facet_query(args):
+    """
+    Extracts facet filter from query string (?program-branch=master&run-process-count=2),
+    values are matched to values known to facet index so numbers are compared as numbers,
+    unknown values are dropped (field filtered only by unknown values matches nothing)
+    :return: tuple (facets, query) or (facets, None) if no facet is filtered
+    """
+    facets = get_facets()
+    query = dict()
+    for field in facets.fields:
+        known = dict((unicode(value), value) for value in facets.bitmaps[field])
+        values = args.getlist(field)
+        if values:
+            query[field] = [known[value] for value in values if value in known]
+
+    return facets, query or None
+
+
+def facet_cond_ids(args):
+    """
+    Returns ids of runs matching facet filter in query string or None
+    """
+    facets, query = facet_query(args)
+    return facets.select(query) if query is not None else None
+
+
+@api.route('/series/<path:ist_id>')
+@json_stream_response
+def series(ist_id):
+    """
+    Streams all measured values of single ist node
+    Query string arguments:
+        fields  comma separated list of projected fields (default cumul-time)
+        limit   page size, 0 streams everything (default 0)
+        cursor  token 'next' from previous page
+    Runs can be filtered by facets (see /api/facets)
+    """
+    fields = request.args.get('fields', 'cumul-time').split(',')
+    limit = request.args.get('limit', 0, type=int)
+    after = parse_cursor(request.args.get('cursor'))
+
+    if limit < 0:
+        abort(400)
+
+    cond_ids = facet_cond_ids(request.args)
+    return get_mongo().find_field(ist_id, fields, after=after, limit=limit, cond_ids=cond_ids), limit
+
+
+@api.route('/downsampled/<path:ist_id>')
+@json_response
+def downsampled(ist_id):
+    """
+    Returns history of single field of ist node reduced to at most N points
+    Query string arguments:
+        field   plucked field (default cumul-time)
+        points  maximum number of returned points (default 500)
+        method  lttb or min-max (default lttb)
+    Runs can be filtered by facets (see /api/facets), runs without the
+    field are skipped (x is position of the run in whole history)
+    """
+    import numpy
+    from utils import downsample
+
+    field = request.args.get('field', 'cumul-time')
+    points = request.args.get('points', 500, type=int)
+    method = request.args.get('method', 'lttb')
+
+    if method not in downsample.methods or points < 1:
+        abort(400)
+
+    cursor = get_mongo().find_field(ist_id, [field], cond_ids=facet_cond_ids(request.args))
+    values = (item.get(field) for item in cursor)
+    y = numpy.fromiter((numpy.nan if value is None else value for value in values), dtype=numpy.float64)
+    x = numpy.arange(len(y))
+
+    # NaN is not valid json
+    valid = ~numpy.isnan(y)
+    reduced_x, reduced_y = downsample.downsample(x[valid], y[valid], points, method)
+
+    return {
+        'field': field,
+        'method': method,
+        'raw': int(valid.sum()),
+        'missing': int(len(y) - valid.sum()),
+        'reduced': len(reduced_y),
+        'x': reduced_x.tolist(),
+        'y': reduced_y.tolist()
+    }
+
+
+def parse_value(value, stored):
+    """
+    Converts query string value to number if the field is stored as number
+    (cond fields such as task-size or run-process-count), other fields
+    (e.g. branch named 2016) are compared as strings
+    :param stored: any stored value of the field
+    """
+    if isinstance(stored, bool) or not isinstance(stored, (int, long, float)):
+        return value
+
+    for cls in (int, float):
+        try:
+            return cls(value)
+        except ValueError:
+            pass
+    return value
+
+
+@api.route('/compare/<path:ist_id>')
+@json_response
+def compare(ist_id):
+    """
+    Returns values of single ist node for several conditions at once
+    Query string arguments:
+        by          cond field to compare by (default program-branch)
+        value       compared value, can be repeated
+        field       plucked field (default cumul-time)
+        deadline    time limit in seconds (default 10)
+    All queries are sent concurrently, values which failed or did not
+    finish in time are listed in errors
+    """
+    by = request.args.get('by', 'program-branch')
+    values = request.args.getlist('value')
+    field = request.args.get('field', 'cumul-time')
+    deadline = request.args.get('deadline', 10.0, type=float)
+
+    if not values:
+        abort(400)
+
+    mongo = get_mongo()
+    stored = mongo.get_cond_value(by)
+    queries = dict()
+    for value in values:
+        queries[value] = (mongo.pluck_field, (ist_id, field), { 'cond': { by: parse_value(value, stored) } })
+
+    results, errors = get_executor().run(queries, deadline)
+
+    data = dict()
+    for value, result in results.items():
+        result = list(result)
+        data[value] = result[0]['data'] if result else []
+
+    return {
+        'by': by,
+        'field': field,
+        'data': data,
+        'errors': errors
+    }
+
+
+@api.route('/diff')
+@json_response
+def diff():
+    """
+    Returns aligned diff of two runs
+    Query string arguments:
+        left    cond id of base run
+        right   cond id of compared run
+        metric  compared metric, can be repeated (default all diff metrics)
+        sort    rows are sorted by absolute delta of this metric (default cumul-time)
+    """
+    from analysis.diff import diff_trees, to_json, diff_metrics
+
+    left = parse_cursor(request.args.get('left'))
+    right = parse_cursor(request.args.get('right'))
+    metrics = request.args.getlist('metric') or None
+    sort = request.args.get('sort', 'cumul-time')
+
+    # rows are sorted by delta of compared metric only
+    if left is None or right is None or sort not in (metrics or diff_metrics):
+        abort(400)
+
+    mongo = get_mongo()
+    results, errors = get_executor().run({
+        'left': (mongo.get_run_tree, (left,), { }),
+        'right': (mongo.get_run_tree, (right,), { })
+    })
+    if errors:
+        abort(503)
+
+    if not len(results['left']) or not len(results['right']):
+        abort(404)
+
+    return {
+        'left': str(left),
+        'right': str(right),
+        'nodes': to_json(diff_trees(results['left'], results['right'], metrics), sort)
+    }
+
+
+@api.route('/flamegraph')
+def flamegraph():
+    """
+    Exports run or average of several runs as flame graph
+    Query string arguments:
+        run     cond id of the run, can be repeated
+        format  collapsed (text) or speedscope (json), default collapsed
+        metric  stack weight (default self-time)
+    Exports are generated once per combination of runs and kept in cache
+    """
+    from analysis import flamegraph
+
+    runs = sorted(set(request.args.getlist('run')))
+    export_format = request.args.get('format', 'collapsed')
+    metric = request.args.get('metric', 'self-time')
+
+    if not runs or export_format not in flamegraph.formats:
+        abort(400)
+
+    cache = get_export_cache()
+    key = 'flamegraph', tuple(runs), export_format, metric
+    found, output = cache.get(key)
+    if not found:
+        mongo = get_mongo()
+        trees = [mongo.get_run_tree(parse_cursor(run)) for run in runs]
+        if not all(len(tree) for tree in trees):
+            abort(404)
+
+        values = flamegraph.aggregate(trees, metric)
+        if export_format == 'collapsed':
+            output = flamegraph.collapsed_stacks(values)
+        else:
+            output = json.dumps(flamegraph.speedscope(values, ', '.join(runs)))
+        cache.put(key, output)
+
+    mimetype = 'text/plain' if export_format == 'collapsed' else 'application/json'
+    return Response(output, mimetype=mimetype)
+
+
+@api.route('/facets')
+@json_response
+def facets():
+    """
+    Returns number of runs for every value of every facet
+    Query string arguments are facet filters, e.g.
+        ?program-branch=master&program-branch=feature&run-process-count=2
+    values of single facet are OR-ed, different facets are AND-ed
+    """
+    index, query = facet_query(request.args)
+    query = query or { }
+    return {
+        'query': query,
+        'total': len(index),
+        'matched': len(index.select(query)) if query else len(index),
+        'counts': index.counts(query)
+    }
+
+
+@api.route('/cache')
+@json_response
+def cache_stats():
+    """
+    Returns hit/miss/eviction counters of the query cache
+    """
+    mongo = get_mongo()
+    return {
+        'query': mongo.cache.stats() if mongo.cache is not None else {},
+        'export': get_export_cache().stats()
+    }
@@ -0,0 +1,49 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import ctypes
+import time
+
+
+CLOCK_MONOTONIC = 1
+
+
+class timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+def load_clock_gettime():
+    """
+    Returns clock_gettime from libc (or librt on old glibc), None if not available
+    """
+    for name in (None, 'librt.so.1'):
+        try:
+            function = ctypes.CDLL(name, use_errno=True).clock_gettime
+        except (OSError, AttributeError):
+            continue
+        function.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+        function.restype = ctypes.c_int
+        return function
+    return None
+
+
+clock_gettime = load_clock_gettime()
+
+
+def clock_monotonic():
+    value = timespec()
+    if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(value)) != 0:
+        raise OSError(ctypes.get_errno(), 'clock_gettime failed')
+    return value.tv_sec + value.tv_nsec * 1e-9
+
+
+# monotonic high resolution clock shared by all processes of the node,
+# wall clock is used only when neither python nor libc provides one
+if hasattr(time, 'monotonic'):
+    monotonic = time.monotonic
+    clock_name = 'time.monotonic'
+elif clock_gettime is not None:
+    monotonic = clock_monotonic
+    clock_name = 'clock_gettime'
+else:
+    monotonic = time.time
+    clock_name = 'time.time'
@@ -0,0 +1,115 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import numpy
+
+
+def bucket_edges(length, buckets, start=0, stop=None):
+    """
+    Splits index interval <start, stop) into given number of buckets
+    of (nearly) equal size
+    :return: numpy array of buckets + 1 edges
+    """
+    stop = length if stop is None else stop
+    return numpy.linspace(start, stop, buckets + 1).astype(numpy.int64)
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+    First and last points are always kept, rest of the series is split into
+    threshold - 2 buckets and from each bucket point forming largest triangle
+    with previously selected point and average of next bucket is selected.
+    Buckets must be processed in order (selection depends on previous one),
+    but all points in a bucket are evaluated at once
+    :param x: numpy array of x values (sorted)
+    :param y: numpy array of y values
+    :param threshold: maximum number of returned points
+    :return: numpy array of selected indices
+    """
+    length = len(y)
+    if threshold >= length:
+        return numpy.arange(length)
+    if threshold < 3:
+        return numpy.array([0, length - 1])[:max(threshold, 0)]
+
+    x = numpy.asarray(x, dtype=numpy.float64)
+    y = numpy.asarray(y, dtype=numpy.float64)
+
+    edges = bucket_edges(length, threshold - 2, 1, length - 1)
+
+    # averages of all buckets computed at once, point after last bucket is
+    # the last point itself
+    sizes = numpy.diff(edges)
+    avg_x = numpy.append(numpy.add.reduceat(x, edges[:-1]) / sizes, x[-1])
+    avg_y = numpy.append(numpy.add.reduceat(y, edges[:-1]) / sizes, y[-1])
+
+    result = numpy.empty(threshold, dtype=numpy.int64)
+    result[0] = 0
+    result[-1] = length - 1
+
+    selected = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # double area of triangle (selected, candidate, next average)
+        area = numpy.abs(
+            (x[selected] - avg_x[i + 1]) * (y[lo:hi] - y[selected]) -
+            (x[selected] - x[lo:hi]) * (avg_y[i + 1] - y[selected])
+        )
+        selected = lo + int(numpy.argmax(area))
+        result[i + 1] = selected
+
+    return result
+
+
+def min_max(x, y, threshold):
+    """
+    Min/max per bucket downsampling
+    Series is split into threshold / 2 buckets and from each bucket minimum
+    and maximum are kept (in original order) so no peak is lost, with
+    threshold 1 only the maximum is kept
+    :param x: numpy array of x values (sorted)
+    :param y: numpy array of y values
+    :param threshold: maximum number of returned points
+    :return: numpy array of selected indices
+    """
+    length = len(y)
+    if threshold >= length:
+        return numpy.arange(length)
+
+    y = numpy.asarray(y, dtype=numpy.float64)
+    if threshold < 2:
+        return numpy.array([numpy.argmax(y)])[:max(threshold, 0)]
+
+    buckets = threshold // 2
+    edges = bucket_edges(length, buckets)
+    bucket = numpy.repeat(numpy.arange(buckets), numpy.diff(edges))
+
+    # sort indices by bucket and then by value, first item of each bucket is
+    # minimum and last one maximum
+    order = numpy.lexsort((y, bucket))
+    first = edges[:-1]
+    last = edges[1:] - 1
+
+    result = numpy.unique(numpy.concatenate((order[first], order[last])))
+    return result
+
+
+methods = {
+    'lttb': lttb,
+    'min-max': min_max,
+}
+
+
+def downsample(x, y, threshold, method='lttb'):
+    """
+    Reduces series to at most threshold points
+    :param x: x values
+    :param y: y values
+    :param threshold: maximum number of points
+    :param method: name of the method in downsample.methods
+    :return: tuple of numpy arrays (x, y)
+    """
+    x = numpy.asarray(x)
+    y = numpy.asarray(y)
+    indices = methods[method](x, y, threshold)
+    return x[indices], y[indices]
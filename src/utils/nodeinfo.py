@@ -0,0 +1,274 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import hashlib
+import json
+import os
+import platform
+import re
+import tempfile
+
+from utils.topology import cpu_root, parse_cpu_list, read_value, read_topology
+
+
+proc_root = '/proc'
+node_root = '/sys/devices/system/node'
+hugepage_root = '/sys/kernel/mm/transparent_hugepage'
+
+# static part of node info does not change until reboot, file is invalidated by boot id
+cache_file = os.path.join(tempfile.gettempdir(), 'clockrate-node-{}.json'.format(os.getuid()))
+
+# fields of static info describing hardware class of the node
+fingerprint_fields = [
+    ('cpu', 'name'), ('cpu', 'physical'), ('cpu', 'logical'), ('cpu', 'caches'), ('cpu', 'smt'),
+    ('numa', 'nodes'), ('memory', 'total-gb')
+]
+
+_cache = dict()
+
+
+def parse_key_values(text, separator=':'):
+    """
+    Parses 'key: value' lines (/proc/cpuinfo, /proc/meminfo) to list of
+    blocks (dicts) separated by empty lines
+    """
+    blocks, block = list(), dict()
+    for line in text.split('\n'):
+        if not line.strip():
+            if block:
+                blocks.append(block)
+            block = dict()
+            continue
+        if separator in line:
+            key, value = line.split(separator, 1)
+            block[key.strip()] = value.strip()
+    if block:
+        blocks.append(block)
+    return blocks
+
+
+def parse_size(value):
+    """
+    Parses sizes like '48K', '2048 kB', '32M' to bytes
+    """
+    match = re.match(r'\s*(\d+)\s*([kKmMgG]?)', value or '')
+    if not match:
+        return None
+    return int(match.group(1)) * 1024 ** ' kmg'.index(match.group(2).lower() or ' ')
+
+
+def read_cpuinfo(root=proc_root):
+    """
+    Reads cpu model and frequency from /proc/cpuinfo
+    """
+    blocks = [block for block in parse_key_values(read_value(os.path.join(root, 'cpuinfo'), ''))
+              if 'processor' in block]
+    if not blocks:
+        return dict()
+
+    first = blocks[0]
+    info = {
+        'name': first.get('model name', first.get('Processor')),
+        'vendor': first.get('vendor_id'),
+        'flags': sorted(first.get('flags', first.get('Features', '')).split())
+    }
+    frequencies = [float(block['cpu MHz']) for block in blocks if 'cpu MHz' in block]
+    if frequencies:
+        info['frequency'] = max(frequencies)
+    return info
+
+
+def read_meminfo(root=proc_root):
+    """
+    Reads /proc/meminfo
+    :return: dict name -> bytes (counts such as HugePages_Total stay counts)
+    """
+    blocks = parse_key_values(read_value(os.path.join(root, 'meminfo'), ''))
+    meminfo = dict()
+    for key, value in (blocks[0] if blocks else dict()).items():
+        meminfo[key] = parse_size(value) if value.lower().endswith('kb') else int(value.split()[0])
+    return meminfo
+
+
+def read_caches(root=cpu_root, cpu=0):
+    """
+    Reads caches of given cpu from sysfs
+    :return: list of dicts with level, type, size (bytes) and shared (number
+             of cpus sharing the cache)
+    """
+    directory = os.path.join(root, 'cpu{:d}'.format(cpu), 'cache')
+    if not os.path.isdir(directory):
+        return list()
+
+    caches = list()
+    for name in sorted(os.listdir(directory)):
+        if not name.startswith('index'):
+            continue
+        path = os.path.join(directory, name)
+        caches.append({
+            'level': int(read_value(os.path.join(path, 'level'), 0)),
+            'type': read_value(os.path.join(path, 'type')),
+            'size': parse_size(read_value(os.path.join(path, 'size'))),
+            'shared': len(parse_cpu_list(read_value(os.path.join(path, 'shared_cpu_list'), str(cpu))))
+        })
+    caches.sort(key=lambda cache: (cache['level'], cache['type']))
+    return caches
+
+
+def read_numa(root=node_root):
+    """
+    Reads NUMA nodes with their cpus and memory
+    """
+    online = read_value(os.path.join(root, 'online'))
+    if online is None:
+        return list()
+
+    nodes = list()
+    for node in parse_cpu_list(online):
+        directory = os.path.join(root, 'node{:d}'.format(node))
+        meminfo = read_value(os.path.join(directory, 'meminfo'), '')
+        match = re.search(r'MemTotal:\s*(\d+\s*kB)', meminfo)
+        nodes.append({
+            'node': node,
+            'cpus': parse_cpu_list(read_value(os.path.join(directory, 'cpulist'), '')),
+            'memory': parse_size(match.group(1)) if match else None
+        })
+    return nodes
+
+
+def read_frequency_scaling(root=cpu_root, cpu=0):
+    directory = os.path.join(root, 'cpu{:d}'.format(cpu), 'cpufreq')
+    maximum = read_value(os.path.join(directory, 'cpuinfo_max_freq'))
+    return {
+        'governor': read_value(os.path.join(directory, 'scaling_governor')),
+        'driver': read_value(os.path.join(directory, 'scaling_driver')),
+        'max-frequency': int(maximum) / 1000.0 if maximum else None
+    }
+
+
+def read_smt(root=cpu_root):
+    """
+    Returns SMT control state (can be switched at runtime)
+    """
+    return {
+        'control': read_value(os.path.join(root, 'smt', 'control')),
+        'active': read_value(os.path.join(root, 'smt', 'active')) == '1'
+    }
+
+
+def selected(value):
+    """
+    Returns selected option of sysfs settings like 'always [madvise] never'
+    """
+    match = re.search(r'\[(\w+)\]', value or '')
+    return match.group(1) if match else value
+
+
+def read_hugepages(meminfo, root=hugepage_root):
+    return {
+        'transparent': selected(read_value(os.path.join(root, 'enabled'))),
+        'defrag': selected(read_value(os.path.join(root, 'defrag'))),
+        'size': meminfo.get('Hugepagesize'),
+        'total': meminfo.get('HugePages_Total')
+    }
+
+
+def boot_id(root=proc_root):
+    return read_value(os.path.join(root, 'sys', 'kernel', 'random', 'boot_id'))
+
+
+def fingerprint(info):
+    """
+    Returns hash of hardware class fields of node info, nodes with the
+    same fingerprint should perform the same
+    """
+    values = [info.get(group, dict()).get(name) for group, name in fingerprint_fields]
+    return hashlib.sha1(json.dumps(values, sort_keys=True)).hexdigest()[:16]
+
+
+def read_node_info():
+    """
+    Reads static node info from /proc and /sys (no subprocesses), values
+    which can change without reboot are read by read_runtime_info
+    """
+    topology = read_topology()
+    meminfo = read_meminfo()
+
+    cpu = read_cpuinfo()
+    cpu.pop('frequency', None)
+    cpu['logical'] = len(topology) or None
+    cpu['physical'] = len(set((item['package'], item['core']) for item in topology)) or None
+    cpu['architecture'] = platform.processor()
+    cpu['caches'] = read_caches()
+    # control and active state are runtime values
+    cpu['smt'] = { 'threads': max([item['thread'] for item in topology] or [0]) + 1 }
+
+    numa = read_numa()
+    info = {
+        'cpu': cpu,
+        'numa': { 'nodes': len(numa) or 1, 'layout': numa },
+        'memory': {
+            'total': meminfo.get('MemTotal'),
+            # rounded so kernel reservations do not change the fingerprint
+            'total-gb': int(round(meminfo.get('MemTotal', 0) / 1024.0 ** 3))
+        },
+        'system': {
+            'platform': platform.system(),
+            'processor': platform.processor(),
+            'version': platform.version(),
+            'machine': platform.machine(),
+            'node': platform.node(),
+            'release': platform.release()
+        }
+    }
+    return info
+
+
+def read_runtime_info(info):
+    """
+    Adds values which can change at runtime to node info: current cpu
+    frequency, governor, SMT state, hugepage settings and available memory
+    """
+    meminfo = read_meminfo()
+    frequency = read_cpuinfo().get('frequency')
+    if frequency is not None:
+        info['cpu']['frequency'] = frequency
+    info['cpu'].update(read_frequency_scaling())
+    info['cpu'].setdefault('smt', dict()).update(read_smt())
+    info['memory']['hugepages'] = read_hugepages(meminfo)
+    info['memory']['avail'] = meminfo.get('MemAvailable', meminfo.get('MemFree'))
+    info['fingerprint'] = fingerprint(info)
+    return info
+
+
+def node_info(filename=cache_file, refresh=False):
+    """
+    Returns node info, static part is cached in memory and in given file
+    for the current boot (boot id), use refresh to read it again
+    Runtime values (see read_runtime_info) are read on every call
+    """
+    current = boot_id()
+    if refresh or _cache.get('boot-id') != current:
+        _cache.clear()
+        if not refresh and current and filename:
+            try:
+                with open(filename, 'r') as fp:
+                    stored = json.load(fp)
+                if stored.get('boot-id') == current:
+                    _cache.update(stored)
+            except (IOError, OSError, ValueError):
+                pass
+
+        if not _cache:
+            _cache.update({ 'boot-id': current, 'info': read_node_info() })
+            if current and filename:
+                try:
+                    with open(filename, 'w') as fp:
+                        json.dump(_cache, fp)
+                except (IOError, OSError):
+                    pass
+
+    return read_runtime_info(json.loads(json.dumps(_cache['info'])))
+
+
+if __name__ == '__main__':
+    print json.dumps(node_info(refresh=True), indent=4, sort_keys=True)
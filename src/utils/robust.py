@@ -0,0 +1,86 @@
+# encoding: utf-8
+# author:   Jan Hybs
+
+
+def median(values):
+    values = sorted(values)
+    n = len(values)
+    if not n:
+        return None
+    middle = n // 2
+    return values[middle] if n % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+def mad(values, center=None):
+    """
+    Returns median absolute deviation from center (median by default)
+    """
+    center = median(values) if center is None else center
+    return median([abs(value - center) for value in values])
+
+
+def median_interval(values, confidence=0.95):
+    """
+    Returns distribution-free confidence interval of the median
+    Interval is formed by order statistics x(j) and x(n-j), j is the
+    largest index with P(B <= j) <= (1 - confidence) / 2 where B ~ Bin(n, 1/2)
+    :return: tuple (low, high) or None if there are too few values
+             for given confidence (at least 6 for 95 %)
+    """
+    values = sorted(values)
+    n = len(values)
+    alpha = (1 - confidence) / 2.0
+
+    j = -1
+    probability = 0.5 ** n
+    cumulative = probability
+    while j + 1 < n // 2 and cumulative <= alpha:
+        j += 1
+        probability *= float(n - j) / (j + 1)
+        cumulative += probability
+
+    if j < 0:
+        return None
+    return values[j], values[n - 1 - j]
+
+
+def outliers(values, center, deviation, threshold=3.5):
+    """
+    Returns number of values with modified z-score above threshold
+    (|x - median| > threshold * 1.4826 * MAD)
+    :return: tuple (low, high) outlier counts
+    """
+    limit = threshold * 1.4826 * deviation
+    if not limit:
+        return 0, 0
+    low = sum(1 for value in values if value < center - limit)
+    high = sum(1 for value in values if value > center + limit)
+    return low, high
+
+
+def summary(values, confidence=0.95, threshold=3.5):
+    """
+    Returns robust description of the sample
+    ci-width is width of the median confidence interval relative to the
+    median (None if interval cannot be computed yet)
+    """
+    center = median(values)
+    deviation = mad(values, center)
+    interval = median_interval(values, confidence)
+    low, high = outliers(values, center, deviation, threshold)
+
+    width = None
+    if interval is not None and center:
+        width = (interval[1] - interval[0]) / float(abs(center))
+
+    return {
+        'samples': len(values),
+        'median': center,
+        'mad': deviation,
+        'ci-low': interval[0] if interval else None,
+        'ci-high': interval[1] if interval else None,
+        'ci-width': width,
+        'confidence': confidence,
+        'outliers-low': low,
+        'outliers-high': high
+    }
@@ -1,21 +1,29 @@
 # encoding: utf-8
 # author:   Jan Hybs
 
-from subprocess import check_output
-from utils.strings import extract_number
 from collections import namedtuple
+import multiprocessing
+
+from utils.nodeinfo import read_meminfo
+from utils.topology import read_topology, get_affinity
 
 
 def cpu_count(logical=True):
-    return int(
-        check_output('nproc', shell=True).strip()
-    )
+    # read from sysfs directly (nproc would cost a subprocess), as with nproc
+    # only cpus the process may run on (affinity, cpuset) are counted
+    allowed = get_affinity()
+    topology = [item for item in read_topology() if allowed is None or item['cpu'] in allowed]
+    if not topology:
+        return len(allowed) if allowed else multiprocessing.cpu_count()
+    if logical:
+        return len(topology)
+    return len(set((item['package'], item['core']) for item in topology))
 
 
 def virtual_memory():
-    memory_info = check_output('cat /proc/meminfo', shell=True).strip()
+    memory_info = read_meminfo()
     info = namedtuple('memory', ['available', 'total'])
     return info(
-        long(extract_number(memory_info, 'MemFree') * 1024),
-        long(extract_number(memory_info, 'MemTotal') * 1024)
-    )
\ No newline at end of file
+        long(memory_info.get('MemAvailable', memory_info.get('MemFree'))),
+        long(memory_info['MemTotal'])
+    )
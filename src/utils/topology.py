@@ -0,0 +1,131 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import ctypes
+import os
+import re
+
+
+cpu_root = '/sys/devices/system/cpu'
+
+
+def parse_cpu_list(value):
+    """
+    Parses kernel cpu list format (0-3,8,10-11) to list of integers
+    """
+    cpus = list()
+    for part in value.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            start, stop = part.split('-')
+            cpus.extend(range(int(start), int(stop) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def read_value(filename, default=None):
+    try:
+        with open(filename, 'r') as fp:
+            return fp.read().strip()
+    except (IOError, OSError):
+        return default
+
+
+def read_topology(root=cpu_root):
+    """
+    Reads topology of online cpus from sysfs
+    :return: list of dicts with cpu, core, package, node and thread (index
+             of the cpu among SMT siblings of its core)
+    """
+    online = read_value(os.path.join(root, 'online'))
+    if online is None:
+        return list()
+
+    topology = list()
+    for cpu in parse_cpu_list(online):
+        directory = os.path.join(root, 'cpu{:d}'.format(cpu))
+        siblings = parse_cpu_list(read_value(os.path.join(directory, 'topology', 'thread_siblings_list'), str(cpu)))
+        nodes = [int(name[4:]) for name in os.listdir(directory) if re.match(r'node\d+$', name)] \
+            if os.path.isdir(directory) else []
+
+        topology.append({
+            'cpu': cpu,
+            'core': int(read_value(os.path.join(directory, 'topology', 'core_id'), cpu)),
+            'package': int(read_value(os.path.join(directory, 'topology', 'physical_package_id'), 0)),
+            'node': nodes[0] if nodes else 0,
+            'thread': sorted(siblings).index(cpu) if cpu in siblings else 0
+        })
+    return topology
+
+
+def pin_order(topology):
+    """
+    Returns cpus in order workers should be pinned to: physical cores of
+    the first NUMA node, then their SMT siblings, then other NUMA nodes
+    (same way), so first N workers never share a core unless necessary
+    """
+    ordered = sorted(topology, key=lambda item: (item['node'], item['thread'], item['package'], item['core'],
+                                                 item['cpu']))
+    return [item['cpu'] for item in ordered]
+
+
+def libc_setaffinity(pid, cpus):
+    mask_type = ctypes.c_ulong * (1024 // (8 * ctypes.sizeof(ctypes.c_ulong)))
+    mask = mask_type()
+    bits = 8 * ctypes.sizeof(ctypes.c_ulong)
+    for cpu in cpus:
+        mask[cpu // bits] |= 1 << (cpu % bits)
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.sched_setaffinity(pid, ctypes.sizeof(mask), ctypes.byref(mask)) != 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+
+
+def libc_getaffinity(pid=0):
+    mask_type = ctypes.c_ulong * (1024 // (8 * ctypes.sizeof(ctypes.c_ulong)))
+    mask = mask_type()
+    bits = 8 * ctypes.sizeof(ctypes.c_ulong)
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.sched_getaffinity(pid, ctypes.sizeof(mask), ctypes.byref(mask)) != 0:
+        return None
+    return [cpu for cpu in range(len(mask) * bits) if mask[cpu // bits] >> (cpu % bits) & 1]
+
+
+def set_affinity(cpus, pid=0):
+    """
+    Restricts process (current by default) to given cpus, uses
+    os.sched_setaffinity (python 3), psutil or sched_setaffinity from libc
+    """
+    if hasattr(os, 'sched_setaffinity'):
+        return os.sched_setaffinity(pid, cpus)
+
+    try:
+        import psutil
+        return psutil.Process(pid or os.getpid()).cpu_affinity(list(cpus))
+    except (ImportError, AttributeError):
+        pass
+
+    return libc_setaffinity(pid, cpus)
+
+
+def get_affinity(pid=0):
+    """
+    Returns sorted cpus process (current by default) may run on (affinity
+    and cpuset), None when it cannot be determined
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(pid))
+
+    try:
+        import psutil
+        return sorted(psutil.Process(pid or os.getpid()).cpu_affinity())
+    except (ImportError, AttributeError):
+        pass
+
+    try:
+        return libc_getaffinity(pid)
+    except (OSError, AttributeError):
+        return None
@@ -0,0 +1,164 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import json
+import time
+from unittest import TestCase
+
+from bson.objectid import ObjectId
+
+from analysis.facets import FacetIndex
+from server import create_app
+from server.utils.executor import QueryExecutor
+from server.utils.flask_utils import iter_json_stream
+
+
+class FakeMongo(object):
+    """
+    Backend stub returning fixed documents, app never connects to database
+    """
+
+    def __init__(self, documents=None):
+        self.documents = documents or list()
+        self.cache = None
+
+    def find_field(self, ist_id, fields, after=None, limit=0, cond_ids=None):
+        documents = [item for item in self.documents if (cond_ids is None or item['cond_id'] in cond_ids) and
+                     (after is None or item['_id'] > after)]
+        return documents[:limit] if limit else documents
+
+    def get_cond_value(self, field):
+        return { 'program-branch': 'master', 'run-process-count': 1 }.get(field)
+
+    def pluck_field(self, id, pluck_field, cond=None, max_time_ms=None):
+        self.max_time_ms = max_time_ms
+        return [{ 'data': [cond] }]
+
+
+class ApiTestCase(TestCase):
+    def setUp(self):
+        self.mongo = FakeMongo([{ '_id': ObjectId('5a{:022d}'.format(i)), 'cond_id': i, 'cumul-time': float(i) }
+                                for i in range(10)])
+        self.facets = FacetIndex()
+        for i in range(10):
+            self.facets.add(i, { 'program-branch': 'master' if i % 2 else 'feature', 'run-process-count': i % 2 + 1 })
+        # index is considered fresh, database is not checked
+        self.facets.last_update = time.time() + 3600
+
+        self.app = create_app()
+        self.app.extensions['mongo'] = self.mongo
+        self.app.extensions['facets'] = self.facets
+        self.client = self.app.test_client()
+
+    def get_json(self, url, status=200):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status)
+        return json.loads(response.data) if status == 200 else None
+
+
+class TestFacetApi(ApiTestCase):
+    def test_facets(self):
+        data = self.get_json('/api/facets?program-branch=master')
+        self.assertEqual(data['matched'], 5)
+        self.assertEqual(data['total'], 10)
+
+        # value is compared with its stored type
+        self.assertEqual(self.get_json('/api/facets?run-process-count=2')['matched'], 5)
+
+    def test_unknown_value(self):
+        self.assertEqual(self.get_json('/api/facets?program-branch=nosuchbranch')['matched'], 0)
+        self.assertEqual(self.get_json('/api/series/x?program-branch=nosuchbranch')['data'], [])
+        self.assertEqual(len(self.get_json('/api/series/x?program-branch=master')['data']), 5)
+
+
+class TestJsonStream(TestCase):
+    items = [{ '_id': i, 'value': 'x' * i } for i in range(10)]
+
+    def test_chunks(self):
+        chunks = list(iter_json_stream(self.items, chunk_size=16))
+        self.assertGreater(len(chunks), 2)
+        self.assertTrue(all(len(chunk) >= 16 for chunk in chunks[:-1]))
+        self.assertEqual(json.loads(''.join(chunks)), { 'data': self.items, 'next': None })
+
+    def test_next(self):
+        # token is given only when page is full
+        self.assertEqual(json.loads(''.join(iter_json_stream(self.items, limit=10)))['next'], 9)
+        self.assertEqual(json.loads(''.join(iter_json_stream(self.items, limit=20)))['next'], None)
+
+    def test_empty(self):
+        self.assertEqual(''.join(iter_json_stream(iter([]), limit=10)), '{"data":[],"next":null}')
+
+
+class TestSeriesApi(ApiTestCase):
+    def test_pages(self):
+        data, url = list(), '/api/series/x?limit=4'
+        while url:
+            page = self.get_json(url)
+            self.assertLessEqual(len(page['data']), 4)
+            data.extend(page['data'])
+            url = '/api/series/x?limit=4&cursor=' + page['next'] if page['next'] else None
+
+        self.assertEqual([item['cumul-time'] for item in data], [float(i) for i in range(10)])
+        self.assertEqual(data[3]['_id'], str(self.mongo.documents[3]['_id']))
+
+        self.get_json('/api/series/x?limit=-1', 400)
+        self.get_json('/api/series/x?cursor=invalid', 400)
+
+
+class TestDownsampledApi(ApiTestCase):
+    def test_missing_values(self):
+        for i in (2, 5):
+            del self.mongo.documents[i]['cumul-time']
+        self.mongo.documents[7]['cumul-time'] = None
+
+        for method in ('lttb', 'min-max'):
+            response = self.client.get('/api/downsampled/x?points=4&method=' + method)
+            self.assertNotIn('NaN', response.data)
+            data = json.loads(response.data)
+            self.assertEqual((data['raw'], data['missing']), (7, 3))
+            self.assertLessEqual(data['reduced'], 4)
+            self.assertTrue(set(data['x']) <= set([0, 1, 3, 4, 6, 8, 9]))
+
+        self.get_json('/api/downsampled/x?points=0', 400)
+
+
+class TestCompareApi(ApiTestCase):
+    def test_value_type(self):
+        data = self.get_json('/api/compare/x?by=program-branch&value=2016&value=master')['data']
+        self.assertEqual(data['2016'], [{ 'program-branch': '2016' }])
+
+        data = self.get_json('/api/compare/x?by=run-process-count&value=2&deadline=0.5')['data']
+        self.assertEqual(data['2'], [{ 'run-process-count': 2 }])
+        self.assertEqual(self.mongo.max_time_ms, 500)
+
+
+class TestDiffApi(ApiTestCase):
+    def test_sort(self):
+        runs = 'left=5a0000000000000000000001&right=5a0000000000000000000002'
+        self.get_json('/api/diff?{:s}&sort=nosuchmetric'.format(runs), 400)
+        self.get_json('/api/diff?{:s}&metric=call-count'.format(runs), 400)
+
+
+class TestQueryExecutor(TestCase):
+    def setUp(self):
+        self.executor = QueryExecutor(workers=4)
+
+    def tearDown(self):
+        self.executor.close()
+
+    @staticmethod
+    def query(value, delay=0.0, max_time_ms=None):
+        if value is None:
+            raise ValueError('no value')
+        time.sleep(delay)
+        return value, max_time_ms
+
+    def test_partial_failure(self):
+        results, errors = self.executor.run({
+            'fast': (self.query, (1,), { }),
+            'slow': (self.query, (2,), { 'delay': 1.0 }),
+            'broken': (self.query, (None,), { })
+        }, deadline=0.2)
+
+        self.assertEqual(results, { 'fast': (1, 200) })
+        self.assertIn('deadline', errors['slow'])
+        self.assertEqual(errors['broken'], 'ValueError: no value')
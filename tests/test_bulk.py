@@ -0,0 +1,28 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from unittest import TestCase
+
+import numpy
+
+from mongodb.bulk import fill_arrays, group_arrays
+
+
+class TestBulk(TestCase):
+    def setUp(self):
+        self.documents = [{ 'cumul-time': i * 0.5, 'call-count': i, 'cond_id': i % 3 } for i in range(100)]
+        del self.documents[10]['call-count']
+
+    def test_fill_arrays(self):
+        for count in (0, 10, 100, 1000):
+            arrays, keys = fill_arrays(iter(self.documents), ['cumul-time', 'call-count'], count, 'cond_id')
+            self.assertEqual(len(arrays['cumul-time']), 100)
+            self.assertEqual(len(keys), 100)
+            self.assertAlmostEqual(arrays['cumul-time'][99], 49.5)
+            self.assertTrue(numpy.isnan(arrays['call-count'][10]))
+
+    def test_group_arrays(self):
+        arrays, keys = fill_arrays(self.documents, ['cumul-time'], 100, 'cond_id')
+        groups = group_arrays(arrays, keys, { 0: 'a', 1: 'b', 2: 'a' })
+        self.assertEqual(sorted(groups), ['a', 'b'])
+        self.assertEqual(len(groups['a']['cumul-time']), 67)
+        self.assertTrue(numpy.array_equal(groups['b']['cumul-time'], numpy.arange(1, 100, 3) * 0.5))
@@ -0,0 +1,189 @@
+# encoding: utf-8
+# author:   Jan Hybs
+
+from unittest import TestCase
+
+from mongodb.cache import QueryCache, make_key, cached_query
+from mongodb.mongo_exec import MongoExec
+
+
+class Reader(object):
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = 0
+
+    @cached_query
+    def query(self, value):
+        self.calls += 1
+        return iter([{ 'data': [value] }])
+
+
+class FakeResult(object):
+    def __init__(self, upserted_id=None, inserted_id=None):
+        self.upserted_id = upserted_id
+        self.inserted_id = inserted_id
+
+
+class FakeCollection(list):
+    """
+    Minimal collection supporting calls used by partition registry
+    """
+
+    name = None
+
+    def __init__(self, *args):
+        list.__init__(self, *args)
+        self.indexes = list()
+
+    def find(self, *args):
+        return FakeCollection(self)
+
+    def sort(self, *args):
+        return self
+
+    def find_one(self, query, projection=None):
+        # only equality and $exists are supported
+        for item in self:
+            if all(key in item if isinstance(value, dict) else item.get(key) == value
+                   for key, value in query.items()):
+                return item
+        return None
+
+    def update_one(self, query, update, upsert=False):
+        if any(item['_id'] == query['_id'] for item in self):
+            return FakeResult()
+        self.append(dict(update.get('$setOnInsert', { }), _id=query['_id']))
+        return FakeResult(query['_id'])
+
+    def insert_one(self, document):
+        self.append(document)
+        return FakeResult(inserted_id=len(self))
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append(keys)
+
+
+class FakeDatabase(object):
+    def __init__(self):
+        self.collections = dict()
+
+    def __getattr__(self, name):
+        return self[name]
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection()
+            self.collections[name].name = name
+        return self.collections[name]
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.test = FakeDatabase()
+
+
+class TestQueryCache(TestCase):
+    def test_lru_eviction(self):
+        cache = QueryCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual(cache.get('a'), (True, 1))
+        self.assertEqual(cache.get('b'), (False, None))
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 1)
+
+    def test_size_eviction(self):
+        cache = QueryCache(max_size=1000, max_item_size=1000)
+        cache.put('a', 'x' * 400)
+        cache.put('b', 'x' * 400)
+        cache.put('c', 'x' * 400)
+        self.assertEqual(cache.get('a'), (False, None))
+        self.assertLessEqual(cache.size, 1000)
+        self.assertFalse(cache.put('d', 'x' * 2000))
+
+    def test_validator_invalidates(self):
+        generation = [0]
+        cache = QueryCache(validator=lambda: generation[0], check_interval=0)
+        cache.put('a', 1)
+        self.assertEqual(cache.get('a'), (True, 1))
+        generation[0] += 1
+        self.assertEqual(cache.get('a'), (False, None))
+        self.assertEqual(cache.invalidations, 1)
+
+    def test_key_ignores_dict_order(self):
+        a = make_key('pluck_fields', (), { 'match': { 'x': 1, 'y': [1, 2] } })
+        b = make_key('pluck_fields', (), { 'match': { 'y': [1, 2], 'x': 1 } })
+        self.assertEqual(a, b)
+        hash(a)
+
+
+class TestCachedQuery(TestCase):
+    def test_result_is_copied(self):
+        reader = Reader(QueryCache())
+        result = reader.query(1)
+        result[0]['data'] = [2]
+        result.append({ 'data': [3] })
+        self.assertEqual(reader.query(1), [{ 'data': [1] }])
+        # nested values are shared, not copied
+        self.assertIs(reader.query(1)[0]['data'], reader.query(1)[0]['data'])
+        self.assertEqual(reader.calls, 1)
+
+    def test_same_type_without_cache(self):
+        self.assertEqual(Reader(None).query(1), Reader(QueryCache()).query(1))
+
+    def test_scalar_result(self):
+        from server.views.api import parse_value
+
+        mongo = MongoExec(cache=True)
+        mongo._client = FakeClient()
+        mongo.cond.extend([{ '_id': 1, 'run-process-count': 2, 'program-branch': '2016' }])
+        for i in range(2):
+            self.assertEqual(mongo.get_cond_value('run-process-count'), 2)
+            self.assertEqual(mongo.get_cond_value('program-branch'), '2016')
+            self.assertEqual(mongo.get_cond_value('nosuchfield'), None)
+        self.assertEqual(mongo.cache.hits, 3)
+
+        self.assertEqual(parse_value('4', mongo.get_cond_value('run-process-count')), 4)
+        self.assertEqual(parse_value('2017', mongo.get_cond_value('program-branch')), '2017')
+
+    def test_registered_partition_is_routed(self):
+        for cache in (True, False):
+            mongo = MongoExec(cache=cache)
+            mongo._client = FakeClient()
+            self.assertEqual(mongo.get_partition_names(), ['metrics'])
+
+            mongo.register_partition({ '_id': 'metrics_2015_06', 'branch': None, 'month': '2015-06' })
+            self.assertEqual(mongo.get_partition_names(), ['metrics_2015_06'])
+            mongo.register_partition({ '_id': 'metrics_2015_07', 'branch': None, 'month': '2015-07' })
+            self.assertEqual(mongo.get_partition_names(since='2015-07'), ['metrics_2015_07'])
+
+    def test_commit_hooks(self):
+        mongo = MongoExec(cache=False)
+        mongo._client = FakeClient()
+        calls = list()
+        mongo.add_commit_hook(lambda: calls.append(len(calls)))
+        mongo.commit()
+        mongo.commit()
+        self.assertEqual(calls, [0, 1])
+
+    def test_metrics_indexes(self):
+        mongo = MongoExec(cache=False)
+        mongo._client = FakeClient()
+        collection = mongo.register_partition({ '_id': 'metrics_2015_06', 'branch': None, 'month': '2015-06' })
+        # streaming by ist node in _id order is covered by index
+        self.assertIn([('ist_id', 1), ('_id', 1)], collection.indexes)
+
+    def test_node_indexes(self):
+        mongo = MongoExec(cache=False)
+        mongo._client = FakeClient()
+        result = { 'architecture': { 'system': { 'node': 'a' } }, 'perf': { } }
+        for i in range(3):
+            mongo.insert_node_result(result)
+
+        # indexes are created once, not on every insert
+        self.assertEqual(len(mongo.nodes), 3)
+        self.assertEqual([keys[0][0] for keys in mongo.nodes.indexes], ['hostname', 'fingerprint'])
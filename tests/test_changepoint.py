@@ -0,0 +1,37 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from unittest import TestCase
+
+import numpy
+
+from analysis.changepoint import binary_segmentation
+
+
+class TestBinarySegmentation(TestCase):
+    def setUp(self):
+        self.rnd = numpy.random.RandomState(1234)
+
+    def test_single_step(self):
+        series = numpy.concatenate((1.0 + self.rnd.normal(0, 0.01, 60), 1.3 + self.rnd.normal(0, 0.01, 40)))
+        self.assertEqual(binary_segmentation(series), [60])
+
+    def test_two_steps(self):
+        series = numpy.concatenate((numpy.ones(30), numpy.ones(30) * 2, numpy.ones(30))) + \
+                 self.rnd.normal(0, 0.05, 90)
+        self.assertEqual(binary_segmentation(series), [30, 60])
+
+    def test_noise_only(self):
+        series = 1.0 + self.rnd.normal(0, 0.01, 200)
+        self.assertEqual(binary_segmentation(series), [])
+
+    def test_quantised(self):
+        # most differences are zero, noise must not be estimated as zero
+        self.assertEqual(binary_segmentation(numpy.ones(20) * 7), [])
+        self.assertEqual(binary_segmentation([1, 1, 1, 1, 2, 1] * 20), [])
+
+        series = [1, 1, 1, 1, 2, 1] * 10 + [3, 3, 3, 3, 4, 3] * 10
+        self.assertEqual(binary_segmentation(series), [60])
+
+        # plateaus
+        series = [5.0] * 40 + [6.0] * 40 + [5.0] * 40
+        self.assertEqual(binary_segmentation(series), [40, 80])
@@ -0,0 +1,82 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import copy
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy
+
+from analysis.columnar import MetricsMatrix
+from analysis.derived import annotate_derived
+from analysis.regression import RegressionDetector
+from analysis.tree import ProfilerTree
+from utils.decoder import ProfilerJSONDecoder
+
+
+example = os.path.join(os.path.dirname(__file__), '..', 'data', 'example.json')
+
+
+class ExampleStore(object):
+    """
+    Temporary store location and example run shared by store tests
+    """
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        with open(example, 'r') as fp:
+            self.json_data = json.loads(fp.read(), cls=ProfilerJSONDecoder)
+
+    def tearDown(self):
+        shutil.rmtree(self.location)
+
+    def create_tree(self, scale):
+        json_data = copy.deepcopy(self.json_data)
+        tree = ProfilerTree.from_json(json_data)
+        for node in tree.nodes:
+            node['cumul-time'] *= scale
+        annotate_derived(tree)
+        return json_data, tree
+
+
+class TestMetricsMatrix(ExampleStore, TestCase):
+    def test_append_and_reopen(self):
+        store = MetricsMatrix(self.location)
+        for i in range(100):
+            json_data, tree = self.create_tree(i + 1)
+            json_data['run-process-count'] = i % 2 + 1
+            store.on_ingest('run-{:d}'.format(i), json_data, tree)
+
+        # duplicate run is ignored
+        store.on_ingest('run-0', *self.create_tree(1))
+
+        # whole batch is written at once
+        self.assertFalse(os.path.exists(store.runs_file))
+        store.flush()
+
+        store = MetricsMatrix(self.location)
+        history = store.history('cumul-time', ',Whole Program,')
+        self.assertEqual(history.shape, (100,))
+        self.assertAlmostEqual(history[9], 10 * self.json_data['children'][0]['cumul-time'])
+        self.assertEqual(store.select(run_process_count=2).sum(), 50)
+        self.assertFalse(numpy.isnan(store.matrix('self-time')).any())
+
+
+class TestRegressionDetector(ExampleStore, TestCase):
+    def test_detect(self):
+        store = MetricsMatrix(self.location)
+        rnd = numpy.random.RandomState(1234)
+        for i in range(20):
+            store.on_ingest('run-{:d}'.format(i), *self.create_tree(1000 * (1 + rnd.random_sample() * 0.01)))
+
+        json_data, tree = self.create_tree(1000)
+        path = ',Whole Program,HC run simulation,Solving MH system,'
+        tree.nodes[tree.index[path]]['cumul-time'] *= 1.3
+
+        detector = RegressionDetector(store, summary=0)
+        report = detector.on_ingest('new', json_data, tree)
+        self.assertEqual(report['baseline-runs'], 20)
+        self.assertEqual([item['path'] for item in report['regressions']], [path])
+        self.assertAlmostEqual(report['regressions'][0]['ratio'], 0.3, places=1)
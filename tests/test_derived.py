@@ -0,0 +1,50 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import json
+import os
+from unittest import TestCase
+
+import numpy
+
+from analysis.derived import compute_derived, annotate_derived
+from analysis.tree import ProfilerTree, parent_path
+from utils.decoder import ProfilerJSONDecoder
+
+
+example = os.path.join(os.path.dirname(__file__), '..', 'data', 'example.json')
+
+
+class TestDerived(TestCase):
+    def setUp(self):
+        with open(example, 'r') as fp:
+            self.json_data = json.loads(fp.read(), cls=ProfilerJSONDecoder)
+        self.tree = ProfilerTree.from_json(self.json_data)
+
+    def test_tree_paths(self):
+        self.assertEqual(self.tree.paths[0], ',Whole Program,')
+        self.assertEqual(self.tree.parents[0], -1)
+        for path, parent in zip(self.tree.paths[1:], self.tree.parents[1:]):
+            self.assertEqual(self.tree.paths[parent], parent_path(path))
+
+    def test_from_documents(self):
+        documents = [dict(node, ist_id=path) for path, node in zip(self.tree.paths, self.tree.nodes)]
+        tree = ProfilerTree.from_documents(reversed(documents))
+        self.assertEqual(sorted(tree.paths), sorted(self.tree.paths))
+        for i, path in enumerate(tree.paths):
+            expected = parent_path(path)
+            self.assertEqual(tree.paths[tree.parents[i]] if tree.parents[i] >= 0 else None, expected)
+
+    def test_self_time(self):
+        derived = compute_derived(self.tree)
+        whole = self.tree.index[',Whole Program,']
+        children = [i for i, p in enumerate(self.tree.parents) if p == whole]
+        expected = self.tree.nodes[whole]['cumul-time'] - sum(self.tree.nodes[i]['cumul-time'] for i in children)
+        self.assertAlmostEqual(derived['self-time'][whole], max(expected, 0.0))
+        self.assertTrue(numpy.all(derived['self-time'] >= 0))
+
+    def test_annotate(self):
+        annotate_derived(self.tree, 1)
+        node = self.tree.nodes[self.tree.index[',Whole Program,HC run simulation,Solving MH system,']]
+        self.assertAlmostEqual(node['time-per-call'], node['cumul-time'] / 3)
+        self.assertAlmostEqual(node['imbalance'], 1.0)
+        self.assertAlmostEqual(node['efficiency'], 1.0)
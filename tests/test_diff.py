@@ -0,0 +1,38 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import copy
+import json
+import os
+from unittest import TestCase
+
+from analysis.diff import diff_trees, to_json
+from analysis.tree import ProfilerTree
+from utils.decoder import ProfilerJSONDecoder
+
+
+example = os.path.join(os.path.dirname(__file__), '..', 'data', 'example.json')
+
+
+class TestDiff(TestCase):
+    def setUp(self):
+        with open(example, 'r') as fp:
+            self.json_data = json.loads(fp.read(), cls=ProfilerJSONDecoder)
+        self.tree = ProfilerTree.from_json(self.json_data)
+
+    def test_diff(self):
+        right = ProfilerTree.from_json(copy.deepcopy(self.json_data))
+        right.nodes[1]['cumul-time'] *= 2
+        right.nodes[-1]['tag'] = 'renamed'
+        right = ProfilerTree.from_json(right.nodes[0])
+
+        result = diff_trees(self.tree, right, ['cumul-time'])
+        self.assertEqual(len(result['paths']), len(self.tree) + 1)
+        self.assertEqual(sorted(result['status'].tolist()).count('both'), len(self.tree) - 1)
+
+        values = result['metrics']['cumul-time']
+        self.assertAlmostEqual(values['relative'][1], 1.0)
+        self.assertEqual(values['delta'][0], 0.0)
+
+        rows = to_json(result, 'cumul-time')
+        self.assertEqual(rows[0]['path'], self.tree.paths[1])
+        self.assertEqual(rows[-1]['cumul-time']['delta'], None)
@@ -0,0 +1,45 @@
+# encoding: utf-8
+# author:   Jan Hybs
+
+from unittest import TestCase
+
+import numpy
+
+from utils.downsample import lttb, min_max, downsample
+
+
+class TestDownsample(TestCase):
+    def setUp(self):
+        rnd = numpy.random.RandomState(1234)
+        self.x = numpy.arange(10000, dtype=numpy.float64)
+        self.y = rnd.random_sample(10000)
+        self.y[4321] = 50.0
+        self.y[7654] = -50.0
+
+    def test_lttb_keeps_peaks(self):
+        indices = lttb(self.x, self.y, 100)
+        self.assertEqual(len(indices), 100)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 9999)
+        self.assertTrue(numpy.all(numpy.diff(indices) > 0))
+        self.assertIn(4321, indices)
+        self.assertIn(7654, indices)
+
+    def test_min_max_keeps_peaks(self):
+        indices = min_max(self.x, self.y, 100)
+        self.assertLessEqual(len(indices), 100)
+        self.assertTrue(numpy.all(numpy.diff(indices) > 0))
+        self.assertIn(4321, indices)
+        self.assertIn(7654, indices)
+
+    def test_short_series_untouched(self):
+        for method in ('lttb', 'min-max'):
+            x, y = downsample(self.x[:10], self.y[:10], 100, method)
+            self.assertTrue(numpy.array_equal(y, self.y[:10]))
+
+    def test_threshold_respected(self):
+        for method in ('lttb', 'min-max'):
+            for threshold in (0, 1, 2, 3, 101):
+                x, y = downsample(self.x, self.y, threshold, method)
+                self.assertLessEqual(len(y), threshold)
+        self.assertEqual(min_max(self.x, self.y, 1).tolist(), [4321])
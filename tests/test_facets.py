@@ -0,0 +1,47 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import datetime
+from unittest import TestCase
+
+from analysis.facets import FacetIndex, build_date
+
+
+class TestFacetIndex(TestCase):
+    def setUp(self):
+        self.index = FacetIndex()
+        for i in range(100):
+            self.index.add(i, {
+                'program-branch': 'master' if i % 2 else 'feature',
+                'task-description': 'Test10',
+                'task-size': 942,
+                'run-process-count': i % 4 + 1,
+                'program-build': 'Jun 18 2015, 11:05:14 flags: -g -O0'
+            })
+
+    def test_select(self):
+        ids = self.index.select({ 'program-branch': ['master'], 'run-process-count': [2, 4] })
+        self.assertEqual(ids, [i for i in range(100) if i % 2 and i % 4 + 1 in (2, 4)])
+        self.assertEqual(len(self.index.select({ 'program-branch': ['unknown'] })), 0)
+        self.assertEqual(len(self.index.select({ })), 100)
+
+    def test_unknown_value(self):
+        # unknown values are dropped by the api, empty list must not disable the filter
+        self.assertEqual(self.index.select({ 'program-branch': [] }), [])
+        self.assertEqual(self.index.select({ 'program-branch': [], 'run-process-count': [2] }), [])
+        counts = self.index.counts({ 'program-branch': [] })
+        self.assertEqual(counts['program-branch'], { 'master': 50, 'feature': 50 })
+        self.assertEqual(counts['run-process-count'], { 1: 0, 2: 0, 3: 0, 4: 0 })
+
+    def test_counts(self):
+        counts = self.index.counts({ 'program-branch': ['master'] })
+        # counts of filtered facet ignore its own filter
+        self.assertEqual(counts['program-branch'], { 'master': 50, 'feature': 50 })
+        self.assertEqual(counts['run-process-count'], { 1: 0, 2: 25, 3: 0, 4: 25 })
+        self.assertEqual(counts['build-date'], { '2015-06-18': 50 })
+
+    def test_add_duplicate(self):
+        self.index.add(0, { })
+        self.assertEqual(len(self.index), 100)
+
+    def test_build_date(self):
+        self.assertEqual(build_date({ 'run-started-at': datetime.datetime(2015, 7, 28) }), '2015-07-28')
@@ -0,0 +1,28 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import json
+import os
+from unittest import TestCase
+
+from analysis.flamegraph import aggregate, collapsed_stacks, speedscope
+from analysis.tree import ProfilerTree
+from utils.decoder import ProfilerJSONDecoder
+
+
+example = os.path.join(os.path.dirname(__file__), '..', 'data', 'example.json')
+
+
+class TestFlamegraph(TestCase):
+    def setUp(self):
+        with open(example, 'r') as fp:
+            self.tree = ProfilerTree.from_json(json.loads(fp.read(), cls=ProfilerJSONDecoder))
+
+    def test_flamegraph(self):
+        values = aggregate([self.tree, self.tree])
+        self.assertAlmostEqual(sum(values.values()), self.tree.nodes[0]['cumul-time'])
+
+        lines = collapsed_stacks(values).splitlines()
+        self.assertIn('Whole Program;HC run simulation;Solving MH system;full assembly 423', lines)
+
+        profile = speedscope(values)['profiles'][0]
+        self.assertEqual(len(profile['samples']), len(profile['weights']))
@@ -0,0 +1,129 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from utils import nodeinfo, simple_psutil
+
+
+cpuinfo = """processor\t: 0
+vendor_id\t: GenuineIntel
+model name\t: Intel(R) Xeon(R) CPU E5-2630 v3 @ 2.40GHz
+cpu MHz\t\t: 1200.000
+flags\t\t: fpu sse2 avx2
+
+processor\t: 1
+vendor_id\t: GenuineIntel
+model name\t: Intel(R) Xeon(R) CPU E5-2630 v3 @ 2.40GHz
+cpu MHz\t\t: 2400.000
+flags\t\t: fpu sse2 avx2
+"""
+
+meminfo = """MemTotal:       16384000 kB
+MemFree:         1024000 kB
+MemAvailable:    8192000 kB
+HugePages_Total:       4
+Hugepagesize:       2048 kB
+"""
+
+
+class TestNodeInfo(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, path, content):
+        filename = os.path.join(self.root, path)
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        with open(filename, 'w') as fp:
+            fp.write(content)
+
+    def test_parse(self):
+        self.assertEqual(nodeinfo.parse_size('48K'), 48 * 1024)
+        self.assertEqual(nodeinfo.parse_size('2048 kB'), 2 * 1024 * 1024)
+        self.assertEqual(nodeinfo.parse_size(None), None)
+        self.assertEqual(nodeinfo.selected('always [madvise] never'), 'madvise')
+
+    def test_proc(self):
+        self.write('cpuinfo', cpuinfo)
+        self.write('meminfo', meminfo)
+
+        cpu = nodeinfo.read_cpuinfo(self.root)
+        self.assertEqual(cpu['vendor'], 'GenuineIntel')
+        self.assertEqual(cpu['frequency'], 2400.0)
+        self.assertEqual(cpu['flags'], ['avx2', 'fpu', 'sse2'])
+
+        memory = nodeinfo.read_meminfo(self.root)
+        self.assertEqual(memory['MemAvailable'], 8192000 * 1024)
+        self.assertEqual(memory['HugePages_Total'], 4)
+
+    def test_sys(self):
+        for index, (level, kind, size) in enumerate([(2, 'Unified', '256K'), (1, 'Data', '32K')]):
+            directory = 'cpu/cpu0/cache/index{:d}/'.format(index)
+            self.write(directory + 'level', str(level))
+            self.write(directory + 'type', kind)
+            self.write(directory + 'size', size)
+            self.write(directory + 'shared_cpu_list', '0-1')
+        self.write('node/online', '0-1')
+        self.write('node/node1/cpulist', '2-3')
+        self.write('node/node1/meminfo', 'Node 1 MemTotal:  1024 kB\n')
+
+        caches = nodeinfo.read_caches(os.path.join(self.root, 'cpu'))
+        self.assertEqual([cache['level'] for cache in caches], [1, 2])
+        self.assertEqual(caches[1], { 'level': 2, 'type': 'Unified', 'size': 256 * 1024, 'shared': 2 })
+
+        numa = nodeinfo.read_numa(os.path.join(self.root, 'node'))
+        self.assertEqual(numa[1], { 'node': 1, 'cpus': [2, 3], 'memory': 1024 * 1024 })
+        self.assertEqual(numa[0]['cpus'], [])
+
+    def test_cache(self):
+        if nodeinfo.boot_id() is None:
+            return
+
+        filename = os.path.join(self.root, 'node.json')
+        info = nodeinfo.node_info(filename, refresh=True)
+        self.assertEqual(info['fingerprint'], nodeinfo.fingerprint(info))
+        self.assertIn('avail', info['memory'])
+
+        # stored info is used for the same boot only
+        with open(filename, 'r') as fp:
+            stored = json.load(fp)
+        stored['info']['cpu']['name'] = 'cached'
+        stored['info']['memory']['hugepages'] = 'stale'
+        with open(filename, 'w') as fp:
+            json.dump(stored, fp)
+        nodeinfo._cache.clear()
+        info = nodeinfo.node_info(filename)
+        self.assertEqual(info['cpu']['name'], 'cached')
+        # runtime values are never taken from cache
+        self.assertIsInstance(info['memory']['hugepages'], dict)
+
+        stored['boot-id'] = 'other'
+        with open(filename, 'w') as fp:
+            json.dump(stored, fp)
+        nodeinfo._cache.clear()
+        self.assertNotEqual(nodeinfo.node_info(filename)['cpu']['name'], 'cached')
+        nodeinfo._cache.clear()
+
+    def test_cpu_count(self):
+        topology = [{ 'cpu': cpu, 'core': cpu % 2, 'package': 0, 'node': 0, 'thread': cpu // 2 } for cpu in range(4)]
+        functions = simple_psutil.get_affinity, simple_psutil.read_topology
+        try:
+            # only cpus of the cpuset are counted
+            simple_psutil.read_topology = lambda: topology
+            simple_psutil.get_affinity = lambda: [0, 2]
+            self.assertEqual((simple_psutil.cpu_count(), simple_psutil.cpu_count(logical=False)), (2, 1))
+
+            # without sysfs
+            simple_psutil.read_topology = lambda: []
+            self.assertEqual(simple_psutil.cpu_count(), 2)
+            simple_psutil.get_affinity = lambda: None
+            self.assertGreater(simple_psutil.cpu_count(), 0)
+        finally:
+            simple_psutil.get_affinity, simple_psutil.read_topology = functions
@@ -0,0 +1,52 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import numpy
+from unittest import TestCase
+
+from analysis.nodestats import performance_matrix, compare_nodes, drift
+from node_history import group_results
+
+
+def result(hostname, **performance):
+    perf = dict((test.replace('_', '-'), [{ 'processes': 1, 'performance': value },
+                                          { 'processes': 2, 'performance': 2 * value }])
+                for test, value in performance.items())
+    return { 'hostname': hostname, 'fingerprint': 'abc', 'perf': perf }
+
+
+class TestNodeStats(TestCase):
+    tests = ['for-loop', 'factorial']
+
+    def test_matrix(self):
+        results = [result('a', for_loop=10.0, factorial=20.0), result('a', for_loop=12.0)]
+        matrix = performance_matrix(results, self.tests)
+        self.assertEqual(matrix[0].tolist(), [10.0, 20.0])
+        self.assertTrue(numpy.isnan(matrix[1, 1]))
+        self.assertEqual(performance_matrix(results, self.tests, processes=2)[1, 0], 24.0)
+
+    def test_compare(self):
+        results = [result('fast', for_loop=200.0, factorial=40.0), result('slow', for_loop=100.0, factorial=20.0),
+                   result('base', for_loop=100.0, factorial=40.0)] * 2
+        histories, fingerprints = group_results(results)
+        self.assertEqual(len(histories['fast']), 2)
+        self.assertEqual(fingerprints['slow'], 'abc')
+
+        comparison = compare_nodes(histories, self.tests)
+        self.assertEqual(comparison['nodes'], ['base', 'fast', 'slow'])
+        self.assertEqual(comparison['relative'].tolist(), [[1.0, 1.0], [2.0, 1.0], [1.0, 0.5]])
+        self.assertAlmostEqual(comparison['score'][1], 2 ** 0.5)
+
+    def test_drift(self):
+        noise = [1.0, -1.0, 0.5, 0.0, -0.5]
+        stable = [result('a', for_loop=100.0 + value, factorial=50.0) for value in noise]
+        self.assertEqual(drift(stable, self.tests), None)
+
+        # for-loop degrades by 20 %, factorial is unchanged
+        history = stable + [result('a', for_loop=80.0 + value, factorial=50.0) for value in noise[:3]]
+        report = drift(history, self.tests)
+        self.assertEqual(report['drifted'], ['for-loop'])
+        self.assertAlmostEqual(report['change'][0], -0.195)
+        self.assertEqual(report['z'][1], 0.0)
+        self.assertEqual(report['deviation'].shape, (8, 2))
+
+        self.assertEqual(drift(stable + stable[:3], self.tests)['drifted'], [])
@@ -0,0 +1,61 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import datetime
+from unittest import TestCase
+
+from analysis.normalise import node_score, relative_score, Normaliser
+from analysis.tree import ProfilerTree
+
+
+def perf(value, test='for-loop'):
+    return { test: [{ 'processes': 1, 'performance': value }, { 'processes': 2, 'performance': 2 * value }] }
+
+
+class NodeResults(object):
+    def __init__(self, results):
+        self.results = results
+
+    def get_node_results(self, hostname):
+        return [item for item in self.results if item['hostname'] == hostname]
+
+    def get_reference_result(self):
+        return { 'perf': perf(100.0), 'score': 100.0 }
+
+
+class TestNormaliser(TestCase):
+    def test_node_score(self):
+        self.assertAlmostEqual(node_score(perf(100.0)), 100.0)
+        self.assertAlmostEqual(node_score(dict(perf(100.0), **{ 'hash-sha': perf(400.0)['for-loop'] })), 200.0)
+        self.assertIsNone(node_score({ }))
+
+    def test_relative_score(self):
+        # reference ran more tests, only the common one is compared
+        reference = dict(perf(100.0), **perf(400.0, 'hash-sha'))
+        self.assertAlmostEqual(relative_score(perf(50.0), reference), 0.5)
+        self.assertAlmostEqual(relative_score(dict(perf(50.0), **perf(800.0, 'hash-sha')), reference), 1.0)
+        self.assertIsNone(relative_score(perf(50.0, 'factorial'), reference))
+
+    def test_annotate(self):
+        day = datetime.timedelta(days=1)
+        now = datetime.datetime(2015, 7, 1)
+        normaliser = Normaliser(NodeResults([
+            { '_id': 1, 'hostname': 'a', 'measured-at': now - 2 * day, 'score': 50.0, 'perf': perf(50.0) },
+            { '_id': 2, 'hostname': 'a', 'measured-at': now + day, 'score': 200.0, 'perf': perf(200.0) },
+            { '_id': 3, 'hostname': 'c', 'measured-at': now, 'score': 50.0, 'perf': perf(50.0, 'factorial') },
+        ]), hostname='a')
+
+        json_data = { 'run-started-at': now, 'children': [{ 'tag': 'Whole Program', 'cumul-time': 2.0 }] }
+        tree = ProfilerTree.from_json(json_data)
+        tree.nodes[0]['self-time'] = 1.0
+
+        self.assertAlmostEqual(normaliser.annotate(json_data, tree), 0.5)
+        self.assertEqual(json_data['node-id'], 1)
+        self.assertAlmostEqual(tree.nodes[0]['normalised-time'], 1.0)
+        self.assertAlmostEqual(tree.nodes[0]['normalised-self-time'], 0.5)
+
+        json_data['run-hostname'] = 'b'
+        self.assertIsNone(normaliser.annotate(json_data, tree))
+
+        # node has no test in common with the reference
+        json_data['run-hostname'] = 'c'
+        self.assertIsNone(normaliser.annotate(json_data, tree))
@@ -0,0 +1,61 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import datetime
+from unittest import TestCase
+
+from mongodb.partitions import partition_info, select_partitions, expired_partitions, merge_by_id, merge_pushed,\
+    rollup_update
+
+
+class TestPartitions(TestCase):
+    def setUp(self):
+        self.conditions = {
+            'program-branch': 'feature/new-io',
+            'run-started-at': datetime.datetime(2015, 6, 18, 11, 5)
+        }
+        self.registry = [
+            { '_id': 'metrics', 'branch': None, 'month': None },
+            { '_id': 'metrics_master_2015_05', 'branch': 'master', 'month': '2015-05' },
+            { '_id': 'metrics_feature_new_io_2015_05', 'branch': 'feature/new-io', 'month': '2015-05' },
+            { '_id': 'metrics_feature_new_io_2015_06', 'branch': 'feature/new-io', 'month': '2015-06' },
+        ]
+
+    def test_partition_info(self):
+        self.assertEqual(partition_info(self.conditions)['_id'], 'metrics')
+        self.assertEqual(partition_info(self.conditions, 'month')['_id'], 'metrics_2015_06')
+        self.assertEqual(partition_info(self.conditions, 'branch')['_id'], 'metrics_feature_new_io')
+
+        info = partition_info(self.conditions, 'branch-month')
+        self.assertEqual(info, { '_id': 'metrics_feature_new_io_2015_06', 'branch': 'feature/new-io',
+                                 'month': '2015-06' })
+        self.assertRaises(ValueError, partition_info, self.conditions, 'year')
+
+    def test_select_partitions(self):
+        self.assertEqual(len(select_partitions(self.registry)), 4)
+        self.assertEqual(select_partitions(self.registry, branches=['master']),
+                         ['metrics', 'metrics_master_2015_05'])
+        self.assertEqual(select_partitions(self.registry, since='2015-06'),
+                         ['metrics', 'metrics_feature_new_io_2015_06'])
+
+    def test_expired_partitions(self):
+        self.assertEqual(expired_partitions(self.registry), [])
+        self.assertEqual(expired_partitions(self.registry, before='2015-06', keep_branches=['master']),
+                         ['metrics_feature_new_io_2015_05'])
+        self.assertEqual(len(expired_partitions(self.registry, branches=['feature/new-io'])), 2)
+
+    def test_merge(self):
+        left = [{ '_id': i } for i in range(0, 10, 2)]
+        right = [{ '_id': i } for i in range(1, 10, 2)]
+        self.assertEqual([item['_id'] for item in merge_by_id([left, right])], range(10))
+        self.assertEqual(len(list(merge_by_id([left, right], 3))), 3)
+
+        merged = merge_pushed([[{ '_id': 'a', 'data': [1, 2] }], [{ '_id': 'a', 'data': [3] }, { '_id': 'b' }]])
+        self.assertEqual(merged, [{ '_id': 'a', 'data': [1, 2, 3] }, { '_id': 'b' }])
+
+    def test_rollup_update(self):
+        key = { 'ist_id': ',Whole Program,', 'month': '2015-05' }
+        match, update = rollup_update({ '_id': key, 'runs': 3, 'cumul-time-sum': 6.0, 'cumul-time-min': 1.0,
+                                        'cumul-time-max': 3.0, 'normalised-time-min': None })
+        self.assertEqual(match, key)
+        self.assertEqual(update, { '$inc': { 'runs': 3, 'cumul-time-sum': 6.0 }, '$min': { 'cumul-time-min': 1.0 },
+                                   '$max': { 'cumul-time-max': 3.0 } })
@@ -0,0 +1,230 @@
+# encoding: utf-8
+# author:   Jan Hybs
+import os
+import shutil
+import tempfile
+import warnings
+from unittest import TestCase
+
+from perf.forloop import ForLoop
+from perf.latency import PointerChase
+from perf.matrixcreate import MatrixCreate
+from perf.matrixsolve2 import MatrixSolve
+from perf.backends import ThreadRunner
+from perf.pool import WorkerPool
+from perf.scaling import cost_curve, geometric, parallel_scaling
+from perf.storage import RandomRead, MmapScan, SequentialWrite, SequentialRead
+from perf.stream import StreamTriad
+from perf.timeline import analyse, warmup_intervals
+from utils.clock import monotonic
+from utils.topology import parse_cpu_list, pin_order, read_topology, get_affinity
+
+
+class BrokenRead(SequentialRead):
+    def create_file(self):
+        raise IOError(28, 'No space left on device')
+
+
+class TestWorkerPool(TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(timeout=30.0)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_monotonic(self):
+        values = [monotonic() for i in range(1000)]
+        self.assertEqual(values, sorted(values))
+
+    def test_run(self):
+        workers = self.pool.run(ForLoop, 2, 0.05)
+        self.assertEqual(len(workers), 2)
+        for worker in workers:
+            self.assertGreater(worker['value'], 0)
+            self.assertGreater(worker['duration'], 0.02)
+            self.assertTrue(worker['stopped'])
+
+        # workers are reused, pool grows on demand
+        pids = [worker.pid for worker in self.pool.workers]
+        self.pool.run(MatrixCreate, 1, 0.05)
+        self.assertEqual(len(self.pool.run(ForLoop, 3, 0.05)), 3)
+        self.assertEqual([worker.pid for worker in self.pool.workers][:2], pids)
+
+    def test_timeline(self):
+        workers = self.pool.run(ForLoop, 1, 0.1)
+        timeline = workers[0]['timeline']
+        self.assertGreater(len(timeline['time']), 5)
+        self.assertEqual(timeline['count'], sorted(timeline['count']))
+        self.assertGreater(timeline['count'][-1], 0)
+
+    def test_memory(self):
+        workers = self.pool.run(StreamTriad, 1, 0.05, { 'size': 1024 })
+        self.assertEqual(workers[0]['value'] % (3 * 8 * 1024), 0)
+        self.assertGreater(self.pool.run(PointerChase, 1, 0.05, { 'size': 4096 })[0]['value'], 0)
+
+        # chain is single cycle over whole working set
+        test = PointerChase(size=4096)
+        test.setup()
+        i, visited = 0, set()
+        for j in range(512):
+            visited.add(i)
+            i = test.chain[i]
+        self.assertEqual((i, len(visited)), (0, 512))
+
+    def test_storage(self):
+        directory = tempfile.mkdtemp()
+        try:
+            params = { 'directory': directory, 'size': 2 * 1024 * 1024 }
+            for cls in (SequentialWrite, RandomRead, MmapScan):
+                self.assertGreater(self.pool.run(cls, 2, 0.05, params)[0]['value'], 0)
+            # workers remove their files
+            self.assertEqual(os.listdir(directory), [])
+
+            # including files of failed set up
+            self.assertRaises(RuntimeError, self.pool.run, BrokenRead, 1, 0.05, params)
+            self.assertRaises(RuntimeError, ThreadRunner().run, BrokenRead, 1, 0.05, params)
+            self.assertEqual(os.listdir(directory), [])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_pinned_pool(self):
+        cpu = get_affinity()[0]
+        pool = WorkerPool(cpus=[cpu])
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                self.assertEqual(pool.run(ForLoop, 1, 0.02)[0]['cpu'], cpu)
+                self.assertEqual(caught, [])
+
+                # more workers than cpus share them
+                self.assertEqual(pool.run(ForLoop, 2, 0.02)[1]['cpu'], cpu)
+                self.assertEqual([item.category for item in caught], [RuntimeWarning])
+        finally:
+            pool.close()
+
+    def test_fixed_size(self):
+        workers = self.pool.run(MatrixSolve, 1, 0.05, { 'size': 16 })
+        self.assertGreater(workers[0]['value'], 10)
+
+
+class TestThreadRunner(TestCase):
+    def test_run(self):
+        workers = ThreadRunner().run(ForLoop, 2, 0.05)
+        self.assertEqual(len(workers), 2)
+        for worker in workers:
+            self.assertGreater(worker['value'], 0)
+            self.assertLessEqual(worker['timeline']['count'][-1], worker['value'])
+            self.assertTrue(worker['stopped'])
+
+        class Early(ForLoop):
+            def test(self, result):
+                result.value = 0
+
+        # test which ended on its own is reported even with no operation counted
+        self.assertEqual([w['stopped'] for w in ThreadRunner().run(Early, 1, 0.05)], [False])
+
+        self.assertRaises(RuntimeError, ThreadRunner().run, MatrixSolve, 1, 0.05, { 'size': -1 })
+
+    def test_pinned(self):
+        original = get_affinity()
+        if not original:
+            return
+
+        class Pinned(ForLoop):
+            def setup(self):
+                affinities.append(get_affinity())
+
+        affinities = list()
+        ThreadRunner(cpus=original[-1:]).run(Pinned, 1, 0.05)
+        self.assertEqual(affinities, [original[-1:]])
+        self.assertEqual(get_affinity(), original)
+
+
+class TestScaling(TestCase):
+    def test_cost_curve(self):
+        sizes = geometric(10, 100000, 13)
+        self.assertEqual(len(sizes), 13)
+
+        # linear cost until n = 1000, quadratic afterwards
+        times = [n * 1e-6 if n <= 1000 else n * n * 1e-9 for n in sizes]
+        result = cost_curve(sizes + [200000], [1.0 / t for t in times] + [0.0])
+        self.assertEqual(len(result['time']), 13)
+        self.assertTrue(1.0 < result['exponent'] < 2.0)
+        self.assertEqual(len(result['knees']), 1)
+        self.assertTrue(1000 <= result['knees'][0]['size'] <= 2000)
+        self.assertAlmostEqual(result['knees'][0]['slope-after'], 2.0)
+
+        result = cost_curve(sizes, [1.0 / n for n in sizes])
+        self.assertAlmostEqual(result['exponent'], 1.0)
+        self.assertEqual(result['knees'], [])
+
+    def test_parallel_scaling(self):
+        results = [{ 'processes': p, 'performance': 100.0 * min(p, 3) } for p in (4, 1, 2, 3, 6)]
+        scaling = parallel_scaling(results)
+        self.assertEqual(scaling['processes'], [1, 2, 3, 4, 6])
+        self.assertEqual(scaling['speedup'], [1.0, 2.0, 3.0, 3.0, 3.0])
+        self.assertEqual(scaling['saturation'], 4)
+        self.assertEqual(parallel_scaling(results[:1]), None)
+
+    def test_overhead(self):
+        # constant call overhead flattens the curve at small sizes
+        sizes = geometric(10, 100000, 13)
+        times = [1e-4 + (n * 1e-6 if n <= 1000 else n * n * 1e-9) for n in sizes]
+        result = cost_curve(sizes, [1.0 / t for t in times])
+        self.assertAlmostEqual(result['overhead'], 1e-4, delta=1e-5)
+        self.assertEqual(len(result['knees']), 1)
+        self.assertTrue(1000 <= result['knees'][0]['size'] <= 2000)
+        self.assertAlmostEqual(result['knees'][0]['slope-before'], 1.0, delta=0.1)
+
+        # largest sizes do less than 10 calls per window
+        result = cost_curve(sizes, [1.0 / t for t in times], window=0.5)
+        self.assertEqual(result['quantised'], [n for n, t in zip(sizes, times) if 0.5 / t < 10])
+        self.assertEqual(len(result['quantised']), 4)
+
+
+class TestTimeline(TestCase):
+    def test_analyse(self):
+        # 10 slow intervals then 1000 ops per second
+        times = [i * 0.01 for i in range(101)]
+        rates = [100.0 if i < 10 else 1000.0 for i in range(100)]
+        counts = [0.0]
+        for rate in rates:
+            counts.append(counts[-1] + rate * 0.01)
+
+        result = analyse(times, counts)
+        self.assertAlmostEqual(result['warmup'], 0.1)
+        self.assertAlmostEqual(result['performance'], 1000.0)
+        self.assertEqual(len(result['throughput']), 100)
+
+        self.assertEqual(warmup_intervals([1000.0] * 100), 0)
+        self.assertEqual(warmup_intervals([1.0] * 3 + [0.0] * 97), 0)
+
+
+class TestTopology(TestCase):
+    def test_parse_cpu_list(self):
+        self.assertEqual(parse_cpu_list('0-3,8,10-11\n'), [0, 1, 2, 3, 8, 10, 11])
+        self.assertEqual(parse_cpu_list(''), [])
+
+    def test_pin_order(self):
+        # 2 nodes with 2 cores and 2 threads each, siblings are n and n + 4
+        topology = [{ 'cpu': cpu, 'core': cpu % 4 % 2, 'package': cpu % 4 // 2, 'node': cpu % 4 // 2,
+                      'thread': cpu // 4 } for cpu in range(8)]
+        self.assertEqual(pin_order(topology), [0, 1, 4, 5, 2, 3, 6, 7])
+
+    def test_read_topology(self):
+        root = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(root, 'online'), 'w') as fp:
+                fp.write('0-1\n')
+            for cpu in range(2):
+                os.makedirs(os.path.join(root, 'cpu{:d}'.format(cpu), 'topology'))
+                os.makedirs(os.path.join(root, 'cpu{:d}'.format(cpu), 'node0'))
+                for name, value in (('core_id', 0), ('physical_package_id', 0), ('thread_siblings_list', '0-1')):
+                    with open(os.path.join(root, 'cpu{:d}'.format(cpu), 'topology', name), 'w') as fp:
+                        fp.write('{}\n'.format(value))
+
+            topology = read_topology(root)
+            self.assertEqual([item['thread'] for item in topology], [0, 1])
+            self.assertEqual(pin_order(topology), [0, 1])
+        finally:
+            shutil.rmtree(root)
@@ -0,0 +1,31 @@
+# encoding: utf-8
+# author:   Jan Hybs
+from unittest import TestCase
+
+from utils.robust import median, mad, median_interval, outliers, summary
+
+
+class TestRobust(TestCase):
+    def test_median(self):
+        self.assertEqual(median([3, 1, 2]), 2)
+        self.assertEqual(median([4, 1, 2, 3]), 2.5)
+        self.assertEqual(median([]), None)
+        self.assertEqual(mad([1, 2, 3, 4, 100]), 1)
+
+    def test_median_interval(self):
+        self.assertEqual(median_interval(range(5)), None)
+        self.assertEqual(median_interval(range(6)), (0, 5))
+        # n = 20 gives x(6) and x(15) (1-based), coverage 95.9 %
+        self.assertEqual(median_interval(range(20)), (5, 14))
+        self.assertEqual(median_interval(range(20), 0.5), (7, 12))
+
+    def test_summary(self):
+        values = [100.0, 101.0, 99.0, 100.5, 99.5, 100.0, 40.0, 100.2]
+        self.assertEqual(outliers(values, 100.0, 0.5), (1, 0))
+
+        stats = summary(values)
+        self.assertEqual(stats['samples'], 8)
+        self.assertEqual(stats['median'], 100.0)
+        self.assertEqual(stats['outliers-low'], 1)
+        self.assertAlmostEqual(stats['ci-width'], (101.0 - 40.0) / 100.0)
+        self.assertEqual(summary([1.0, 2.0])['ci-width'], None)